@@ -3,42 +3,103 @@ Flask Web Application for Airline Passenger Satisfaction Prediction
 Using ID3 Decision Tree Model (Chefboost)
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify
 import pickle
-import pandas as pd
-import numpy as np
 import warnings
 import os
 import sys
 
+from batch_engine import REQUIRED_COLUMNS, parse_form
+from binning import BINNED_COLUMNS
+from compiled_tree import CompiledTree, compile_model
+from lookup_tables import EncoderTables
+from materialize import DecisionTable, TablePredictor
+from metrics import (Metrics, add_rows, batcher_collector, cache_collector, lap,
+                     model_collector, note_error, note_model_version)
+from micro_batcher import MicroBatcher
+from model_bundle import BundleError
+from model_registry import MODEL_REGISTRY, UNVERSIONED, ModelRegistry, ModelSwapper, ServingModel
+from profiling import PROFILE_DIR, RequestProfiler
+
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 
+# Encoded feature vectors remembered by each model version's prediction cache
+PREDICTION_CACHE_SIZE = 100000
+
+# Concurrent /predict cache misses are scored together: up to MICRO_BATCH_SIZE
+# rows per call, waiting at most MICRO_BATCH_WAIT_MS for more to arrive (0 only
+# takes what queued up while the previous batch ran; MICRO_BATCH_SIZE=1 disables it)
+MICRO_BATCH_SIZE = int(os.environ.get('MICRO_BATCH_SIZE', 64))
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', 0))
+
+# ==========================================
+# MICRO-BATCHING
+# ==========================================
+# One dispatcher thread per process, shared by every model version
+if MICRO_BATCH_SIZE > 1:
+    batcher = MicroBatcher(None, MICRO_BATCH_SIZE, MICRO_BATCH_WAIT_MS)
+else:
+    batcher = None
+
 # ==========================================
 # LOAD MODEL AND ENCODERS
 # ==========================================
+# The active version in the model registry (models/id3_model/, published by
+# train_model.py or model_registry.py) is served. Without a registry,
+# id3_model.bundle (written by train_model.py or model_bundle.py) is
+# memory-mapped in one go, and without it the separate artifacts are loaded
+MODEL_BUNDLE = 'id3_model.bundle'
+registry = ModelRegistry(MODEL_REGISTRY, 'id3_model')
+
+def load_model(version, path):
+    """ServingModel for one bundle, with its own prediction cache"""
+    return ServingModel.from_bundle(path, version, REQUIRED_COLUMNS,
+                                    PREDICTION_CACHE_SIZE, batcher)
+
+active_version = registry.current()
+bundle_path = registry.path(active_version) if active_version is not None else MODEL_BUNDLE
+
 try:
-    with open('label_encoders.pkl', 'rb') as f:
-        label_encoders = pickle.load(f)
-    
-    with open('binning_config.pkl', 'rb') as f:
-        binning_config = pickle.load(f)
-    
-    with open('feature_columns.pkl', 'rb') as f:
-        feature_columns = pickle.load(f)
-    
-    with open('id3_model.pkl', 'rb') as f:
-        model = pickle.load(f)
-    
-    from chefboost import Chefboost as cb
+    if active_version is not None:
+        serving = load_model(active_version, bundle_path)
+    elif os.path.exists(MODEL_BUNDLE):
+        serving = load_model(UNVERSIONED, MODEL_BUNDLE)
+    else:
+        with open('label_encoders.pkl', 'rb') as f:
+            label_encoders = pickle.load(f)
+        
+        with open('binning_config.pkl', 'rb') as f:
+            binning_config = pickle.load(f)
+        
+        with open('feature_columns.pkl', 'rb') as f:
+            feature_columns = pickle.load(f)
+        
+        # Score with the flat compiled tree so chefboost is not needed at runtime
+        if os.path.exists('id3_tree.npz'):
+            tree = CompiledTree.load('id3_tree.npz')
+        else:
+            with open('id3_model.pkl', 'rb') as f:
+                tree = compile_model(pickle.load(f))
+        
+        # Answer from the decision table written by materialize.py, if any
+        table = DecisionTable.load('id3_tree_table.npy') if os.path.exists('id3_tree_table.npy') else None
+        
+        # Compile encoders into plain lookup tables once at startup
+        serving = ServingModel(UNVERSIONED, tree, TablePredictor(table, tree),
+                               EncoderTables(label_encoders, binning_config),
+                               binning_config, feature_columns,
+                               cache_size=PREDICTION_CACHE_SIZE, batcher=batcher)
+    serving.warm_up()
     
     print("\n" + "=" * 50)
     print("🛫 APPLICATION DỰ ĐOÁN MỨCDỘ HÀI LÒNG KHÁCH HÀNG HÀNG KHÔNG")
     print("=" * 50)
     print("\n✅ Model loaded successfully!")
-    print(f"✅ Features: {len(feature_columns)} columns")
-    print(f"✅ Encoders: {len(label_encoders)} categorical variables")
+    print(f"✅ Version: {serving.version}")
+    print(f"✅ Features: {len(serving.feature_columns)} columns")
+    print(f"✅ Encoders: {len(serving.encoder_tables.classes)} categorical variables")
     
 except FileNotFoundError as e:
     print(f"\n❌ Lỗi khi load model: {e}")
@@ -46,43 +107,106 @@ except FileNotFoundError as e:
     print("\n" + "=" * 50)
     print("🛫 APPLICATION DỰ ĐOÁN MỨCDỘ HÀI LÒNG KHÁCH HÀNG HÀNG KHÔNG")
     print("=" * 50)
-    label_encoders = None
-    binning_config = None
-    feature_columns = None
-    model = None
+    serving = None
+except BundleError as e:
+    # Never serve from a bundle built for a different schema
+    print(f"\n❌ {bundle_path}: {e}")
+    print("⚠️  Vui lòng chạy lại train_model.py!")
+    sys.exit(1)
+
+# ==========================================
+# MODEL HOT-SWAP
+# ==========================================
+# Each process polls the registry and swaps in a newly activated version once
+# it is loaded and warmed; requests read models.current once (serving_model)
+models = ModelSwapper(registry, load_model, serving)
+
+@app.before_request
+def watch_model_registry():
+    models.ensure_watching()
+
+@app.after_request
+def add_model_version(response):
+    """Tell the client which model version answered"""
+    version = g.get('model_version')
+    if version is not None:
+        response.headers['X-Model-Version'] = version
+    return response
+
+# ==========================================
+# REQUEST METRICS
+# ==========================================
+# Per-stage latency histograms and counters for /metrics; every response
+# carries its stage times in a Server-Timing header
+request_metrics = Metrics('app')
+request_metrics.add_collector(cache_collector(lambda: models.current and models.current.cache))
+request_metrics.add_collector(model_collector(models))
+if batcher is not None:
+    request_metrics.add_collector(batcher_collector(batcher))
+
+@app.before_request
+def start_request_timer():
+    request_metrics.begin(request.endpoint or 'unmatched')
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and report its stage times in a Server-Timing header"""
+    server_timing = request_metrics.finish(response.status_code)
+    if server_timing is not None:
+        response.headers['Server-Timing'] = server_timing
+    return response
+
+@app.teardown_request
+def discard_request_timer(exc):
+    request_metrics.discard()
+
+# ==========================================
+# ON-DEMAND PROFILING
+# ==========================================
+# Disabled unless PROFILE_TOKEN is set. An admin arms it for the next N
+# requests with POST /admin/profile, or profiles a single request by sending
+# X-Profile: cprofile|sample; results are written to profiles/
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+profiler = RequestProfiler(PROFILE_DIR, PROFILE_TOKEN)
+
+@app.before_request
+def start_profile():
+    """Profile this request if the profiler is armed or an admin asked for it"""
+    mode = request.headers.get('X-Profile')
+    if mode is not None and not profiler.authorized(request.headers.get('X-Admin-Token')):
+        mode = None
+    if profiler.remaining or mode is not None:
+        try:
+            g.profile_capture = profiler.start(request.endpoint, mode)
+        except ValueError as e:
+            note_error(type(e).__name__)
+            return jsonify({'success': False, 'error': f'X-Profile: {e}'}), 400
+
+@app.after_request
+def write_profile(response):
+    capture = g.pop('profile_capture', None)
+    if capture is not None:
+        output = profiler.stop(capture, response.status_code)
+        if capture.requested:
+            response.headers['X-Profile-Output'] = output
+    return response
+
+@app.teardown_request
+def discard_profile(exc):
+    capture = g.pop('profile_capture', None)
+    if capture is not None:
+        profiler.discard(capture)
 
 # ==========================================
 # HELPER FUNCTIONS
 # ==========================================
-def apply_age_binning(age):
-    """Apply age binning"""
-    bins = binning_config['bins_age']
-    labels = binning_config['labels_age']
-    
-    for i in range(len(bins) - 1):
-        if bins[i] <= age < bins[i + 1]:
-            return labels[i]
-    return labels[-1]
-
-def apply_delay_binning(delay):
-    """Apply delay binning"""
-    bins = binning_config['bins_delay']
-    labels = binning_config['labels_delay']
-    
-    for i in range(len(bins) - 1):
-        if bins[i] < delay <= bins[i + 1]:
-            return labels[i]
-    return labels[-1]
-
-def apply_distance_binning(distance):
-    """Apply flight distance binning"""
-    bins = binning_config['bins_dist']
-    labels = binning_config['labels_dist']
-    
-    for i in range(len(bins) - 1):
-        if bins[i] <= distance < bins[i + 1]:
-            return labels[i]
-    return labels[-1]
+def serving_model():
+    """The model version for this request, read once so a hot-swap cannot change it midway"""
+    m = models.current
+    if m is not None:
+        g.model_version = m.version
+        note_model_version(m.version)
+    return m
 
 # ==========================================
 # ROUTES
@@ -90,12 +214,13 @@ def apply_distance_binning(distance):
 @app.route('/')
 def index():
     """Render home page with form"""
-    # Get unique values for dropdowns from label encoders
-    if label_encoders:
-        genders = label_encoders['Gender'].classes_
-        customer_types = label_encoders['Customer Type'].classes_
-        travel_types = label_encoders['Type of Travel'].classes_
-        classes = label_encoders['Class'].classes_
+    # Get unique values for dropdowns from the encoder vocabularies
+    m = models.current
+    if m is not None:
+        genders = m.encoder_tables.classes['Gender']
+        customer_types = m.encoder_tables.classes['Customer Type']
+        travel_types = m.encoder_tables.classes['Type of Travel']
+        classes = m.encoder_tables.classes['Class']
     else:
         # Default values if model not loaded
         genders = ['Male', 'Female']
@@ -113,7 +238,9 @@ def index():
 def predict():
     """Make prediction based on form data"""
     try:
-        if not model:
+        m = serving_model()
+        if m is None:
+            note_error('model_not_loaded')
             return jsonify({
                 'success': False,
                 'error': 'Model not loaded. Please run train_model.py first!'
@@ -122,95 +249,100 @@ def predict():
         # Get form data
         data = request.json
         
-        # Extract values
-        gender = data['gender']
-        customer_type = data['customerType']
-        age = int(data['age'])
-        travel_type = data['travelType']
-        class_ = data['class']
-        distance = int(data['distance'])
-        
-        wifi = int(data['wifi'])
-        time_conv = int(data['timeConv'])
-        booking = int(data['booking'])
-        gate = int(data['gate'])
-        food = int(data['food'])
-        boarding = int(data['boarding'])
-        seat = int(data['seat'])
-        entertainment = int(data['entertainment'])
-        onboard = int(data['onboard'])
-        legroom = int(data['legroom'])
-        baggage = int(data['baggage'])
-        checkin = int(data['checkin'])
-        service = int(data['service'])
-        cleanliness = int(data['cleanliness'])
-        
-        dep_delay = int(data['depDelay'])
-        arr_delay = int(data['arrDelay'])
+        # Extract values (CSV column -> value)
+        sample_input = parse_form(data)
+        lap('parse')
         
         # Apply binning
-        age_binned = apply_age_binning(age)
-        distance_binned = apply_distance_binning(distance)
-        dep_delay_binned = apply_delay_binning(dep_delay)
-        arr_delay_binned = apply_delay_binning(arr_delay)
-        
-        # Create input dictionary
-        sample_input = {
-            'Gender': gender,
-            'Customer Type': customer_type,
-            'Age': age_binned,
-            'Type of Travel': travel_type,
-            'Class': class_,
-            'Flight Distance': distance_binned,
-            'Inflight wifi service': wifi,
-            'Departure/Arrival time convenient': time_conv,
-            'Ease of Online booking': booking,
-            'Gate location': gate,
-            'Food and drink': food,
-            'Online boarding': boarding,
-            'Seat comfort': seat,
-            'Inflight entertainment': entertainment,
-            'On-board service': onboard,
-            'Leg room service': legroom,
-            'Baggage handling': baggage,
-            'Checkin service': checkin,
-            'Inflight service': service,
-            'Cleanliness': cleanliness,
-            'Departure Delay in Minutes': dep_delay_binned,
-            'Arrival Delay in Minutes': arr_delay_binned
-        }
+        for col in BINNED_COLUMNS:
+            sample_input[col] = m.binner.label(col, sample_input[col])
+        lap('binning')
         
         # Encode input
         encoded_sample = []
-        for col in feature_columns:
+        for col in m.feature_columns:
             val = sample_input.get(col)
-            if col in label_encoders:
-                val_encoded = label_encoders[col].transform([str(val)])[0]
+            if col in m.encoder_tables:
+                val_encoded = m.encoder_tables.encode(col, val)
                 encoded_sample.append(val_encoded)
             else:
                 encoded_sample.append(val)
+        lap('encoding')
         
         # Make prediction
-        pred_val = cb.predict(model, encoded_sample)
+        pred_val = m.cache.predict_one(m.predict_single, encoded_sample)
         
         # Decode result
-        final_result = label_encoders['satisfaction'].inverse_transform([int(pred_val)])[0]
+        final_result = m.encoder_tables.decode('satisfaction', int(pred_val))
         
         # Check if satisfied
         is_satisfied = final_result.lower() == 'satisfied'
+        add_rows(1)
+        lap('predict')
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'satisfied': is_satisfied,
-            'prediction': final_result
+            'prediction': final_result,
+            'model_version': m.version
         })
+        lap('serialize')
+        return response
         
     except Exception as e:
+        note_error(type(e).__name__)
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+@app.route('/cache_stats')
+def cache_stats():
+    """Return the served model's prediction cache size and hit/miss counters"""
+    m = models.current
+    if m is None:
+        return jsonify({'enabled': False})
+    return jsonify({'model_version': m.version, **m.cache.stats()})
+
+@app.route('/model')
+def model_status():
+    """Model version being served by this process, registry versions and swap count"""
+    return jsonify(models.status())
+
+@app.route('/batcher_stats')
+def batcher_stats():
+    """Return micro-batching settings, queue depth and batch-size histogram"""
+    if batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **batcher.stats()})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: per-stage latency histograms, request / error counts, cache hits"""
+    return Response(request_metrics.render(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """Arm the profiler for the next N requests (POST) or report its state (GET)"""
+    if not profiler.enabled:
+        note_error('profiling_disabled')
+        return jsonify({'success': False, 'error': 'Profiling is disabled (set PROFILE_TOKEN)'}), 404
+    if not profiler.authorized(request.headers.get('X-Admin-Token')):
+        note_error('forbidden')
+        return jsonify({'success': False, 'error': 'Invalid X-Admin-Token'}), 403
+    
+    if request.method == 'POST':
+        # {"requests": 20, "mode": "cprofile" | "sample", "endpoints": ["predict_batch"]}
+        options = request.get_json(silent=True) or {}
+        try:
+            profiler.arm(int(options.get('requests', 10)), options.get('mode', 'cprofile'),
+                         options.get('endpoints'))
+        except (TypeError, ValueError) as e:
+            note_error(type(e).__name__)
+            return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, **profiler.status()})
+
 # ==========================================
 # MAIN
 # ==========================================
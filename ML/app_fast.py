@@ -3,39 +3,119 @@ Flask Web Application for Airline Passenger Satisfaction Prediction
 Using ok
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, url_for
 import pickle
-import pandas as pd
-import numpy as np
 import warnings
 import os
+import sys
+import itertools
+import tempfile
+
+from batch_engine import REQUIRED_COLUMNS, parse_form, predict_frame, stream_csv
+from binning import BINNED_COLUMNS
+from jobs import JOBS_DIR, JobQueue, JobStore
+from bulk_api import PayloadError, predict_bulk, read_columns, to_frame
+from lookup_tables import EncoderTables
+from materialize import DecisionTable, TablePredictor
+from metrics import (Metrics, add_rows, batcher_collector, cache_collector, lap,
+                     model_collector, note_error, note_model_version)
+from micro_batcher import MicroBatcher
+from model_bundle import BundleError
+from model_registry import MODEL_REGISTRY, UNVERSIONED, ModelRegistry, ModelSwapper, ServingModel
+from profiling import PROFILE_DIR, RequestProfiler
+from reasons import main_reasons
+from shard_scoring import ShardPool
 
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 
+# Rows scored per chunk by /predict_batch_stream
+STREAM_CHUNK_SIZE = 50000
+
+# Uploads posted to /jobs are scored in the background, JOB_CHUNK_SIZE rows
+# at a time, on JOB_WORKERS threads per process (jobs/ and its database are
+# created by the first request)
+JOB_CHUNK_SIZE = 20000
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+job_queue = JobQueue(JobStore(JOBS_DIR), JOB_WORKERS, JOB_CHUNK_SIZE)
+
+# Encoded feature vectors remembered by each model version's prediction cache
+PREDICTION_CACHE_SIZE = 100000
+
+# Concurrent /predict cache misses are scored together: up to MICRO_BATCH_SIZE
+# rows per call, waiting at most MICRO_BATCH_WAIT_MS for more to arrive (0 only
+# takes what queued up while the previous batch ran; MICRO_BATCH_SIZE=1 disables it)
+MICRO_BATCH_SIZE = int(os.environ.get('MICRO_BATCH_SIZE', 64))
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', 0))
+
+# /predict_batch uploads of at least PARALLEL_MIN_ROWS rows are split into row
+# shards scored on BATCH_PROCESSES processes (needs model.bundle; 1 disables it)
+BATCH_PROCESSES = int(os.environ.get('BATCH_PROCESSES', os.cpu_count() or 1))
+PARALLEL_MIN_ROWS = 100000
+
+# ==========================================
+# MICRO-BATCHING
+# ==========================================
+# One dispatcher thread per process, shared by every model version
+if MICRO_BATCH_SIZE > 1:
+    batcher = MicroBatcher(None, MICRO_BATCH_SIZE, MICRO_BATCH_WAIT_MS)
+else:
+    batcher = None
+
 # ==========================================
 # LOAD MODEL AND ENCODERS
 # ==========================================
+# The active version in the model registry (models/model/, published by
+# train_model_fast.py or model_registry.py) is served. Without a registry,
+# model.bundle (written by model_bundle.py) is memory-mapped in one go, and
+# without it the separate pickles are loaded
+MODEL_BUNDLE = 'model.bundle'
+registry = ModelRegistry(MODEL_REGISTRY, 'model')
+
+def load_model(version, path):
+    """ServingModel for one bundle, with its own prediction cache"""
+    return ServingModel.from_bundle(path, version, REQUIRED_COLUMNS,
+                                    PREDICTION_CACHE_SIZE, batcher)
+
+active_version = registry.current()
+bundle_path = registry.path(active_version) if active_version is not None else MODEL_BUNDLE
+
 try:
-    with open('label_encoders.pkl', 'rb') as f:
-        label_encoders = pickle.load(f)
-    
-    with open('binning_config.pkl', 'rb') as f:
-        binning_config = pickle.load(f)
-    
-    with open('feature_columns.pkl', 'rb') as f:
-        feature_columns = pickle.load(f)
-    
-    with open('model.pkl', 'rb') as f:
-        model = pickle.load(f)
+    if active_version is not None:
+        serving = load_model(active_version, bundle_path)
+    elif os.path.exists(MODEL_BUNDLE):
+        serving = load_model(UNVERSIONED, MODEL_BUNDLE)
+    else:
+        with open('label_encoders.pkl', 'rb') as f:
+            label_encoders = pickle.load(f)
+        
+        with open('binning_config.pkl', 'rb') as f:
+            binning_config = pickle.load(f)
+        
+        with open('feature_columns.pkl', 'rb') as f:
+            feature_columns = pickle.load(f)
+        
+        with open('model.pkl', 'rb') as f:
+            model = pickle.load(f)
+        
+        # Single predictions use the decision table written by materialize.py, if any
+        table = DecisionTable.load('model_table.npy') if os.path.exists('model_table.npy') else None
+        
+        # Compile encoders into plain lookup tables once at startup
+        serving = ServingModel(UNVERSIONED, model, TablePredictor(table, model),
+                               EncoderTables(label_encoders, binning_config),
+                               binning_config, feature_columns,
+                               cache_size=PREDICTION_CACHE_SIZE, batcher=batcher)
+    serving.warm_up()
     
     print("\n" + "=" * 50)
     print("🛫 APPLICATION DỰ ĐOÁN MỨCDỘ HÀI LÒNG KHÁCH HÀNG HÀNG KHÔNG")
     print("=" * 50)
     print("\n✅ Model loaded successfully!")
-    print(f"✅ Features: {len(feature_columns)} columns")
-    print(f"✅ Encoders: {len(label_encoders)} categorical variables")
+    print(f"✅ Version: {serving.version}")
+    print(f"✅ Features: {len(serving.feature_columns)} columns")
+    print(f"✅ Encoders: {len(serving.encoder_tables.classes)} categorical variables")
     
 except FileNotFoundError as e:
     print(f"\n❌ Lỗi khi load model: {e}")
@@ -43,95 +123,122 @@ except FileNotFoundError as e:
     print("\n" + "=" * 50)
     print("🛫 APPLICATION DỰ ĐOÁN MỨCDỘ HÀI LÒNG KHÁCH HÀNG HÀNG KHÔNG")
     print("=" * 50)
-    label_encoders = None
-    binning_config = None
-    feature_columns = None
-    model = None
+    serving = None
+except BundleError as e:
+    # Never serve from a bundle built for a different schema
+    print(f"\n❌ {bundle_path}: {e}")
+    print("⚠️  Vui lòng chạy lại train_model_fast.py!")
+    sys.exit(1)
+
+# ==========================================
+# MODEL HOT-SWAP
+# ==========================================
+# Each process polls the registry and swaps in a newly activated version once
+# it is loaded and warmed; requests read models.current once (serving_model)
+models = ModelSwapper(registry, load_model, serving)
+
+@app.before_request
+def watch_model_registry():
+    models.ensure_watching()
+
+@app.after_request
+def add_model_version(response):
+    """Tell the client which model version answered"""
+    version = g.get('model_version')
+    if version is not None:
+        response.headers['X-Model-Version'] = version
+    return response
+
+# ==========================================
+# MULTI-CORE BATCH SCORING
+# ==========================================
+# Every shard names the bundle of the version that is scoring it
+# (models.current), so the same pool serves across hot-swaps and never
+# loads a version that has since been pruned (pickle-only models are
+# scored in process)
+if BATCH_PROCESSES > 1:
+    shard_pool = ShardPool(None, BATCH_PROCESSES)
+else:
+    shard_pool = None
+
+# ==========================================
+# REQUEST METRICS
+# ==========================================
+# Per-stage latency histograms and counters for /metrics; every response
+# carries its stage times in a Server-Timing header
+request_metrics = Metrics('app_fast')
+request_metrics.add_collector(cache_collector(lambda: models.current and models.current.cache))
+request_metrics.add_collector(model_collector(models))
+if batcher is not None:
+    request_metrics.add_collector(batcher_collector(batcher))
+
+@app.before_request
+def start_request_timer():
+    request_metrics.begin(request.endpoint or 'unmatched')
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and report its stage times in a Server-Timing header"""
+    server_timing = request_metrics.finish(response.status_code)
+    if server_timing is not None:
+        response.headers['Server-Timing'] = server_timing
+    return response
+
+@app.teardown_request
+def discard_request_timer(exc):
+    request_metrics.discard()
+
+# ==========================================
+# ON-DEMAND PROFILING
+# ==========================================
+# Disabled unless PROFILE_TOKEN is set. An admin arms it for the next N
+# requests with POST /admin/profile, or profiles a single request by sending
+# X-Profile: cprofile|sample; results are written to profiles/
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+profiler = RequestProfiler(PROFILE_DIR, PROFILE_TOKEN)
+
+@app.before_request
+def start_profile():
+    """Profile this request if the profiler is armed or an admin asked for it"""
+    mode = request.headers.get('X-Profile')
+    if mode is not None and not profiler.authorized(request.headers.get('X-Admin-Token')):
+        mode = None
+    if profiler.remaining or mode is not None:
+        try:
+            g.profile_capture = profiler.start(request.endpoint, mode)
+        except ValueError as e:
+            note_error(type(e).__name__)
+            return jsonify({'success': False, 'error': f'X-Profile: {e}'}), 400
+
+@app.after_request
+def write_profile(response):
+    capture = g.pop('profile_capture', None)
+    if capture is not None:
+        output = profiler.stop(capture, response.status_code)
+        if capture.requested:
+            response.headers['X-Profile-Output'] = output
+    return response
+
+@app.teardown_request
+def discard_profile(exc):
+    capture = g.pop('profile_capture', None)
+    if capture is not None:
+        profiler.discard(capture)
 
 # ==========================================
 # HELPER FUNCTIONS
 # ==========================================
-def apply_age_binning(age):
-    """Apply age binning"""
-    bins = binning_config['bins_age']
-    labels = binning_config['labels_age']
-    
-    for i in range(len(bins) - 1):
-        if bins[i] <= age < bins[i + 1]:
-            return labels[i]
-    return labels[-1]
-
-def apply_delay_binning(delay):
-    """Apply delay binning"""
-    bins = binning_config['bins_delay']
-    labels = binning_config['labels_delay']
-    
-    for i in range(len(bins) - 1):
-        if bins[i] < delay <= bins[i + 1]:
-            return labels[i]
-    return labels[-1]
-
-def apply_distance_binning(distance):
-    """Apply flight distance binning"""
-    bins = binning_config['bins_dist']
-    labels = binning_config['labels_dist']
-    
-    for i in range(len(bins) - 1):
-        if bins[i] <= distance < bins[i + 1]:
-            return labels[i]
-    return labels[-1]
-
-def find_main_reason(row, prediction):
-    """Find main reason for dissatisfaction based on lowest service ratings"""
-    service_features = {
-        'Inflight wifi service': 'Wifi',
-        'Departure/Arrival time convenient': 'Time Convenience',
-        'Ease of Online booking': 'Online Booking',
-        'Gate location': 'Gate Location',
-        'Food and drink': 'Food & Drink',
-        'Online boarding': 'Online Boarding',
-        'Seat comfort': 'Seat Comfort',
-        'Inflight entertainment': 'Entertainment',
-        'On-board service': 'Onboard Service',
-        'Leg room service': 'Leg Room',
-        'Baggage handling': 'Baggage',
-        'Checkin service': 'Check-in',
-        'Inflight service': 'Inflight Service',
-        'Cleanliness': 'Cleanliness'
-    }
-    
-    if prediction == 'neutral or dissatisfied':
-        # Find services with rating <= 2
-        poor_services = []
-        for feature, display_name in service_features.items():
-            if feature in row and row[feature] <= 2:
-                poor_services.append((display_name, row[feature]))
-        
-        if poor_services:
-            # Sort by rating (lowest first)
-            poor_services.sort(key=lambda x: x[1])
-            # Return up to 2 worst services
-            reasons = [s[0] for s in poor_services[:2]]
-            return ', '.join(reasons)
-        else:
-            # Check delays
-            if 'Departure Delay in Minutes' in row and row['Departure Delay in Minutes'] > 30:
-                return 'Departure Delay'
-            elif 'Arrival Delay in Minutes' in row and row['Arrival Delay in Minutes'] > 30:
-                return 'Arrival Delay'
-            return 'Multiple Factors'
-    else:
-        # For satisfied customers, find highest rated services
-        good_services = []
-        for feature, display_name in service_features.items():
-            if feature in row and row[feature] >= 4:
-                good_services.append((display_name, row[feature]))
-        
-        if good_services:
-            good_services.sort(key=lambda x: x[1], reverse=True)
-            reasons = [s[0] for s in good_services[:2]]
-            return ', '.join(reasons)
-        return 'Overall Experience'
+def serving_model():
+    """The model version for this request, read once so a hot-swap cannot change it midway"""
+    m = models.current
+    if m is not None:
+        g.model_version = m.version
+        note_model_version(m.version)
+    return m
+
+def path_explain_mode(m):
+    """m.explain_paths if the request asked for decision paths, else None"""
+    return m.explain_paths if request.args.get('explain') == 'path' else None
 
 # ==========================================
 # ROUTES
@@ -139,12 +246,13 @@ def find_main_reason(row, prediction):
 @app.route('/')
 def index():
     """Render home page with form"""
-    # Get unique values for dropdowns from label encoders
-    if label_encoders:
-        genders = label_encoders['Gender'].classes_
-        customer_types = label_encoders['Customer Type'].classes_
-        travel_types = label_encoders['Type of Travel'].classes_
-        classes = label_encoders['Class'].classes_
+    # Get unique values for dropdowns from the encoder vocabularies
+    m = models.current
+    if m is not None:
+        genders = m.encoder_tables.classes['Gender']
+        customer_types = m.encoder_tables.classes['Customer Type']
+        travel_types = m.encoder_tables.classes['Type of Travel']
+        classes = m.encoder_tables.classes['Class']
     else:
         # Default values if model not loaded
         genders = ['Male', 'Female']
@@ -162,7 +270,9 @@ def index():
 def predict():
     """Make prediction based on form data"""
     try:
-        if not model:
+        m = serving_model()
+        if m is None:
+            note_error('model_not_loaded')
             return jsonify({
                 'success': False,
                 'error': 'Model not loaded. Please run train_model_fast.py first!'
@@ -171,90 +281,48 @@ def predict():
         # Get form data
         data = request.json
         
-        # Extract values
-        gender = data['gender']
-        customer_type = data['customerType']
-        age = int(data['age'])
-        travel_type = data['travelType']
-        class_ = data['class']
-        distance = int(data['distance'])
-        
-        wifi = int(data['wifi'])
-        time_conv = int(data['timeConv'])
-        booking = int(data['booking'])
-        gate = int(data['gate'])
-        food = int(data['food'])
-        boarding = int(data['boarding'])
-        seat = int(data['seat'])
-        entertainment = int(data['entertainment'])
-        onboard = int(data['onboard'])
-        legroom = int(data['legroom'])
-        baggage = int(data['baggage'])
-        checkin = int(data['checkin'])
-        service = int(data['service'])
-        cleanliness = int(data['cleanliness'])
-        
-        dep_delay = int(data['depDelay'])
-        arr_delay = int(data['arrDelay'])
+        # Extract values (CSV column -> value)
+        sample_input = parse_form(data)
+        lap('parse')
         
         # Apply binning
-        age_binned = apply_age_binning(age)
-        distance_binned = apply_distance_binning(distance)
-        dep_delay_binned = apply_delay_binning(dep_delay)
-        arr_delay_binned = apply_delay_binning(arr_delay)
-        
-        # Create input dictionary
-        sample_input = {
-            'Gender': gender,
-            'Customer Type': customer_type,
-            'Age': age_binned,
-            'Type of Travel': travel_type,
-            'Class': class_,
-            'Flight Distance': distance_binned,
-            'Inflight wifi service': wifi,
-            'Departure/Arrival time convenient': time_conv,
-            'Ease of Online booking': booking,
-            'Gate location': gate,
-            'Food and drink': food,
-            'Online boarding': boarding,
-            'Seat comfort': seat,
-            'Inflight entertainment': entertainment,
-            'On-board service': onboard,
-            'Leg room service': legroom,
-            'Baggage handling': baggage,
-            'Checkin service': checkin,
-            'Inflight service': service,
-            'Cleanliness': cleanliness,
-            'Departure Delay in Minutes': dep_delay_binned,
-            'Arrival Delay in Minutes': arr_delay_binned
-        }
+        for col in BINNED_COLUMNS:
+            sample_input[col] = m.binner.label(col, sample_input[col])
+        lap('binning')
         
         # Encode input
         encoded_sample = []
-        for col in feature_columns:
+        for col in m.feature_columns:
             val = sample_input.get(col)
-            if col in label_encoders:
-                val_encoded = label_encoders[col].transform([str(val)])[0]
+            if col in m.encoder_tables:
+                val_encoded = m.encoder_tables.encode(col, val)
                 encoded_sample.append(val_encoded)
             else:
                 encoded_sample.append(val)
+        lap('encoding')
         
         # Make prediction
-        pred_val = model.predict([encoded_sample])[0]
+        pred_val = m.cache.predict_one(m.predict_single, encoded_sample)
         
         # Decode result
-        final_result = label_encoders['satisfaction'].inverse_transform([int(pred_val)])[0]
+        final_result = m.encoder_tables.decode('satisfaction', int(pred_val))
         
         # Check if satisfied
         is_satisfied = final_result.lower() == 'satisfied'
+        add_rows(1)
+        lap('predict')
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'satisfied': is_satisfied,
-            'prediction': final_result
+            'prediction': final_result,
+            'model_version': m.version
         })
+        lap('serialize')
+        return response
         
     except Exception as e:
+        note_error(type(e).__name__)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -264,7 +332,9 @@ def predict():
 def predict_batch():
     """Make batch predictions from uploaded CSV file"""
     try:
-        if not model:
+        m = serving_model()
+        if m is None:
+            note_error('model_not_loaded')
             return jsonify({
                 'success': False,
                 'error': 'Model not loaded. Please run train_model_fast.py first!'
@@ -272,6 +342,7 @@ def predict_batch():
         
         # Check if file was uploaded
         if 'file' not in request.files:
+            note_error('no_file')
             return jsonify({
                 'success': False,
                 'error': 'No file uploaded'
@@ -280,105 +351,47 @@ def predict_batch():
         file = request.files['file']
         
         if file.filename == '':
+            note_error('no_file')
             return jsonify({
                 'success': False,
                 'error': 'No file selected'
             })
         
+        # pandas is only imported once a batch arrives, keeping /predict cold start light
+        import pandas as pd
+        
         # Read CSV file
         df = pd.read_csv(file)
         
         # Store original data for display
         original_df = df.copy()
-        
-        # Required columns
-        required_cols = [
-            'Gender', 'Customer Type', 'Age', 'Type of Travel', 'Class',
-            'Flight Distance', 'Inflight wifi service', 
-            'Departure/Arrival time convenient', 'Ease of Online booking',
-            'Gate location', 'Food and drink', 'Online boarding',
-            'Seat comfort', 'Inflight entertainment', 'On-board service',
-            'Leg room service', 'Baggage handling', 'Checkin service',
-            'Inflight service', 'Cleanliness', 
-            'Departure Delay in Minutes', 'Arrival Delay in Minutes'
-        ]
+        lap('read_csv')
         
         # Check if all required columns exist
-        missing_cols = [col for col in required_cols if col not in df.columns]
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
         if missing_cols:
+            note_error('missing_columns')
             return jsonify({
                 'success': False,
                 'error': f'Missing columns: {", ".join(missing_cols)}'
             })
         
-        # Process each row
-        predictions = []
-        
-        for idx, row in df.iterrows():
-            try:
-                # Apply binning
-                age_binned = apply_age_binning(row['Age'])
-                distance_binned = apply_distance_binning(row['Flight Distance'])
-                dep_delay_binned = apply_delay_binning(row['Departure Delay in Minutes'])
-                arr_delay_binned = apply_delay_binning(row['Arrival Delay in Minutes'])
-                
-                # Create input dictionary
-                sample_input = {
-                    'Gender': row['Gender'],
-                    'Customer Type': row['Customer Type'],
-                    'Age': age_binned,
-                    'Type of Travel': row['Type of Travel'],
-                    'Class': row['Class'],
-                    'Flight Distance': distance_binned,
-                    'Inflight wifi service': row['Inflight wifi service'],
-                    'Departure/Arrival time convenient': row['Departure/Arrival time convenient'],
-                    'Ease of Online booking': row['Ease of Online booking'],
-                    'Gate location': row['Gate location'],
-                    'Food and drink': row['Food and drink'],
-                    'Online boarding': row['Online boarding'],
-                    'Seat comfort': row['Seat comfort'],
-                    'Inflight entertainment': row['Inflight entertainment'],
-                    'On-board service': row['On-board service'],
-                    'Leg room service': row['Leg room service'],
-                    'Baggage handling': row['Baggage handling'],
-                    'Checkin service': row['Checkin service'],
-                    'Inflight service': row['Inflight service'],
-                    'Cleanliness': row['Cleanliness'],
-                    'Departure Delay in Minutes': dep_delay_binned,
-                    'Arrival Delay in Minutes': arr_delay_binned
-                }
-                
-                # Encode input
-                encoded_sample = []
-                for col in feature_columns:
-                    val = sample_input.get(col)
-                    if col in label_encoders:
-                        val_encoded = label_encoders[col].transform([str(val)])[0]
-                        encoded_sample.append(val_encoded)
-                    else:
-                        encoded_sample.append(val)
-                
-                # Make prediction
-                pred_val = model.predict([encoded_sample])[0]
-                final_result = label_encoders['satisfaction'].inverse_transform([int(pred_val)])[0]
-                
-                # Find main reason for the prediction
-                main_reason = find_main_reason(row, final_result)
-                
-                predictions.append({
-                    'result': final_result,
-                    'reason': main_reason
-                })
-                
-            except Exception as e:
-                predictions.append({
-                    'result': f'Error: {str(e)}',
-                    'reason': 'N/A'
-                })
+        # Bin, encode and predict all rows at once
+        explain_path = path_explain_mode(m)
+        if shard_pool is not None and m.bundle_path and len(df) >= PARALLEL_MIN_ROWS:
+            predictions = shard_pool.score_frame(df, explain_path=explain_path is not None,
+                                                 bundle_path=m.bundle_path)
+            lap('shards')
+        else:
+            predictions = predict_frame(df, m.model, m.encoder_tables, m.binner,
+                                        m.feature_columns, m.predict_row, main_reasons,
+                                        cache=m.cache, explain_path=explain_path)
         
         # Add predictions to dataframe
         original_df['Prediction'] = [p['result'] for p in predictions]
         original_df['Main Reason'] = [p['reason'] for p in predictions]
+        if explain_path is not None:
+            original_df['Decision Path'] = [p['path'] for p in predictions]
         
         # Calculate statistics
         satisfied_count = sum(1 for p in predictions if p['result'] == 'satisfied')
@@ -391,8 +404,9 @@ def predict_batch():
         
         # Convert dataframe to dict for JSON response
         results_data = original_df.head(100).to_dict('records')  # Limit to first 100 for display
+        add_rows(total, error_count)
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'total': total,
             'satisfied': satisfied_count,
@@ -401,15 +415,286 @@ def predict_batch():
             'satisfied_percentage': round(satisfied_pct, 2),
             'dissatisfied_percentage': round(dissatisfied_pct, 2),
             'results': results_data,
-            'showing': min(100, total)
+            'showing': min(100, total),
+            'model_version': m.version
+        })
+        lap('serialize')
+        return response
+        
+    except Exception as e:
+        note_error(type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/predict_batch_stream', methods=['POST'])
+def predict_batch_stream():
+    """Stream batch predictions for a large CSV file back as a CSV download"""
+    try:
+        m = serving_model()
+        if m is None:
+            note_error('model_not_loaded')
+            return jsonify({
+                'success': False,
+                'error': 'Model not loaded. Please run train_model_fast.py first!'
+            })
+        
+        # Check if file was uploaded
+        if 'file' not in request.files:
+            note_error('no_file')
+            return jsonify({
+                'success': False,
+                'error': 'No file uploaded'
+            })
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            note_error('no_file')
+            return jsonify({
+                'success': False,
+                'error': 'No file selected'
+            })
+        
+        chunk_size = request.args.get('chunk_size', STREAM_CHUNK_SIZE, type=int)
+        
+        # The upload is closed once this view returns, so spool it to a
+        # temporary file that the response generator reads chunk by chunk
+        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as upload:
+            file.save(upload)
+        
+        import pandas as pd
+        
+        try:
+            # Read the first chunk eagerly so column errors are still reported as JSON
+            reader = pd.read_csv(upload.name, chunksize=chunk_size)
+            first_chunk = next(reader, None)
+            columns = first_chunk.columns if first_chunk is not None else []
+            
+            missing_cols = [col for col in REQUIRED_COLUMNS if col not in columns]
+            if missing_cols:
+                note_error('missing_columns')
+                reader.close()
+                os.remove(upload.name)
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing columns: {", ".join(missing_cols)}'
+                })
+        except Exception:
+            os.remove(upload.name)
+            raise
+        
+        explain_path = path_explain_mode(m)
+        
+        def score_chunk(df):
+            return predict_frame(df, m.model, m.encoder_tables, m.binner,
+                                 m.feature_columns, m.predict_row, main_reasons,
+                                 cache=m.cache, explain_path=explain_path)
+        
+        def generate():
+            # The body is scored after the view has returned, so its stages are
+            # recorded (without a Server-Timing header) as it streams
+            totals = {}
+            try:
+                with request_metrics.timing('predict_batch_stream'):
+                    yield from stream_csv(itertools.chain([first_chunk], reader), score_chunk, totals)
+                    add_rows(totals['total'], totals['errors'])
+            finally:
+                reader.close()
+                os.remove(upload.name)
+        
+        return Response(
+            generate(),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=predictions.csv'}
+        )
+        
+    except Exception as e:
+        note_error(type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
         })
+
+@app.route('/v1/predict/bulk', methods=['POST'])
+def predict_bulk_v1():
+    """Score a columnar JSON / NDJSON / Arrow payload and return compact arrays"""
+    m = serving_model()
+    if m is None:
+        note_error('model_not_loaded')
+        return jsonify({
+            'success': False,
+            'error': 'Model not loaded. Please run train_model_fast.py first!'
+        }), 503
+    
+    try:
+        columns = read_columns(request.get_data(), request.content_type)
+        frame = to_frame(columns, m.feature_columns)
+        lap('parse')
+        result = predict_bulk(frame, m.model, m.encoder_tables, m.binner,
+                              m.feature_columns, cache=m.cache,
+                              explain_path=path_explain_mode(m))
+        add_rows(result['total'], result['errors'])
+        response = jsonify({**result, 'model_version': m.version})
+        lap('serialize')
+        return response
+    except PayloadError as e:
+        note_error(type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), e.status
+    except Exception as e:
+        note_error(type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue an uploaded CSV for background scoring and return its job id"""
+    upload_path = None
+    try:
+        m = serving_model()
+        if m is None:
+            note_error('model_not_loaded')
+            return jsonify({
+                'success': False,
+                'error': 'Model not loaded. Please run train_model_fast.py first!'
+            })
+        
+        # Check if file was uploaded
+        if 'file' not in request.files:
+            note_error('no_file')
+            return jsonify({
+                'success': False,
+                'error': 'No file uploaded'
+            })
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            note_error('no_file')
+            return jsonify({
+                'success': False,
+                'error': 'No file selected'
+            })
+        
+        chunk_size = request.args.get('chunk_size', JOB_CHUNK_SIZE, type=int)
+        job_id = job_queue.new_job_id()
+        upload_path = job_queue.store.upload_path(job_id)
+        file.save(upload_path)
+        
+        import pandas as pd
+        
+        # Column errors are reported now rather than when the job runs
+        columns = pd.read_csv(upload_path, nrows=0).columns
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in columns]
+        if missing_cols:
+            note_error('missing_columns')
+            os.remove(upload_path)
+            return jsonify({
+                'success': False,
+                'error': f'Missing columns: {", ".join(missing_cols)}'
+            })
+        
+        explain_path = path_explain_mode(m)
+        
+        def score_chunk(df):
+            # Runs on a job thread: each chunk's stages are recorded under 'job'
+            with request_metrics.timing('job'):
+                add_rows(len(df))
+                return predict_frame(df, m.model, m.encoder_tables, m.binner,
+                                     m.feature_columns, m.predict_row, main_reasons,
+                                     cache=m.cache, explain_path=explain_path)
+        
+        job_queue.submit(job_id, file.filename, score_chunk, chunk_size)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'model_version': m.version,
+            'status_url': url_for('job_status', job_id=job_id),
+            'result_url': url_for('job_result', job_id=job_id)
+        }), 202
         
     except Exception as e:
+        note_error(type(e).__name__)
+        if upload_path and os.path.exists(upload_path):
+            os.remove(upload_path)
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Progress of a background job (rows done, rows/sec, ETA), with the summary once done"""
+    info = job_queue.status(job_id)
+    if info is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': True, **info})
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Download the full annotated CSV of a finished job"""
+    info = job_queue.status(job_id)
+    if info is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    if info['status'] != 'done':
+        return jsonify({'success': False, 'error': f"Job is {info['status']}"}), 409
+    return send_file(os.path.abspath(job_queue.store.result_path(job_id)),
+                     mimetype='text/csv', as_attachment=True,
+                     download_name='predictions.csv')
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Return the served model's prediction cache size and hit/miss counters"""
+    m = models.current
+    if m is None:
+        return jsonify({'enabled': False})
+    return jsonify({'model_version': m.version, **m.cache.stats()})
+
+@app.route('/model')
+def model_status():
+    """Model version being served by this process, registry versions and swap count"""
+    return jsonify(models.status())
+
+@app.route('/batcher_stats')
+def batcher_stats():
+    """Return micro-batching settings, queue depth and batch-size histogram"""
+    if batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **batcher.stats()})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: per-stage latency histograms, request / row / error counts, cache hits"""
+    return Response(request_metrics.render(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """Arm the profiler for the next N requests (POST) or report its state (GET)"""
+    if not profiler.enabled:
+        note_error('profiling_disabled')
+        return jsonify({'success': False, 'error': 'Profiling is disabled (set PROFILE_TOKEN)'}), 404
+    if not profiler.authorized(request.headers.get('X-Admin-Token')):
+        note_error('forbidden')
+        return jsonify({'success': False, 'error': 'Invalid X-Admin-Token'}), 403
+    
+    if request.method == 'POST':
+        # {"requests": 20, "mode": "cprofile" | "sample", "endpoints": ["predict_batch"]}
+        options = request.get_json(silent=True) or {}
+        try:
+            profiler.arm(int(options.get('requests', 10)), options.get('mode', 'cprofile'),
+                         options.get('endpoints'))
+        except (TypeError, ValueError) as e:
+            note_error(type(e).__name__)
+            return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, **profiler.status()})
+
 # ==========================================
 # MAIN
 # ==========================================
@@ -0,0 +1,253 @@
+"""
+Vectorized batch inference for Airline Passenger Satisfaction Prediction
+Bins, encodes and predicts a whole DataFrame in a few NumPy/pandas passes
+"""
+
+import numpy as np
+
+from binning import BINNED_COLUMNS
+from metrics import lap
+
+# Columns every uploaded CSV must provide
+REQUIRED_COLUMNS = [
+    'Gender', 'Customer Type', 'Age', 'Type of Travel', 'Class',
+    'Flight Distance', 'Inflight wifi service',
+    'Departure/Arrival time convenient', 'Ease of Online booking',
+    'Gate location', 'Food and drink', 'Online boarding',
+    'Seat comfort', 'Inflight entertainment', 'On-board service',
+    'Leg room service', 'Baggage handling', 'Checkin service',
+    'Inflight service', 'Cleanliness',
+    'Departure Delay in Minutes', 'Arrival Delay in Minutes'
+]
+
+# Web form / /predict JSON field -> CSV column
+FORM_FIELDS = {
+    'gender': 'Gender', 'customerType': 'Customer Type', 'age': 'Age',
+    'travelType': 'Type of Travel', 'class': 'Class', 'distance': 'Flight Distance',
+    'wifi': 'Inflight wifi service', 'timeConv': 'Departure/Arrival time convenient',
+    'booking': 'Ease of Online booking', 'gate': 'Gate location', 'food': 'Food and drink',
+    'boarding': 'Online boarding', 'seat': 'Seat comfort', 'entertainment': 'Inflight entertainment',
+    'onboard': 'On-board service', 'legroom': 'Leg room service', 'baggage': 'Baggage handling',
+    'checkin': 'Checkin service', 'service': 'Inflight service', 'cleanliness': 'Cleanliness',
+    'depDelay': 'Departure Delay in Minutes', 'arrDelay': 'Arrival Delay in Minutes',
+}
+
+# Form values passed through as text; every other field is an integer
+TEXT_COLUMNS = ['Gender', 'Customer Type', 'Type of Travel', 'Class']
+
+def parse_form(data):
+    """CSV column -> value for one /predict body (KeyError / ValueError for a bad field)"""
+    return {col: data[field] if col in TEXT_COLUMNS else int(data[field])
+            for field, col in FORM_FIELDS.items()}
+
+# ==========================================
+# COLUMN HELPERS
+# ==========================================
+def to_numeric_column(values):
+    """Convert a column to float, flagging values that are not numbers"""
+    import pandas as pd  # imported on the first batch, not at app start-up
+
+    numeric = pd.to_numeric(values, errors='coerce')
+    numeric = np.asarray(numeric, dtype=np.float64)
+    invalid = np.isnan(numeric) & np.asarray(pd.notna(values))
+    return numeric, invalid
+
+# ==========================================
+# BATCH PREDICTION
+# ==========================================
+def encode_columns(df, encoder_tables, binner, feature_columns):
+    """Build the encoded feature matrix and, per column, a mask of rows that failed"""
+    X = np.zeros((len(df), len(feature_columns)), dtype=np.float64)
+    invalid = {}
+
+    for j, col in enumerate(feature_columns):
+        values = df[col]
+        if col in BINNED_COLUMNS:
+            numeric, bad = to_numeric_column(values)
+            positions = binner.positions(col, numeric)
+            lap('binning')
+            X[:, j], unseen = encoder_tables.encode_bins(col, positions)
+            invalid[col] = bad | (positions < 0) | unseen
+        elif col in encoder_tables:
+            X[:, j], invalid[col] = encoder_tables.encode_column(col, values)
+        else:
+            X[:, j], invalid[col] = to_numeric_column(values)
+        lap('encoding')
+
+    return X, invalid
+
+def encode_frame(df, encoder_tables, binner, feature_columns):
+    """
+    Build the encoded feature matrix and a mask of rows that failed.
+
+    A numeric column that pandas read as text (one 'abc' cell in a CSV)
+    holds strings in every row, which the row-by-row path cannot compare
+    with numbers, so all of its rows are flagged rather than coerced.
+    """
+    from pandas.api.types import is_numeric_dtype
+
+    X, invalid_by_column = encode_columns(df, encoder_tables, binner, feature_columns)
+    invalid = np.zeros(len(df), dtype=bool)
+    for col, mask in invalid_by_column.items():
+        numeric = col in BINNED_COLUMNS or col not in encoder_tables
+        if numeric and not is_numeric_dtype(df[col]):
+            invalid[:] = True
+        invalid |= mask
+    return X, invalid
+
+def score_row(row, model, encoder_tables, binner, feature_columns, find_reason):
+    """Make a prediction for a single CSV row (the row-by-row fallback of predict_frame)"""
+    try:
+        # Apply binning
+        age_binned = binner.label('Age', row['Age'])
+        distance_binned = binner.label('Flight Distance', row['Flight Distance'])
+        dep_delay_binned = binner.label('Departure Delay in Minutes', row['Departure Delay in Minutes'])
+        arr_delay_binned = binner.label('Arrival Delay in Minutes', row['Arrival Delay in Minutes'])
+
+        # Create input dictionary
+        sample_input = {
+            'Gender': row['Gender'],
+            'Customer Type': row['Customer Type'],
+            'Age': age_binned,
+            'Type of Travel': row['Type of Travel'],
+            'Class': row['Class'],
+            'Flight Distance': distance_binned,
+            'Inflight wifi service': row['Inflight wifi service'],
+            'Departure/Arrival time convenient': row['Departure/Arrival time convenient'],
+            'Ease of Online booking': row['Ease of Online booking'],
+            'Gate location': row['Gate location'],
+            'Food and drink': row['Food and drink'],
+            'Online boarding': row['Online boarding'],
+            'Seat comfort': row['Seat comfort'],
+            'Inflight entertainment': row['Inflight entertainment'],
+            'On-board service': row['On-board service'],
+            'Leg room service': row['Leg room service'],
+            'Baggage handling': row['Baggage handling'],
+            'Checkin service': row['Checkin service'],
+            'Inflight service': row['Inflight service'],
+            'Cleanliness': row['Cleanliness'],
+            'Departure Delay in Minutes': dep_delay_binned,
+            'Arrival Delay in Minutes': arr_delay_binned
+        }
+
+        # Encode input
+        encoded_sample = []
+        for col in feature_columns:
+            val = sample_input.get(col)
+            if col in encoder_tables:
+                val_encoded = encoder_tables.encode(col, val)
+                encoded_sample.append(val_encoded)
+            else:
+                encoded_sample.append(val)
+
+        # Make prediction
+        pred_val = model.predict([encoded_sample])[0]
+        final_result = encoder_tables.decode('satisfaction', int(pred_val))
+
+        # Find main reason for the prediction
+        main_reason = find_reason(row, final_result)
+
+        return {
+            'result': final_result,
+            'reason': main_reason
+        }
+
+    except Exception as e:
+        return {
+            'result': f'Error: {str(e)}',
+            'reason': 'N/A'
+        }
+
+def predict_frame(df, model, encoder_tables, binner, feature_columns,
+                  predict_row, explain, cache=None, explain_path=None):
+    """
+    Predict every row of df with a single model.predict call.
+
+    Stage times (binning, encoding, predict, reasons, paths, fallback)
+    are charged to the current request's metrics, if any.
+
+    explain(frame, results) returns the reason for every encoded row at
+    once (see reasons.main_reasons). Rows that cannot be encoded (unseen
+    categories, missing or non-numeric values, every row of a numeric
+    column read as text; see encode_frame) are handed to predict_row
+    so they get exactly the same per-row result as the row-by-row path,
+    error message included. When a PredictionCache is given, duplicate
+    and previously seen feature vectors skip the model. With
+    explain_path(X) (see reasons.DecisionPathExplainer) every result also
+    gets a 'path' entry, 'N/A' for rows that could not be encoded.
+    """
+    X, invalid = encode_frame(df, encoder_tables, binner, feature_columns)
+    valid_idx = np.flatnonzero(~invalid)
+
+    results = np.empty(len(df), dtype=object)
+    reasons = np.empty(len(df), dtype=object)
+    paths = np.full(len(df), 'N/A', dtype=object)
+
+    if len(valid_idx) > 0:
+        if cache is not None:
+            pred_vals = cache.predict_many(model.predict, X[valid_idx]).astype(int)
+        else:
+            pred_vals = model.predict(X[valid_idx]).astype(int)
+        results[valid_idx] = encoder_tables.decode_column('satisfaction', pred_vals).tolist()
+        lap('predict')
+
+        reasons[valid_idx] = explain(df.iloc[valid_idx], results[valid_idx])
+        lap('reasons')
+        if explain_path is not None:
+            paths[valid_idx] = explain_path(X[valid_idx])
+            lap('paths')
+
+    for i in np.flatnonzero(invalid):
+        prediction = predict_row(df.iloc[i])
+        results[i] = prediction['result']
+        reasons[i] = prediction['reason']
+    lap('fallback')
+
+    if explain_path is not None:
+        return [{'result': r, 'reason': m, 'path': p} for r, m, p in zip(results, reasons, paths)]
+    return [{'result': r, 'reason': m} for r, m in zip(results, reasons)]
+
+# ==========================================
+# STREAMING
+# ==========================================
+def stream_csv(chunks, score_chunk, totals=None):
+    """
+    Score CSV chunks one at a time and yield the annotated CSV text.
+
+    Only one chunk is held in memory at a time. The aggregate counts are
+    written as a final comment line, e.g.
+    "# total=10, satisfied=4, dissatisfied=6, errors=0", which pandas
+    skips when reading back with read_csv(..., comment='#').
+    """
+    def scored():
+        for chunk in chunks:
+            lap('read_csv')
+            yield chunk, score_chunk(chunk)
+
+    return stream_scored_csv(scored(), totals)
+
+def stream_scored_csv(scored, totals=None):
+    """stream_csv for (chunk, predictions) pairs scored elsewhere; totals (a dict) is filled in"""
+    totals = {} if totals is None else totals
+    totals.update({'total': 0, 'satisfied': 0, 'dissatisfied': 0, 'errors': 0})
+    header = True
+
+    for chunk, predictions in scored:
+        results = [p['result'] for p in predictions]
+        chunk['Prediction'] = results
+        chunk['Main Reason'] = [p['reason'] for p in predictions]
+        if predictions and 'path' in predictions[0]:
+            chunk['Decision Path'] = [p['path'] for p in predictions]
+
+        totals['total'] += len(results)
+        totals['satisfied'] += results.count('satisfied')
+        totals['dissatisfied'] += results.count('neutral or dissatisfied')
+        totals['errors'] += sum(1 for r in results if str(r).startswith('Error'))
+
+        text = chunk.to_csv(index=False, header=header)
+        header = False
+        lap('serialize')
+        yield text
+        lap('send')
+
+    yield '# ' + ', '.join(f'{k}={v}' for k, v in totals.items()) + '\n'
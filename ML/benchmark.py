@@ -0,0 +1,386 @@
+"""
+Benchmark suite for the whole pipeline
+Times every stage (CSV load, binning, encoding, /predict, /predict_batch,
+explanations, training and evaluation) on fixed-seed synthetic data, writes
+the results as JSON and compares them with a stored baseline
+
+Usage: python benchmark.py [--output benchmarks/latest.json]
+                           [--baseline benchmarks/baseline.json] [--threshold 0.25]
+                           [--save-baseline] [--only predict_batch_1k,binning]
+                           [--skip train_chefboost] [--sizes 1000,100000,1000000]
+       (exit code 1 when a stage is more than --threshold slower than the baseline)
+"""
+
+import argparse
+import io
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from batch_engine import FORM_FIELDS, TEXT_COLUMNS
+
+BENCHMARK_DIR = 'benchmarks'
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, 'latest.json')
+
+SEED = 42
+DATA_ROWS = 100000
+BATCH_SIZES = [1000, 100000, 1000000]
+SINGLE_REQUESTS = 1000
+REASON_ROWS = 20000
+TRAIN_ROWS = 20000
+
+# A stage regresses when it is this much slower than the baseline...
+REGRESSION_THRESHOLD = 0.25
+# ...and slower by at least this many seconds (sub-millisecond stages are noise)
+MIN_REGRESSION_SECONDS = 0.002
+
+# Chefboost writes outputs/rules/rules.py under the working directory and
+# imports it back from sys.path, so it is timed in a child process that runs
+# in a scratch directory (the repo's own rules.py is never touched). It
+# trains exactly like train_model.py, parallel on every CPU
+CHEFBOOST_CODE = '''
+import multiprocessing, os, pickle, sys, time, warnings
+warnings.filterwarnings('ignore')
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('spawn', force=True)
+    try:
+        import chefboost
+    except ImportError:
+        sys.exit(2)
+    from train_model import train_chefboost
+
+    with open('train.pkl', 'rb') as f:
+        df_train = pickle.load(f)
+    start = time.perf_counter()
+    train_chefboost(df_train, os.cpu_count() or 1)
+    print('seconds=%r' % (time.perf_counter() - start))
+'''
+
+# ==========================================
+# SYNTHETIC DATA
+# ==========================================
+def synthetic_raw(n_rows, seed=SEED):
+    """n_rows complete raw rows with a satisfaction label, from synthetic_data.py (fixed seed)"""
+    from synthetic_data import PassengerDistribution
+
+    raw = PassengerDistribution.defaults().frame(n_rows, seed=seed, label=True)
+    # The defaults leave a few Arrival Delay gaps; every stage here wants complete rows
+    return resize(raw.dropna(ignore_index=True), n_rows)
+
+def resize(raw, n_rows):
+    """raw repeated or cut to exactly n_rows rows"""
+    import pandas as pd
+
+    copies = -(-n_rows // len(raw))
+    frame = pd.concat([raw] * copies, ignore_index=True) if copies > 1 else raw
+    return frame.head(n_rows)
+
+def size_label(n_rows):
+    """1000 -> '1k', 1000000 -> '1m'"""
+    for unit, suffix in ((1000000, 'm'), (1000, 'k')):
+        if n_rows >= unit and n_rows % unit == 0:
+            return f'{n_rows // unit}{suffix}'
+    return str(n_rows)
+
+def predict_requests(raw):
+    """One /predict JSON body per row of a raw frame"""
+    records = raw[list(FORM_FIELDS.values())].to_dict('records')
+    return [{field: row[col] if col in TEXT_COLUMNS else int(row[col])
+             for field, col in FORM_FIELDS.items()} for row in records]
+
+# ==========================================
+# TIMING
+# ==========================================
+def measure(fn, repeats=5, setup=None, warm_up=True):
+    """
+    Best and mean wall time of fn() over repeats runs.
+
+    setup() runs untimed before each run; with warm_up, fn also runs once
+    untimed first so lazy imports and first-call caches are not counted.
+    """
+    if warm_up:
+        if setup is not None:
+            setup()
+        fn()
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+class Suite:
+    """Runs the selected stages and collects their timings"""
+
+    def __init__(self, only=None, skip=()):
+        self.only = set(only) if only else None
+        self.skip = set(skip)
+        self.stages = {}
+
+    def wanted(self, name):
+        return name not in self.skip and (self.only is None or name in self.only)
+
+    def run(self, name, fn, rows, repeats=5, setup=None):
+        """Time fn (best of repeats, after one warm-up run unless repeats is 1)"""
+        if self.wanted(name):
+            best, mean = measure(fn, repeats, setup, warm_up=repeats > 1)
+            self.record(name, best, rows, repeats, mean)
+
+    def record(self, name, seconds, rows, repeats=1, mean=None):
+        self.stages[name] = {
+            'seconds': round(seconds, 6),
+            'mean_seconds': round(seconds if mean is None else mean, 6),
+            'repeats': repeats,
+            'rows': rows,
+            'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+        }
+        print(f'   {name:<22} {seconds:9.4f}s {rows:>10,} rows '
+              f'{rows / seconds if seconds > 0 else 0:>12,.0f} rows/sec')
+
+def calibration_workload(seed=SEED):
+    """Fixed mix of interpreter and NumPy work that tracks how fast this machine is right now"""
+    rng = np.random.default_rng(seed)
+    np.sort(rng.random(500000))
+    counts = {}
+    for i in range(200000):
+        counts[i % 97] = counts.get(i % 97, 0) + 1
+    return counts
+
+# ==========================================
+# STAGES
+# ==========================================
+def bench_preprocessing(suite, raw, workdir):
+    """CSV load, training-side encode and serving-side binning / label encoding"""
+    from binning import BINNED_COLUMNS, Binner
+    from lookup_tables import EncoderTables
+    from preprocessing import encode, read_raw
+
+    path = os.path.join(workdir, 'data.csv')
+    raw.to_csv(path, index=False)
+    suite.run('csv_load', lambda: read_raw(path), len(raw))
+
+    loaded = read_raw(path)
+    suite.run('training_encode', lambda: encode(loaded), len(raw))
+    _, label_encoders, binning_config = encode(loaded)
+
+    binner = Binner(binning_config)
+    suite.run('binning', lambda: [binner.positions(col, raw[col]) for col in BINNED_COLUMNS],
+              len(raw))
+
+    tables = EncoderTables(label_encoders, binning_config)
+    categorical = ['Gender', 'Customer Type', 'Type of Travel', 'Class']
+    suite.run('label_encoding', lambda: [tables.encode_column(col, raw[col]) for col in categorical],
+              len(raw))
+
+def bench_app(suite, raw, sizes):
+    """Single-row /predict and /predict_batch through the Flask test client"""
+    import app_fast
+
+    if app_fast.models.current is None:
+        print('⚠️  app_fast has no model (run train_model_fast.py); skipping the app stages')
+        return
+    client = app_fast.app.test_client()
+    # Every repeat starts cold, so the prediction cache cannot answer for the model
+    clear_cache = app_fast.models.current.cache.clear
+
+    bodies = predict_requests(raw.head(SINGLE_REQUESTS))
+
+    def single():
+        for body in bodies:
+            result = client.post('/predict', json=body).get_json()
+            assert result['success'], result
+
+    suite.run('predict_single', single, len(bodies), setup=clear_cache)
+
+    for size in sizes:
+        name = f'predict_batch_{size_label(size)}'
+        if not suite.wanted(name):
+            continue
+        data = resize(raw, size).drop(columns=['satisfaction']).to_csv(index=False).encode()
+
+        def batch():
+            result = client.post('/predict_batch',
+                                 data={'file': (io.BytesIO(data), 'batch.csv')}).get_json()
+            assert result['success'], result
+
+        suite.run(name, batch, size, repeats=5 if size <= 100000 else 1, setup=clear_cache)
+
+def bench_reasons(suite, raw):
+    """find_main_reason row by row against the vectorized main_reasons"""
+    from reasons import find_main_reason, main_reasons
+
+    frame = raw.head(REASON_ROWS)
+    labels = frame['satisfaction'].tolist()
+    records = frame.to_dict('records')
+    suite.run('find_main_reason',
+              lambda: [find_main_reason(row, label) for row, label in zip(records, labels)],
+              len(frame))
+    suite.run('main_reasons', lambda: main_reasons(frame, labels), len(frame))
+
+def bench_training(suite, raw, workdir):
+    """sklearn, native ID3 and Chefboost training, then test-set evaluation"""
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.tree import DecisionTreeClassifier
+
+    from compiled_tree import compile_model
+    from id3_trainer import ID3Trainer
+    from preprocessing import encode
+
+    frame, _, _ = encode(raw.head(TRAIN_ROWS).astype({
+        col: 'category' for col in ['Gender', 'Customer Type', 'Type of Travel', 'Class',
+                                    'satisfaction']}))
+    X = frame.drop(columns=['satisfaction'])
+    y = frame['satisfaction']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    df_train = X_train.copy()
+    df_train['satisfaction'] = y_train.astype(str)
+
+    model = DecisionTreeClassifier(criterion='entropy', random_state=42)
+    suite.run('train_sklearn', lambda: model.fit(X_train, y_train), len(X_train))
+    suite.run('train_id3_native', lambda: ID3Trainer().fit(df_train, 'satisfaction', rules_file=None),
+              len(X_train))
+
+    if suite.wanted('train_chefboost'):
+        with open(os.path.join(workdir, 'train.pkl'), 'wb') as f:
+            pickle.dump(df_train, f)
+        env = dict(os.environ, PYTHONPATH=os.getcwd())
+        result = subprocess.run([sys.executable, '-c', CHEFBOOST_CODE], cwd=workdir, env=env,
+                                capture_output=True, text=True)
+        seconds = [line for line in result.stdout.splitlines() if line.startswith('seconds=')]
+        if result.returncode == 2:
+            print('⚠️  chefboost not installed; skipping train_chefboost')
+        elif result.returncode != 0 or not seconds:
+            print(f'❌ train_chefboost failed: {result.stderr.strip().splitlines()[-1:]}')
+        else:
+            suite.record('train_chefboost', float(seconds[-1].split('=')[1]), len(X_train))
+
+    model.fit(X_train, y_train)
+    tree = compile_model(model)
+    X_matrix = X_test.to_numpy(dtype=np.float64)
+    suite.run('evaluate_sklearn', lambda: accuracy_score(y_test, model.predict(X_test)), len(X_test))
+    suite.run('evaluate_compiled', lambda: accuracy_score(y_test, tree.predict(X_matrix).astype(int)),
+              len(X_test))
+
+# ==========================================
+# BASELINE COMPARISON
+# ==========================================
+def compare(stages, baseline, threshold, min_seconds=MIN_REGRESSION_SECONDS, normalize=True):
+    """
+    (name, baseline seconds, seconds, ratio, regressed) for stages in both runs.
+
+    With normalize, each ratio is divided by the calibration stage's ratio,
+    so a machine that is uniformly slower (another host, a busy VM) does not
+    read as a regression of every stage.
+    """
+    speed = 1.0
+    if normalize and 'calibration' in stages and 'calibration' in baseline:
+        speed = stages['calibration']['seconds'] / baseline['calibration']['seconds']
+
+    rows = []
+    for name, stage in stages.items():
+        if name not in baseline or name == 'calibration':
+            continue
+        before, now = baseline[name]['seconds'], stage['seconds']
+        ratio = now / before / speed if before > 0 else float('inf')
+        regressed = ratio > 1 + threshold and now - before * speed > min_seconds
+        rows.append((name, before, now, ratio, regressed))
+    return rows
+
+def environment():
+    import pandas as pd
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'batch_processes': os.environ.get('BATCH_PROCESSES', os.cpu_count()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the ML pipeline')
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='allowed slowdown against the baseline (0.25 = 25%%)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='also write the results to --baseline')
+    parser.add_argument('--only', default='', help='comma-separated stage names')
+    parser.add_argument('--skip', default='', help='comma-separated stage names')
+    parser.add_argument('--sizes', default=','.join(map(str, BATCH_SIZES)),
+                        help='/predict_batch sizes in rows')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--no-normalize', action='store_true',
+                        help='compare raw times instead of scaling by the calibration stage')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    suite = Suite(only=[s for s in args.only.split(',') if s],
+                  skip=[s for s in args.skip.split(',') if s])
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+
+    print(f'🚀 Benchmark (seed {args.seed}, {DATA_ROWS:,} rows of synthetic data)')
+    raw = synthetic_raw(DATA_ROWS, args.seed)
+    start = time.perf_counter()
+    calibration = measure(calibration_workload)[0]
+    with tempfile.TemporaryDirectory() as workdir:
+        bench_preprocessing(suite, raw, workdir)
+        bench_app(suite, raw, sizes)
+        bench_reasons(suite, raw)
+        bench_training(suite, raw, workdir)
+    # Timed before and after the stages; the faster run is kept
+    suite.record('calibration', min(calibration, measure(calibration_workload)[0]), 1)
+    print(f'⏱️  {len(suite.stages)} stages in {time.perf_counter() - start:.1f}s')
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': args.seed,
+        'environment': environment(),
+        'stages': suite.stages,
+    }
+    outputs = [args.output] + ([args.baseline] if args.save_baseline else [])
+    for path in outputs:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'💾 Saved {path}')
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        if not args.save_baseline:
+            print(f'⚠️  No baseline at {args.baseline}; run with --save-baseline to store one')
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['stages']
+    rows = compare(suite.stages, baseline, args.threshold, normalize=not args.no_normalize)
+    mode = 'raw times' if args.no_normalize else 'normalized by calibration'
+    print(f'\n📊 Against {args.baseline} (threshold +{args.threshold:.0%}, {mode})')
+    print(f'   {"stage":<22} {"baseline":>9} {"now":>9} {"ratio":>7}')
+    for name, before, now, ratio, regressed in rows:
+        print(f'   {name:<22} {before:9.4f} {now:9.4f} {ratio:7.2f} {"❌" if regressed else "✅"}')
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f'❌ Regressed: {", ".join(regressions)}')
+        return 1
+    print('✅ No stage regressed')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
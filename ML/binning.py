@@ -0,0 +1,57 @@
+"""
+Shared binning for Age, Flight Distance and delay columns
+Uses the edges saved in binning_config.pkl with the same right-closed
+intervals as pd.cut in train_model.py / train_model_fast.py
+(parity is checked by tests/test_binning.py)
+"""
+
+import bisect
+
+import numpy as np
+
+# Columns binned before encoding, with the binning_config keys they use
+BINNED_COLUMNS = {
+    'Age': ('bins_age', 'labels_age'),
+    'Flight Distance': ('bins_dist', 'labels_dist'),
+    'Departure Delay in Minutes': ('bins_delay', 'labels_delay'),
+    'Arrival Delay in Minutes': ('bins_delay', 'labels_delay'),
+}
+
+class Binner:
+    """
+    Bin values exactly like pd.cut(values, bins, right=True).
+
+    A value v falls in bin i when bins[i] < v <= bins[i + 1]. Values
+    outside the training edges are clipped into the first or last bin
+    (pd.cut would return NaN, which the encoders never saw), and missing
+    values are rejected.
+    """
+
+    def __init__(self, binning_config):
+        self.edges = {}
+        self.labels = {}
+        for col, (bins_key, labels_key) in BINNED_COLUMNS.items():
+            self.edges[col] = [float(b) for b in binning_config[bins_key]]
+            self.labels[col] = list(binning_config[labels_key])
+        self._edge_arrays = {col: np.asarray(edges) for col, edges in self.edges.items()}
+
+    def position(self, col, value):
+        """Return the bin position of a single value"""
+        if value != value:
+            raise ValueError(f'Missing value for {col}')
+        edges = self.edges[col]
+        position = bisect.bisect_left(edges, value) - 1
+        return min(max(position, 0), len(edges) - 2)
+
+    def label(self, col, value):
+        """Return the bin label of a single value"""
+        return self.labels[col][self.position(col, value)]
+
+    def positions(self, col, values):
+        """Return the bin position of every value (missing values get -1)"""
+        values = np.asarray(values, dtype=np.float64)
+        edges = self._edge_arrays[col]
+        positions = np.searchsorted(edges, values, side='left') - 1
+        np.clip(positions, 0, len(edges) - 2, out=positions)
+        positions[np.isnan(values)] = -1
+        return positions
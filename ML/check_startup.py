@@ -0,0 +1,76 @@
+"""
+Cold-start check for the Flask apps
+Imports each app in a fresh interpreter with -X importtime and fails if the
+import exceeds its time budget or loads a module that the single-row
+/predict path must not need (pandas is only imported by batch requests)
+
+Usage: python check_startup.py [app_fast app]   (exit code 1 on failure)
+"""
+
+import os
+import subprocess
+import sys
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import time allowed for each app module, in milliseconds
+IMPORT_BUDGET_MS = 450
+
+# Imports are timed a few times and the fastest run is kept to reduce noise
+RUNS = 3
+
+FORBIDDEN_MODULES = ['pandas', 'sklearn', 'chefboost']
+
+# Without its bundle an app falls back to the pickles (and sklearn)
+APP_BUNDLES = {
+    'app_fast': 'model.bundle',
+    'app': 'id3_model.bundle',
+}
+
+CHILD_CODE = '''
+import sys
+import {app}
+print('loaded:' + ','.join(m for m in {forbidden!r} if m in sys.modules))
+'''
+
+def measure(app, cwd=None):
+    """Return (cumulative import time in ms, forbidden modules loaded) for one app run in cwd"""
+    code = CHILD_CODE.format(app=app, forbidden=FORBIDDEN_MODULES)
+    # The apps load their bundles from the working directory, which need not be this one
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        p for p in [ML_DIR, os.environ.get('PYTHONPATH')] if p))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True)
+
+    import_ms = None
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if line.startswith('import time:') and len(parts) == 3 and parts[2].strip() == app:
+            import_ms = int(parts[1]) / 1000
+    loaded = result.stdout.strip().splitlines()[-1].split(':', 1)[1]
+    return import_ms, [m for m in loaded.split(',') if m]
+
+def best_of_runs(app, cwd=None):
+    """(fastest import time in ms, forbidden modules loaded) over RUNS imports"""
+    runs = [measure(app, cwd) for _ in range(RUNS)]
+    return min(import_ms for import_ms, _ in runs), sorted({m for _, loaded in runs for m in loaded})
+
+def check(app):
+    """Print the result for one app and return True if it is within budget"""
+    if not os.path.exists(APP_BUNDLES[app]):
+        print(f'❌ {app}: {APP_BUNDLES[app]} not found '
+              f'(build it with python model_bundle.py or a train script)')
+        return False
+
+    best, loaded = best_of_runs(app)
+    ok = best <= IMPORT_BUDGET_MS and not loaded
+    status = '✅' if ok else '❌'
+    print(f'{status} {app}: import {best:.0f} ms (budget {IMPORT_BUDGET_MS} ms)'
+          + (f', loaded {", ".join(loaded)}' if loaded else ''))
+    return ok
+
+if __name__ == '__main__':
+    apps = sys.argv[1:] or list(APP_BUNDLES)
+    results = [check(app) for app in apps]
+    sys.exit(0 if all(results) else 1)
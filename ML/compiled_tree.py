@@ -0,0 +1,256 @@
+"""
+Flat array-based decision tree evaluator
+Compiles Chefboost ID3 rules (outputs/rules/rules.py) or a sklearn
+DecisionTreeClassifier into NumPy node arrays that can be scored
+without importing chefboost or sklearn
+
+Usage: python compiled_tree.py outputs/rules/rules.py id3_tree.npz
+"""
+
+import ast
+import inspect
+import re
+import sys
+
+import numpy as np
+
+# ==========================================
+# COMPILED TREE
+# ==========================================
+class CompiledTree:
+    """
+    Binary decision tree stored as flat node arrays.
+
+    Internal node i sends a row to left[i] when X[feature[i]] <= threshold[i]
+    and to right[i] otherwise (missing values follow missing_left[i]).
+    Leaves have feature == -1 and predict classes[value[i]].
+    """
+
+    def __init__(self, feature, threshold, left, right, value, classes,
+                 missing_left=None, feature_names=None):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.int32)
+        self.classes = np.asarray(classes)
+        if missing_left is None:
+            missing_left = np.zeros(len(self.feature), dtype=bool)
+        self.missing_left = np.asarray(missing_left, dtype=bool)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Return the leaf index reached by every row of X, level by level"""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        node = np.zeros(len(X), dtype=np.int32)
+        active = np.arange(len(X))
+
+        while active.size:
+            current = node[active]
+            split = self.feature[current] >= 0
+            active, current = active[split], current[split]
+            if not active.size:
+                break
+
+            x = X[active, self.feature[current]]
+            go_left = x <= self.threshold[current]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left[missing] = self.missing_left[current[missing]]
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+
+        return node
+
+    def predict(self, X):
+        """Predict every row of X with one vectorized walk"""
+        return self.classes[self.value[self.apply(X)]]
+
+    def predict_one(self, sample):
+        """Predict a single encoded sample without allocating arrays"""
+        node = 0
+        while self.feature[node] >= 0:
+            x = float(sample[self.feature[node]])
+            if x != x:
+                go_left = self.missing_left[node]
+            else:
+                go_left = x <= self.threshold[node]
+            node = self.left[node] if go_left else self.right[node]
+        return self.classes[self.value[node]]
+
+    def save(self, path):
+        """Save the node arrays to an .npz file"""
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'classes': self.classes,
+            'missing_left': self.missing_left,
+        }
+        if self.feature_names is not None:
+            arrays['feature_names'] = np.asarray(self.feature_names)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load node arrays saved with save()"""
+        with np.load(path, allow_pickle=False) as data:
+            feature_names = data['feature_names'].tolist() if 'feature_names' in data else None
+            return cls(data['feature'], data['threshold'], data['left'], data['right'],
+                       data['value'], data['classes'], data['missing_left'], feature_names)
+
+# ==========================================
+# SKLEARN TREES
+# ==========================================
+def compile_sklearn_tree(model):
+    """Compile a fitted sklearn DecisionTreeClassifier"""
+    tree = model.tree_
+    feature = np.where(tree.children_left < 0, -1, tree.feature)
+    value = np.argmax(tree.value[:, 0, :], axis=1)
+    missing_left = getattr(tree, 'missing_go_to_left', None)
+    feature_names = getattr(model, 'feature_names_in_', None)
+    return CompiledTree(feature, tree.threshold, tree.children_left, tree.children_right,
+                        value, model.classes_, missing_left, feature_names)
+
+# ==========================================
+# CHEFBOOST RULES
+# ==========================================
+def _parse_condition(test):
+    """Turn obj[i] <op> k into (feature, threshold, then_goes_left)"""
+    if not (isinstance(test, ast.Compare) and len(test.ops) == 1
+            and isinstance(test.left, ast.Subscript)):
+        raise ValueError(f'Unsupported rule condition: {ast.unparse(test)}')
+
+    feature = ast.literal_eval(test.left.slice)
+    k = float(ast.literal_eval(test.comparators[0]))
+    op = test.ops[0]
+
+    # x < k and x >= k become x <= k' with k' the float just below k
+    if isinstance(op, ast.LtE):
+        return feature, k, True
+    if isinstance(op, ast.Gt):
+        return feature, k, False
+    if isinstance(op, ast.Lt):
+        return feature, np.nextafter(k, -np.inf), True
+    if isinstance(op, ast.GtE):
+        return feature, np.nextafter(k, -np.inf), False
+    raise ValueError(f'Unsupported rule condition: {ast.unparse(test)}')
+
+def _build_block(stmts, bounds):
+    """
+    Build a nested ('leaf', value) / ('split', f, t, left, right) tree
+    from a list of statements, dropping arms that the enclosing
+    conditions (tracked in bounds as feature -> (low, high]) make
+    unreachable.
+    """
+    for i, stmt in enumerate(stmts):
+        if isinstance(stmt, ast.Return):
+            return ('leaf', ast.literal_eval(stmt.value))
+        if not isinstance(stmt, ast.If):
+            continue
+
+        feature, threshold, then_left = _parse_condition(stmt.test)
+        low, high = bounds.get(feature, (-np.inf, np.inf))
+
+        # An if without else falls through to the statements after it
+        then_stmts, else_stmts = stmt.body, stmt.orelse or stmts[i + 1:]
+        left_stmts, right_stmts = ((then_stmts, else_stmts) if then_left
+                                   else (else_stmts, then_stmts))
+
+        # Outcome already decided by an ancestor split
+        if high <= threshold:
+            return _build_block(left_stmts, bounds)
+        if low >= threshold:
+            return _build_block(right_stmts, bounds)
+
+        left = _build_block(left_stmts, {**bounds, feature: (low, threshold)})
+        right = _build_block(right_stmts, {**bounds, feature: (threshold, high)})
+        if left[0] == 'leaf' and left == right:
+            return left
+        return ('split', feature, threshold, left, right)
+
+    raise ValueError('Rule block has no reachable return statement')
+
+def compile_rules(source):
+    """Compile the source code of a Chefboost findDecision function"""
+    try:
+        module = ast.parse(source)
+    except SyntaxError as e:
+        raise ValueError(f'Cannot parse Chefboost rules: {e}') from e
+
+    functions = [node for node in module.body
+                 if isinstance(node, ast.FunctionDef) and node.name == 'findDecision']
+    if not functions:
+        raise ValueError('No findDecision function found in rules')
+    root = _build_block(functions[0].body, {})
+
+    # Chefboost documents the feature order as "#obj[0]: Gender, obj[1]: ..."
+    header = re.search(r'def findDecision\(obj\):\s*#(.*)', source)
+    feature_names = None
+    if header:
+        names = re.split(r'obj\[\d+\]:', header.group(1))
+        feature_names = [name.strip().rstrip(',').strip() for name in names if name.strip()]
+
+    # Flatten depth-first into node arrays
+    leaf_values = []
+    feature, threshold, left, right, value = [], [], [], [], []
+
+    def add(node):
+        index = len(feature)
+        feature.append(-1)
+        threshold.append(0.0)
+        left.append(-1)
+        right.append(-1)
+        value.append(0)
+        if node[0] == 'leaf':
+            if node[1] not in leaf_values:
+                leaf_values.append(node[1])
+            value[index] = leaf_values.index(node[1])
+        else:
+            _, f, t, l, r = node
+            feature[index] = f
+            threshold[index] = t
+            left[index] = add(l)
+            right[index] = add(r)
+        return index
+
+    add(root)
+
+    # Keep classes sorted like sklearn's classes_
+    classes = sorted(leaf_values)
+    remap = np.array([classes.index(v) for v in leaf_values])
+    return CompiledTree(feature, threshold, left, right, remap[value],
+                        classes, feature_names=feature_names)
+
+def compile_rules_file(path):
+    """Compile a Chefboost rules.py file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return compile_rules(f.read())
+
+def compile_model(model):
+    """Compile a sklearn tree or a Chefboost model dict"""
+    if isinstance(model, CompiledTree):
+        return model
+    if hasattr(model, 'tree_'):
+        return compile_sklearn_tree(model)
+    if isinstance(model, dict) and model.get('trees'):
+        return compile_rules(inspect.getsource(model['trees'][0]))
+    raise ValueError(f'Cannot compile model of type {type(model).__name__}')
+
+# ==========================================
+# MAIN
+# ==========================================
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage: python compiled_tree.py <rules.py> <output.npz>')
+        sys.exit(1)
+
+    compiled = compile_rules_file(sys.argv[1])
+    compiled.save(sys.argv[2])
+    print(f'✅ Compiled {compiled.node_count} nodes into {sys.argv[2]}')
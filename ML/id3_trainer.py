@@ -0,0 +1,210 @@
+"""
+Native ID3 trainer reproducing Chefboost's tree and rules.py output
+Information gain is computed from per-feature (value x class) histograms
+built with np.bincount instead of filtering DataFrames at every split
+
+Usage: python train_model.py --native
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+from compiled_tree import compile_rules
+
+# Chefboost evaluates every distinct value as a threshold up to this many
+MAX_EXACT_THRESHOLDS = 20
+
+# ==========================================
+# ENTROPY HELPERS
+# ==========================================
+def _entropy(counts):
+    """Entropy of class counts, summed in Chefboost's value_counts order"""
+    instances = sum(counts)
+    entropy = 0
+    for count in sorted((c for c in counts if c > 0), reverse=True):
+        probability = count / instances
+        entropy = entropy - probability * math.log(probability, 2)
+    return entropy
+
+def _ordered(first_counts, second_counts, first_is_seen_first):
+    """Order two branches like value_counts (by count, ties by first appearance)"""
+    n1, n2 = sum(first_counts), sum(second_counts)
+    if n1 > n2 or (n1 == n2 and first_is_seen_first):
+        return [0, 1]
+    return [1, 0]
+
+def _majority(counts, labels):
+    """Most frequent class code (ties go to the class seen first, like value_counts)"""
+    best = max(counts)
+    winners = [i for i, c in enumerate(counts) if c == best]
+    if len(winners) == 1:
+        return winners[0]
+    seen, first_index = np.unique(labels, return_index=True)
+    first_seen = dict(zip(seen.tolist(), first_index.tolist()))
+    return min(winners, key=first_seen.__getitem__)
+
+# ==========================================
+# ID3 TRAINER
+# ==========================================
+class ID3Trainer:
+    """
+    Build a Chefboost-compatible ID3 tree over numeric features.
+
+    Every feature is treated as continuous (as Chefboost does for non-object
+    columns): the best <= threshold is chosen by information gain, the
+    feature is then split in two and dropped from the branches below.
+
+    rules.py is written the way Chefboost writes it: with parallel=True
+    (what train_model.py uses) tab-indented with one-line else returns,
+    otherwise indented by three spaces with the else return on its own line.
+    """
+
+    def __init__(self, max_depth=5, parallel=True):
+        self.max_depth = max_depth
+        self.parallel = parallel
+
+    def fit(self, df, target_label, rules_file='outputs/rules/rules.py'):
+        """Train on df, write Chefboost-style rules and return the CompiledTree"""
+        self.feature_names = [c for c in df.columns if c != target_label]
+        labels, y = np.unique(df[target_label].astype(str).to_numpy(), return_inverse=True)
+        self.labels = labels.tolist()
+        self.y = y
+        self.n_classes = len(labels)
+
+        # Per-feature value codes so node histograms are one bincount each;
+        # columns keep their own dtype so thresholds print like Chefboost's
+        self.raw, self.values, self.codes = [], [], []
+        for col in self.feature_names:
+            column = df[col].to_numpy()
+            values, codes = np.unique(column, return_inverse=True)
+            self.raw.append(column)
+            self.values.append(values)
+            self.codes.append(codes)
+
+        header = 'def findDecision(obj): #' + ', '.join(
+            f'obj[{i}]: {name}' for i, name in enumerate(self.feature_names))
+        self.lines = [header]
+        self._build(np.arange(len(df)), list(range(len(self.feature_names))), root=1)
+        source = '\n'.join(self.lines) + '\n'
+
+        if rules_file:
+            os.makedirs(os.path.dirname(rules_file), exist_ok=True)
+            with open(rules_file, 'w', encoding='UTF-8') as f:
+                f.write(source)
+
+        self.rules = source
+        return compile_rules(source)
+
+    # ------------------------------------------
+    def _class_counts(self, idx):
+        return np.bincount(self.y[idx], minlength=self.n_classes).tolist()
+
+    def _histogram(self, idx, feature):
+        """(distinct value x class) counts of one feature over the node rows"""
+        n_values = len(self.values[feature])
+        flat = self.codes[feature][idx] * self.n_classes + self.y[idx]
+        hist = np.bincount(flat, minlength=n_values * self.n_classes)
+        return hist.reshape(n_values, self.n_classes)
+
+    def _thresholds(self, idx, feature, present):
+        """Candidate thresholds, following Chefboost's processContinuousFeatures"""
+        values = self.values[feature][present]
+        if len(values) <= MAX_EXACT_THRESHOLDS:
+            return list(values)
+
+        column = self.raw[feature][idx].astype(np.float64)
+        mean, std = column.mean(), column.std()
+        low, high = values[0], values[-1]
+        thresholds = [low, high, mean]
+        for scale in range(-3, 4):
+            if low < mean + scale * std < high:
+                thresholds.append(mean + scale * std)
+        return sorted(thresholds)
+
+    def _best_split(self, idx, feature, entropy):
+        """Return (gain, threshold, left_mask) for the best <= split of a feature"""
+        hist = self._histogram(idx, feature)
+        present = hist.sum(axis=1) > 0
+        thresholds = self._thresholds(idx, feature, present)
+        cumulative = np.cumsum(hist, axis=0)
+        total = cumulative[-1].tolist()
+        instances = len(idx)
+
+        def split_counts(threshold):
+            position = np.searchsorted(self.values[feature], threshold, side='right') - 1
+            left = cumulative[position].tolist() if position >= 0 else [0] * self.n_classes
+            right = [t - l for t, l in zip(total, left)]
+            return left, right
+
+        if len(thresholds) == 1:
+            threshold = thresholds[0]
+        else:
+            gains = []
+            for threshold in thresholds[:-1]:
+                left, right = split_counts(threshold)
+                p1, p2 = sum(left) / instances, sum(right) / instances
+                gains.append(entropy - p1 * _entropy(left) - p2 * _entropy(right))
+            threshold = thresholds[gains.index(max(gains))]
+
+        # Gain of the resulting two-valued feature, in value_counts order
+        left, right = split_counts(threshold)
+        left_mask = self.raw[feature][idx] <= threshold
+        branches = [left, right]
+        gain = entropy * 1
+        for b in _ordered(left, right, bool(left_mask[0])):
+            if sum(branches[b]) > 0:
+                gain = gain - (sum(branches[b]) / instances) * _entropy(branches[b])
+        return gain, threshold, left_mask
+
+    def _build(self, idx, features, root):
+        """Append the rules of one node (Chefboost's buildDecisionTree)"""
+        counts = self._class_counts(idx)
+        entropy = _entropy(counts)
+
+        splits = [self._best_split(idx, f, entropy) for f in features]
+        gains = [s[0] for s in splits]
+        winner = gains.index(max(gains))
+        feature = features[winner]
+        _, threshold, left_mask = splits[winner]
+        remaining = [f for f in features if f != feature]
+
+        branch_rows = [idx[left_mask], idx[~left_mask]]
+        rules = [f'<={threshold}', f'>{threshold}']
+        order = _ordered(self._class_counts(branch_rows[0]), self._class_counts(branch_rows[1]),
+                         bool(left_mask[0]))
+        order = [b for b in order if len(branch_rows[b]) > 0]
+
+        indent = ('\t' if self.parallel else '   ') * root
+        inner = indent + ('\t' if self.parallel else '   ')
+        descriptor = {
+            'feature': self.feature_names[feature],
+            'instances': len(idx),
+            'metric_value': round(entropy, 4),
+            'depth': root,
+        }
+        self.lines.append(indent + '# ' + json.dumps(descriptor))
+
+        for i, b in enumerate(order):
+            rows = branch_rows[b]
+            keyword = 'if' if i == 0 else 'elif'
+            self.lines.append(f'{indent}{keyword} obj[{feature}]{rules[b]}:')
+
+            sub_counts = self._class_counts(rows)
+            if sum(1 for c in sub_counts if c > 0) == 1:
+                decision = int(self.y[rows[0]])
+            elif not remaining or root >= self.max_depth:
+                decision = _majority(sub_counts, self.y[rows])
+            else:
+                self._build(rows, remaining, root + 1)
+                continue
+            self.lines.append(f"{inner}return '{self.labels[decision]}'")
+
+        else_return = f"return '{self.labels[_majority(counts, self.y[idx])]}'"
+        if self.parallel:
+            self.lines.append(f'{indent}else: {else_return}')
+        else:
+            self.lines.append(f'{indent}else:')
+            self.lines.append(inner + else_return)
@@ -0,0 +1,268 @@
+"""
+Background batch-scoring jobs
+An uploaded CSV is spooled to disk and scored chunk by chunk on a small
+worker pool while clients poll its progress; job state lives in SQLite so
+every serve.py worker process can answer for every job
+
+Job states: queued -> running -> done | failed
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_engine import stream_csv
+
+JOBS_DIR = 'jobs'
+
+# Annotated rows kept in the job summary for the web page (like /predict_batch)
+PREVIEW_ROWS = 100
+
+# Finished jobs and their result files are removed after this long
+JOB_MAX_AGE_SECONDS = 24 * 3600
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    pid INTEGER,
+    created REAL,
+    started REAL,
+    finished REAL,
+    rows_total INTEGER,
+    rows_done INTEGER DEFAULT 0,
+    error TEXT,
+    summary TEXT
+)
+'''
+
+def count_rows(path, block_size=1 << 20):
+    """Data rows in a CSV, counted by newlines (an estimate if fields contain newlines)"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+# ==========================================
+# JOB STATE
+# ==========================================
+class JobStore:
+    """
+    Job rows in a SQLite file shared by all worker processes.
+
+    The directory and database are created on first use, so importing an
+    app that never receives a job leaves no files behind.
+    """
+
+    def __init__(self, directory=JOBS_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, 'jobs.db')
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _create(self):
+        if self._ready:
+            return
+        with self._lock:
+            if not self._ready:
+                os.makedirs(self.directory, exist_ok=True)
+                with self._connect() as db:
+                    db.execute('PRAGMA journal_mode=WAL')
+                    db.execute(SCHEMA)
+                self._ready = True
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _execute(self, sql, params=()):
+        self._create()
+        db = self._connect()
+        try:
+            with db:
+                return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def upload_path(self, job_id):
+        self._create()
+        return os.path.join(self.directory, f'{job_id}.upload.csv')
+
+    def result_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.csv')
+
+    def create(self, job_id, filename, rows_total):
+        self._execute('INSERT INTO jobs (id, status, filename, pid, created, rows_total) '
+                      'VALUES (?, ?, ?, ?, ?, ?)',
+                      (job_id, 'queued', filename, os.getpid(), time.time(), rows_total))
+
+    def update(self, job_id, **fields):
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        self._execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def get(self, job_id):
+        rows = self._execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        return dict(rows[0]) if rows else None
+
+    def remove_older_than(self, max_age):
+        """Delete finished jobs (and their files) older than max_age seconds"""
+        cutoff = time.time() - max_age
+        rows = self._execute("SELECT id FROM jobs WHERE status IN ('done', 'failed') "
+                             'AND finished < ?', (cutoff,))
+        for row in rows:
+            for path in (self.result_path(row['id']), self.upload_path(row['id'])):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._execute('DELETE FROM jobs WHERE id = ?', (row['id'],))
+        return len(rows)
+
+# ==========================================
+# WORKER POOL
+# ==========================================
+class JobQueue:
+    """
+    Runs scoring jobs on a thread pool inside the process that accepted them.
+
+    The pool is created on first use, and again after a fork, so every
+    serve.py worker owns its own threads.
+    """
+
+    def __init__(self, store, workers=1, chunk_size=20000):
+        self.store = store
+        self.workers = max(int(workers), 1)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='batch-job')
+                self._pid = os.getpid()
+            return self._pool
+
+    def new_job_id(self):
+        return uuid.uuid4().hex
+
+    def submit(self, job_id, filename, score_chunk, chunk_size=None):
+        """
+        Queue the CSV already saved at store.upload_path(job_id).
+
+        score_chunk(df) returns one {'result', 'reason'[, 'path']} dict per
+        row, exactly as predict_frame does.
+        """
+        self.store.remove_older_than(JOB_MAX_AGE_SECONDS)
+        upload = self.store.upload_path(job_id)
+        self.store.create(job_id, filename, count_rows(upload))
+        self._executor().submit(self._run, job_id, score_chunk, chunk_size or self.chunk_size)
+        return job_id
+
+    def _run(self, job_id, score_chunk, chunk_size):
+        import pandas as pd
+
+        store = self.store
+        upload, result = store.upload_path(job_id), store.result_path(job_id)
+        store.update(job_id, status='running', started=time.time())
+
+        counts = {'total': 0, 'satisfied': 0, 'dissatisfied': 0, 'errors': 0}
+        preview = []
+
+        def score(df):
+            predictions = score_chunk(df)
+            results = [p['result'] for p in predictions]
+            counts['total'] += len(results)
+            counts['satisfied'] += results.count('satisfied')
+            counts['dissatisfied'] += results.count('neutral or dissatisfied')
+            counts['errors'] += sum(1 for r in results if str(r).startswith('Error'))
+
+            if len(preview) < PREVIEW_ROWS:
+                head = df.head(PREVIEW_ROWS - len(preview)).copy()
+                head['Prediction'] = results[:len(head)]
+                head['Main Reason'] = [p['reason'] for p in predictions[:len(head)]]
+                if predictions and 'path' in predictions[0]:
+                    head['Decision Path'] = [p['path'] for p in predictions[:len(head)]]
+                preview.extend(head.to_dict('records'))
+
+            store.update(job_id, rows_done=counts['total'])
+            return predictions
+
+        try:
+            with pd.read_csv(upload, chunksize=chunk_size) as reader, \
+                    open(result + '.tmp', 'w', encoding='utf-8', newline='') as out:
+                for text in stream_csv(reader, score):
+                    out.write(text)
+            os.replace(result + '.tmp', result)
+
+            total = counts['total']
+            summary = {
+                'success': True,
+                **counts,
+                'satisfied_percentage': round(counts['satisfied'] / total * 100, 2) if total else 0,
+                'dissatisfied_percentage': round(counts['dissatisfied'] / total * 100, 2) if total else 0,
+                'results': preview,
+                'showing': len(preview),
+            }
+            store.update(job_id, status='done', finished=time.time(), rows_total=total,
+                         summary=json.dumps(summary, default=str))
+        except Exception as e:
+            if os.path.exists(result + '.tmp'):
+                os.remove(result + '.tmp')
+            store.update(job_id, status='failed', finished=time.time(), error=str(e))
+        finally:
+            if os.path.exists(upload):
+                os.remove(upload)
+
+    # ------------------------------------------
+    def status(self, job_id):
+        """Progress of a job (rows done, rows/sec, ETA) and its summary once done, or None"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+
+        status, error = job['status'], job['error']
+        if status in ('queued', 'running') and not _alive(job['pid']):
+            status, error = 'failed', 'The worker process running this job exited'
+
+        now = job['finished'] or time.time()
+        elapsed = now - job['started'] if job['started'] else 0.0
+        rows_done, rows_total = job['rows_done'] or 0, job['rows_total'] or 0
+        rate = rows_done / elapsed if elapsed > 0 else 0.0
+        eta = max(rows_total - rows_done, 0) / rate if status == 'running' and rate > 0 else None
+
+        info = {
+            'job_id': job_id,
+            'status': status,
+            'filename': job['filename'],
+            'rows_done': rows_done,
+            'rows_total': rows_total,
+            'progress': round(min(rows_done / rows_total, 1.0), 4) if rows_total else 0.0,
+            'rows_per_sec': round(rate, 1),
+            'elapsed_seconds': round(elapsed, 2),
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+            'error': error,
+        }
+        if status == 'done':
+            info['summary'] = json.loads(job['summary'])
+        return info
@@ -0,0 +1,161 @@
+"""
+Load test for serve.py
+Starts the production server, drives /predict from concurrent client
+processes for a fixed time and reports requests/sec, latency percentiles
+and per-worker memory (RSS, and PSS which splits shared pages between
+the processes that map them; Linux only)
+
+Usage: python load_test.py [--app app_fast] [--workers 2] [--threads 8]
+                           [--clients 8] [--duration 10] [--port 8765]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# A typical single-prediction request (the same fields as the web form)
+SAMPLE_REQUEST = {
+    'gender': 'Male', 'customerType': 'Loyal Customer', 'age': 35,
+    'travelType': 'Business travel', 'class': 'Business', 'distance': 1200,
+    'wifi': 4, 'timeConv': 3, 'booking': 4, 'gate': 3, 'food': 4, 'boarding': 5,
+    'seat': 4, 'entertainment': 5, 'onboard': 4, 'legroom': 4, 'baggage': 4,
+    'checkin': 3, 'service': 4, 'cleanliness': 4, 'depDelay': 10, 'arrDelay': 5,
+}
+
+# ==========================================
+# CLIENTS
+# ==========================================
+def run_client(port, duration, seed):
+    """POST /predict in a loop; return (latencies in seconds, error count)"""
+    rng = np.random.default_rng(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        # Vary the ratings so the prediction cache does not answer everything
+        sample = dict(SAMPLE_REQUEST, wifi=int(rng.integers(0, 6)),
+                      boarding=int(rng.integers(0, 6)), seat=int(rng.integers(0, 6)))
+        body = json.dumps(sample)
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 200:
+                errors += 1
+                continue
+        except OSError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+# ==========================================
+# SERVER PROCESSES
+# ==========================================
+def get_json(port, path):
+    """GET a JSON endpoint of the running server, or None on failure"""
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', path)
+        return json.loads(conn.getresponse().read())
+    except (OSError, ValueError):
+        return None
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def child_pids(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+def memory_kb(pid):
+    """Return (rss, pss) in KB from /proc/<pid>/smaps_rollup, or None"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['Rss'].split()[0]), int(fields['Pss'].split()[0])
+    except (OSError, KeyError, ValueError):
+        return None
+
+# ==========================================
+# MAIN
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description='Load test serve.py on /predict')
+    parser.add_argument('--app', default='app_fast', choices=['app_fast', 'app'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--app', args.app, '--host', '127.0.0.1',
+         '--port', str(args.port), '--workers', str(args.workers),
+         '--threads', str(args.threads)],
+        stdout=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(args.port):
+            print('❌ Server did not start')
+            sys.exit(1)
+
+        print(f'🚀 {args.app}: {args.workers} workers x {args.threads} threads, '
+              f'{args.clients} clients for {args.duration:.0f}s')
+        run_client(args.port, 1.0, seed=0)  # warm up
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.starmap(run_client, [(args.port, args.duration, seed)
+                                                for seed in range(1, args.clients + 1)])
+        elapsed = time.perf_counter() - start
+
+        latencies = np.concatenate([np.asarray(r[0]) for r in results]) * 1000
+        errors = sum(r[1] for r in results)
+        print(f'✅ {len(latencies)} requests in {elapsed:.1f}s = '
+              f'{len(latencies) / elapsed:,.0f} requests/sec ({errors} errors)')
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            print(f'⏱️  latency p50 {p50:.1f} ms, p90 {p90:.1f} ms, p99 {p99:.1f} ms')
+
+        # Counters are per worker; this is whichever worker answers
+        batching = get_json(args.port, '/batcher_stats')
+        if batching and batching.get('enabled'):
+            print(f"📊 micro-batching (one worker): {batching['batches']} batches, "
+                  f"mean {batching['mean_batch_size']} rows, "
+                  f"max queue depth {batching['max_queue_depth']}")
+
+        print('💾 Memory (RSS / PSS):')
+        for role, pid in [('master', server.pid)] + [('worker', p) for p in child_pids(server.pid)]:
+            usage = memory_kb(pid)
+            if usage is None:
+                print(f'   {role} {pid}: unavailable (needs Linux /proc)')
+            else:
+                print(f'   {role} {pid}: {usage[0] / 1024:.1f} MB / {usage[1] / 1024:.1f} MB')
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Precomputed lookup tables for the fitted LabelEncoders
+Compiles label_encoders.pkl into plain dict/array tables at startup so
+encoding a value is a single dict lookup instead of LabelEncoder.transform
+"""
+
+import numpy as np
+
+from binning import BINNED_COLUMNS
+
+class EncoderTables:
+    """
+    Dict/array lookup tables built from a dict of fitted LabelEncoders.
+
+    codes[col] maps str(value) -> integer code, classes[col] maps the code
+    back to its label, and bin_codes[col] maps the position of a bin in
+    binning_config straight to the encoded code of its label.
+    """
+
+    def __init__(self, label_encoders, binning_config=None):
+        self._build({col: encoder.classes_ for col, encoder in label_encoders.items()},
+                    binning_config)
+
+    @classmethod
+    def from_vocabularies(cls, vocabularies, binning_config=None):
+        """Build the tables from {col: classes} lists instead of fitted encoders"""
+        tables = cls.__new__(cls)
+        tables._build(vocabularies, binning_config)
+        return tables
+
+    def _build(self, vocabularies, binning_config):
+        self.codes = {}
+        self.classes = {}
+        for col, classes in vocabularies.items():
+            labels = [str(c) for c in classes]
+            self.codes[col] = {label: i for i, label in enumerate(labels)}
+            self.classes[col] = labels
+
+        self.bin_codes = {}
+        if binning_config is not None:
+            for col, (_, labels_key) in BINNED_COLUMNS.items():
+                if col in self.codes:
+                    lookup = self.codes[col]
+                    self.bin_codes[col] = np.array(
+                        [lookup.get(str(label), -1) for label in binning_config[labels_key]])
+
+        # Object arrays for vectorized decoding
+        self._class_arrays = {col: np.array(labels, dtype=object)
+                              for col, labels in self.classes.items()}
+
+    def __contains__(self, col):
+        return col in self.codes
+
+    # ==========================================
+    # SINGLE VALUES
+    # ==========================================
+    def encode(self, col, value):
+        """Encode one value (same error message as LabelEncoder.transform)"""
+        try:
+            return self.codes[col][str(value)]
+        except KeyError:
+            raise ValueError(f'y contains previously unseen labels: {str(value)!r}') from None
+
+    def decode(self, col, code):
+        """Decode one integer code back to its label"""
+        return self.classes[col][code]
+
+    # ==========================================
+    # WHOLE COLUMNS
+    # ==========================================
+    def encode_column(self, col, values):
+        """Encode a column, returning codes and a mask of unseen values"""
+        import pandas as pd  # imported on the first batch, not at app start-up
+
+        codes = pd.Series(values).astype(str).map(self.codes[col])
+        invalid = codes.isna().to_numpy()
+        return codes.fillna(0).to_numpy(dtype=np.float64), invalid
+
+    def encode_bins(self, col, positions):
+        """Encode bin positions, returning codes and a mask of unknown labels"""
+        codes = self.bin_codes[col][positions]
+        return codes.astype(np.float64), codes < 0
+
+    def decode_column(self, col, codes):
+        """Decode an array of integer codes back to labels"""
+        return self._class_arrays[col][np.asarray(codes, dtype=np.intp)]
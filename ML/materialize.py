@@ -0,0 +1,198 @@
+"""
+Materialize a trained tree into a precomputed decision table
+Every feature is a small integer code after binning, so the tree can be
+rewritten as a reduced multiway decision diagram over the discrete
+feature space and stored in one memory-mappable int32 array
+
+Usage: python materialize.py model.pkl        (writes model_table.npy)
+       python materialize.py id3_tree.npz     (writes id3_tree_table.npy)
+"""
+
+import os
+import pickle
+import sys
+
+import numpy as np
+
+# Service ratings are 0 (not rated) to 5 stars
+RATING_DOMAIN = 6
+
+# ==========================================
+# TABLE FORMAT
+# ==========================================
+# table[0]                 number of features n
+# table[1 : 1 + n]         domain size of each feature
+# table[1 + n]             root pointer
+# table[p]                 feature tested by the node at offset p
+# table[p + 1 + v]         pointer followed when that feature equals v
+# A pointer >= 0 is a node offset, a pointer < 0 is the leaf -(class + 1)
+
+class DecisionTable:
+    """Answer predictions from a materialized table with index lookups only"""
+
+    def __init__(self, table):
+        self.table = table
+        n_features = int(table[0])
+        self.domains = np.asarray(table[1:1 + n_features])
+        self.root = int(table[1 + n_features])
+        # Zero-copy view that indexes to plain ints for the scalar path
+        self._cells = memoryview(np.ascontiguousarray(table))
+        self._domain_list = self.domains.tolist()
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a table written by materialize()"""
+        return cls(np.load(path, mmap_mode='r'))
+
+    def lookup(self, sample):
+        """Return the class of one sample, or None if it is outside the table"""
+        values = []
+        for value, domain in zip(sample, self._domain_list):
+            code = int(value) if value == value else -1
+            if not (0 <= code < domain) or code != value:
+                return None
+            values.append(code)
+
+        cells = self._cells
+        pointer = self.root
+        while pointer >= 0:
+            pointer = cells[pointer + 1 + values[cells[pointer]]]
+        return -pointer - 1
+
+    def predict(self, X):
+        """Return (classes, covered) for every row; uncovered rows get -1"""
+        X = np.asarray(X, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            covered = ((X >= 0) & (X < self.domains) & (X == np.floor(X))).all(axis=1)
+        codes = np.where(np.isnan(X), 0, X).astype(np.int64)
+
+        table = np.asarray(self.table)
+        pointer = np.full(len(X), self.root, dtype=np.int64)
+        pointer[~covered] = -1
+        active = np.flatnonzero(pointer >= 0)
+        while active.size:
+            nodes = pointer[active]
+            features = table[nodes]
+            pointer[active] = table[nodes + 1 + codes[active, features]]
+            active = active[pointer[active] >= 0]
+
+        classes = np.where(covered, -pointer - 1, -1)
+        return classes, covered
+
+class TablePredictor:
+    """Serve from a DecisionTable (if any), falling back to the model outside it"""
+
+    def __init__(self, table, fallback):
+        self.table = table
+        self.fallback = fallback
+
+    def predict(self, X):
+        if self.table is None:
+            return self.fallback.predict(X)
+        X = np.asarray(X, dtype=np.float64)
+        classes, covered = self.table.predict(X)
+        if not covered.all():
+            classes[~covered] = self.fallback.predict(X[~covered])
+        return classes
+
+    def predict_one(self, sample):
+        value = self.table.lookup(sample) if self.table is not None else None
+        if value is None:
+            return self.fallback.predict([sample])[0]
+        return value
+
+# ==========================================
+# MATERIALIZATION
+# ==========================================
+def materialize(tree, domains):
+    """
+    Rewrite a CompiledTree as a reduced multiway decision diagram.
+
+    Each chain of splits on the same feature becomes one node with a
+    child pointer per value of that feature. Branches ruled out by
+    ancestor splits are pruned, nodes whose children are all the same
+    are skipped, and identical nodes are shared.
+    """
+    table = [len(domains)] + [int(d) for d in domains] + [0]
+    shared = {}
+
+    def leaf(node):
+        return -(int(tree.classes[tree.value[node]]) + 1)
+
+    def build(node, bounds):
+        if tree.feature[node] < 0:
+            return leaf(node)
+
+        f = int(tree.feature[node])
+        intervals = []
+
+        # Collect the value intervals of f and the subtree each one reaches
+        def collect(n, low, high):
+            if tree.feature[n] != f:
+                intervals.append((low, high, n))
+                return
+            t = tree.threshold[n]
+            if high <= t:
+                collect(tree.left[n], low, high)
+            elif low >= t:
+                collect(tree.right[n], low, high)
+            else:
+                collect(tree.left[n], low, t)
+                collect(tree.right[n], t, high)
+
+        low, high = bounds.get(f, (-np.inf, np.inf))
+        collect(node, low, high)
+        children = [build(n, {**bounds, f: (lo, hi)}) for lo, hi, n in intervals]
+        if len(set(children)) == 1:
+            return children[0]
+
+        # Values outside the reachable bounds take the nearest interval
+        entries = []
+        for v in range(int(domains[f])):
+            for (_, hi, _), child in zip(intervals, children):
+                if v <= hi:
+                    break
+            entries.append(child)
+
+        key = (f, tuple(entries))
+        if key not in shared:
+            shared[key] = len(table)
+            table.append(f)
+            table.extend(entries)
+        return shared[key]
+
+    table[1 + len(domains)] = build(0, {})
+    return np.asarray(table, dtype=np.int32)
+
+def feature_domains(feature_columns, label_encoders):
+    """Number of codes each encoded feature can take"""
+    return [len(label_encoders[col].classes_) if col in label_encoders else RATING_DOMAIN
+            for col in feature_columns]
+
+# ==========================================
+# MAIN
+# ==========================================
+if __name__ == '__main__':
+    from compiled_tree import CompiledTree, compile_model
+
+    if len(sys.argv) != 2:
+        print('Usage: python materialize.py <model.pkl | id3_tree.npz>')
+        sys.exit(1)
+
+    model_path = sys.argv[1]
+    if model_path.endswith('.npz'):
+        tree = CompiledTree.load(model_path)
+    else:
+        with open(model_path, 'rb') as f:
+            tree = compile_model(pickle.load(f))
+
+    with open('label_encoders.pkl', 'rb') as f:
+        label_encoders = pickle.load(f)
+    with open('feature_columns.pkl', 'rb') as f:
+        feature_columns = pickle.load(f)
+
+    table = materialize(tree, feature_domains(feature_columns, label_encoders))
+    output_path = os.path.splitext(model_path)[0] + '_table.npy'
+    np.save(output_path, table)
+    print(f'✅ Materialized {tree.node_count} tree nodes into {output_path} '
+          f'({table.nbytes / 1024:.1f} KB)')
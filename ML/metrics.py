@@ -0,0 +1,410 @@
+"""
+Request metrics for the Flask apps
+Per-stage latency histograms, request / row / error counters, the model
+version served and prediction cache statistics, rendered in the Prometheus text format for /metrics and
+summarised per request in a Server-Timing response header
+
+A request's time is split into stages with lap(name): each call charges the
+time since the previous lap (or the start of the request) to name, so view
+code and the batch engine mark stage boundaries in place. Outside an
+instrumented request lap() does nothing.
+
+Under serve.py every worker keeps its own counters and publishes a snapshot
+to a shared directory once a second while it is busy; /metrics adds up the
+snapshots of all live workers.
+
+Usage: python metrics.py [--requests 100000]   (per-request instrumentation overhead)
+"""
+
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+NAMESPACE = 'satisfaction'
+
+# Upper bounds (seconds) of the latency histogram buckets: single-row stages
+# take microseconds, large batches seconds
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Seconds between the snapshots a serve.py worker publishes
+PUBLISH_INTERVAL = 1.0
+
+# Name (without the namespace) -> (type, help)
+METRICS = {
+    'requests_total': ('counter', 'Requests handled, by route and HTTP status'),
+    'request_duration_seconds': ('histogram', 'Request latency, by route'),
+    'stage_duration_seconds': ('histogram', 'Time spent in each stage of a request, by route and stage'),
+    'rows_total': ('counter', 'Rows scored, by route'),
+    'row_errors_total': ('counter', 'Rows that could not be scored, by route'),
+    'errors_total': ('counter', 'Failed requests, by route and error kind'),
+    'model_requests_total': ('counter', 'Requests answered, by route and model version'),
+    'model_info': ('gauge', 'Processes serving each model version'),
+    'model_swaps_total': ('counter', 'Model versions swapped in while serving'),
+    'cache_hits_total': ('counter', "Prediction cache hits (the served version's cache)"),
+    'cache_misses_total': ('counter', "Prediction cache misses (the served version's cache)"),
+    'cache_entries': ('gauge', "Feature vectors held by the served version's prediction cache"),
+    'micro_batches_total': ('counter', 'Batches scored by the /predict micro-batcher'),
+    'micro_batch_rows_total': ('counter', 'Rows scored by the /predict micro-batcher'),
+    'micro_batch_queue_depth': ('gauge', 'Single-row predictions waiting for the micro-batcher'),
+}
+
+_local = threading.local()
+
+# ==========================================
+# PER-REQUEST TIMING
+# ==========================================
+class RequestTimer:
+    """Stage times, rows and errors of one request (or one streamed body / job chunk)"""
+
+    __slots__ = ('route', 'start', 'stages', 'rows', 'row_errors', 'errors', 'model_version', '_last')
+
+    def __init__(self, route):
+        self.route = route
+        self.start = self._last = time.perf_counter()
+        self.stages = {}
+        self.rows = 0
+        self.row_errors = 0
+        self.errors = []
+        self.model_version = None
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def server_timing(self, total):
+        """Server-Timing header value, durations in milliseconds"""
+        parts = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in self.stages.items()]
+        parts.append(f'total;dur={total * 1000:.3f}')
+        return ', '.join(parts)
+
+def lap(name):
+    """Charge the time since the previous lap of this thread's request to stage name"""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.lap(name)
+
+def add_rows(rows, errors=0):
+    """Count rows scored (and rows that failed) by this thread's request"""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.rows += rows
+        timer.row_errors += errors
+
+def note_error(kind):
+    """Count a failed request under kind (an exception class name or a short reason)"""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.errors.append(kind)
+
+def note_model_version(version):
+    """Record which model version answered this thread's request"""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.model_version = version
+
+# ==========================================
+# REGISTRY
+# ==========================================
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """
+    Thread-safe counters and histograms for one app.
+
+    Created when the app is imported; serve.py does that in its master
+    process, so workers recognise themselves by a different pid and publish
+    their snapshots (from a background thread) for /metrics to merge. The
+    snapshot directory is keyed on the app name as well as the master pid,
+    so two apps imported in one process never merge each other's counters.
+    """
+
+    def __init__(self, app, namespace=NAMESPACE, buckets=LATENCY_BUCKETS):
+        self.app = app
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [count per bucket..., count above, sum]
+        self._collectors = []
+        self._changes = 0
+
+        self._master_pid = os.getpid()
+        self._publisher_pid = None
+        self._publisher_lock = threading.Lock()
+        self.directory = os.path.join(tempfile.gettempdir(),
+                                      f'{namespace}-metrics-{app}-{self._master_pid}')
+        atexit.register(self._remove_directory)
+
+    # ------------------------------------------
+    def _inc(self, name, labels, value=1):
+        """Add to a counter (caller holds the lock)"""
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name, labels, seconds):
+        """Add one observation to a histogram (caller holds the lock)"""
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def begin(self, route):
+        """Start timing a request on this thread"""
+        timer = _local.timer = RequestTimer(route)
+        return timer
+
+    def finish(self, status=None):
+        """
+        Record this thread's request and return its Server-Timing value.
+
+        With status None (a streamed body or a background job chunk) the
+        stages, rows and errors are recorded but no request is counted.
+        """
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            return None
+        _local.timer = None
+        total = time.perf_counter() - timer.start
+
+        route = (('route', timer.route),)
+        with self._lock:
+            if status is not None:
+                self._inc('requests_total', route + (('status', str(status)),))
+                self._observe('request_duration_seconds', route, total)
+                if timer.model_version is not None:
+                    self._inc('model_requests_total', route + (('version', timer.model_version),))
+            for name, seconds in timer.stages.items():
+                self._observe('stage_duration_seconds', route + (('stage', name),), seconds)
+            if timer.rows:
+                self._inc('rows_total', route, timer.rows)
+            if timer.row_errors:
+                self._inc('row_errors_total', route, timer.row_errors)
+            for kind in timer.errors:
+                self._inc('errors_total', route + (('kind', kind),))
+            self._changes += 1
+
+        if self._publisher_pid != os.getpid() and os.getpid() != self._master_pid:
+            self._start_publisher()
+        return timer.server_timing(total)
+
+    def discard(self):
+        """Forget this thread's request without recording it"""
+        _local.timer = None
+
+    @contextmanager
+    def timing(self, route):
+        """Time work done outside a request handler (a streamed body, a job chunk)"""
+        self.begin(route)
+        try:
+            yield
+        finally:
+            self.finish()
+
+    def add_collector(self, collect):
+        """Register collect() -> iterable of (name, labels dict, value), read on every snapshot"""
+        self._collectors.append(collect)
+
+    # ------------------------------------------
+    def snapshot(self):
+        """Every series as plain lists (JSON-serialisable, summed across workers)"""
+        with self._lock:
+            counters = [[name, list(labels), value]
+                        for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(labels), list(values)]
+                          for (name, labels), values in self._histograms.items()]
+        for collect in self._collectors:
+            for name, labels, value in collect():
+                counters.append([name, sorted(labels.items()), value])
+        return {'counters': counters, 'histograms': histograms}
+
+    def _start_publisher(self):
+        with self._publisher_lock:
+            if self._publisher_pid != os.getpid():
+                # A forked serve.py worker: the thread is started once per process
+                threading.Thread(target=self._publish_loop, name='metrics-publisher',
+                                 daemon=True).start()
+                self._publisher_pid = os.getpid()
+
+    def _publish_loop(self):
+        published = None
+        while True:
+            time.sleep(PUBLISH_INTERVAL)
+            if self._changes != published:
+                published = self._changes
+                try:
+                    self.publish()
+                except OSError:
+                    pass
+
+    def publish(self):
+        """Write this worker's snapshot where the other workers' /metrics can read it"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def _worker_snapshots(self):
+        """Snapshots of every live worker, dropping the files of workers that exited"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            if not _alive(int(name[:-len('.json')])):
+                os.remove(path)
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                pass
+        return snapshots
+
+    def _remove_directory(self):
+        if os.getpid() == self._master_pid:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    # ------------------------------------------
+    def render(self):
+        """Prometheus text exposition for this process, or summed over every serve.py worker"""
+        if os.getpid() == self._master_pid:
+            snapshots = [self.snapshot()]
+        else:
+            self.publish()
+            snapshots = self._worker_snapshots()
+
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                total = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    total[i] += value
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = counters if kind != 'histogram' else histograms
+            keys = sorted(key for key in series if key[0] == name)
+            if not keys:
+                continue
+            full_name = f'{self.namespace}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for key in keys:
+                labels = key[1]
+                if kind != 'histogram':
+                    lines.append(f'{full_name}{_labels(labels)} {_number(series[key])}')
+                    continue
+                values = series[key]
+                cumulative = 0
+                for bound, count in zip(self.buckets, values):
+                    cumulative += count
+                    lines.append(f'{full_name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+                cumulative += values[len(self.buckets)]
+                lines.append(f'{full_name}_bucket{_labels(labels, [("le", "+Inf")])} {cumulative}')
+                lines.append(f'{full_name}_sum{_labels(labels)} {_number(values[-1])}')
+                lines.append(f'{full_name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+# ==========================================
+# COLLECTORS
+# ==========================================
+def cache_collector(get_cache):
+    """
+    Collector for the hit / miss counters and size of the PredictionCache
+    returned by get_cache() (each model version has its own, so the counters
+    restart when a new version is swapped in)
+    """
+    def collect():
+        cache = get_cache()
+        if cache is None:
+            return
+        stats = cache.stats()
+        yield 'cache_hits_total', {}, stats['hits']
+        yield 'cache_misses_total', {}, stats['misses']
+        yield 'cache_entries', {}, stats['size']
+    return collect
+
+def batcher_collector(batcher):
+    """Collector for a MicroBatcher's batch / row counters and queue depth"""
+    def collect():
+        stats = batcher.stats()
+        yield 'micro_batches_total', {}, stats['batches']
+        yield 'micro_batch_rows_total', {}, stats['rows']
+        yield 'micro_batch_queue_depth', {}, stats['queue_depth']
+    return collect
+
+def model_collector(swapper):
+    """Collector for the model version a ModelSwapper serves and its swap count"""
+    def collect():
+        current = swapper.current
+        if current is not None:
+            yield 'model_info', {'version': current.version}, 1
+        yield 'model_swaps_total', {}, swapper.swaps
+    return collect
+
+# ==========================================
+# MAIN
+# ==========================================
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Measure the per-request cost of the instrumentation')
+    parser.add_argument('--requests', type=int, default=100000)
+    args = parser.parse_args()
+
+    metrics = Metrics('benchmark', namespace='benchmark')
+    stages = ['parse', 'binning', 'encoding', 'predict', 'serialize']
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        metrics.begin('predict')
+        for name in stages:
+            lap(name)
+        add_rows(1)
+        metrics.finish(200)
+    elapsed = time.perf_counter() - start
+
+    text = metrics.render()
+    ok = f'benchmark_requests_total{{route="predict",status="200"}} {args.requests}' in text
+    print(f'⏱️  {elapsed / args.requests * 1e6:.1f} µs per request '
+          f'({len(stages)} stages, counters and Server-Timing header)')
+    print(f"{'✅' if ok else '❌'} /metrics counted {args.requests:,} requests")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,207 @@
+"""
+Micro-batching for single-row predictions
+Concurrent /predict requests hand their encoded vector to one dispatcher
+thread, which waits up to max_wait_ms (or until max_batch_size rows are
+queued), scores the whole batch with one vectorized predict call and
+resolves each request's Future with its own row of the result
+
+Usage: python micro_batcher.py [--bundle model.bundle] [--threads 32]
+                               [--requests 20000] [--batch-size 64]
+                               [--wait-ms 0] [--tree]
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+class Histogram:
+    """Counts of observed values in power-of-two buckets (1, 2, 3-4, 5-8, ...)"""
+
+    def __init__(self, max_value):
+        self.bounds = [1]
+        while self.bounds[-1] < max_value:
+            self.bounds.append(self.bounds[-1] * 2)
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+
+    def as_dict(self):
+        """Bucket label -> count, e.g. {'1': 10, '2': 4, '3-4': 7, ..., '>64': 0}"""
+        labels = []
+        low = 0
+        for bound in self.bounds:
+            labels.append(str(bound) if bound == low + 1 else f'{low + 1}-{bound}')
+            low = bound
+        labels.append(f'>{low}')
+        return dict(zip(labels, self.counts))
+
+class MicroBatcher:
+    """
+    Collect concurrent single-row predictions into one vectorized call.
+
+    predict_fn takes a 2D float64 matrix and returns one value per row
+    (a TablePredictor, CompiledTree or sklearn model's predict). It can
+    also be given per call: rows queued with different functions (model
+    versions around a hot-swap) are never scored together. The
+    dispatcher thread is started on first use, and again after a fork,
+    so every serve.py worker runs its own.
+    """
+
+    def __init__(self, predict_fn=None, max_batch_size=64, max_wait_ms=0.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait_ms = max(float(max_wait_ms), 0.0)
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.SimpleQueue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Histogram(self.max_batch_size)
+        self.queue_depths = Histogram(self.max_batch_size * 4)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # After a fork the parent's thread is gone: start from scratch
+                self._reset()
+                threading.Thread(target=self._run, name='micro-batcher', daemon=True).start()
+                self._pid = os.getpid()
+
+    # ------------------------------------------
+    def submit(self, sample, predict_fn=None):
+        """Queue one encoded vector (scored by predict_fn, default self.predict_fn); return a Future"""
+        self._ensure_started()
+        future = Future()
+        # Rows waiting once this one is queued, so an idle batcher records 1
+        depth = self._queue.qsize() + 1
+        with self._stats_lock:
+            self.queue_depths.observe(depth)
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._queue.put((sample, future, predict_fn or self.predict_fn))
+        return future
+
+    def predict_one(self, sample, predict_fn=None):
+        """Blocking single-row prediction (same signature as TablePredictor.predict_one)"""
+        return self.submit(sample, predict_fn).result()
+
+    # ------------------------------------------
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or time is up"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            for sample, future, predict_fn in self._collect():
+                groups.setdefault(predict_fn, []).append((sample, future))
+            for predict_fn, batch in groups.items():
+                self._score(predict_fn, batch)
+
+    def _score(self, predict_fn, batch):
+        """Score (sample, future) pairs with one predict_fn call and resolve the futures"""
+        futures = [future for _, future in batch]
+        try:
+            X = np.asarray([sample for sample, _ in batch], dtype=np.float64)
+            predictions = predict_fn(X)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.batch_sizes.observe(len(batch))
+        for future, value in zip(futures, predictions):
+            future.set_result(value)
+
+    def stats(self):
+        """Return settings, current queue depth and the batch-size / queue-depth histograms"""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'batch_size_histogram': self.batch_sizes.as_dict(),
+                'queue_depth_histogram': self.queue_depths.as_dict(),
+            }
+
+# ==========================================
+# MAIN
+# ==========================================
+if __name__ == '__main__':
+    import argparse
+    from concurrent.futures import ThreadPoolExecutor
+
+    from model_bundle import ModelBundle
+
+    parser = argparse.ArgumentParser(description='Compare direct and micro-batched single-row scoring')
+    parser.add_argument('--bundle', default='model.bundle')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--wait-ms', type=float, default=0.0)
+    parser.add_argument('--tree', action='store_true',
+                        help='score with the tree only, ignoring the decision table')
+    args = parser.parse_args()
+
+    bundle = ModelBundle.load(args.bundle)
+    predictor = bundle.tree if args.tree else bundle.predictor()
+    rng = np.random.default_rng(0)
+    domains = [len(bundle.vocabularies.get(col, range(6))) for col in bundle.feature_columns]
+    samples = [[int(rng.integers(0, d)) for d in domains] for _ in range(args.requests)]
+
+    batcher = MicroBatcher(predictor.predict, args.batch_size, args.wait_ms)
+    for name, predict_one in [('direct', predictor.predict_one),
+                              ('micro-batched', batcher.predict_one)]:
+        latencies = []
+
+        def call(sample):
+            start = time.perf_counter()
+            value = predict_one(sample)
+            latencies.append(time.perf_counter() - start)
+            return value
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            results = list(pool.map(call, samples))
+        elapsed = time.perf_counter() - start
+        p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+        print(f'⏱️  {name:>13}: {len(results) / elapsed:,.0f} predictions/sec, '
+              f'p50 {p50:.2f} ms, p99 {p99:.2f} ms')
+
+    expected = predictor.predict(np.asarray(samples, dtype=np.float64))
+    batched = [batcher.predict_one(s) for s in samples[:1000]]
+    ok = np.array_equal(np.asarray(batched), expected[:1000])
+    print(f"{'✅' if ok else '❌'} Batched predictions match the direct ones")
+    print(f"📊 {batcher.stats()['batch_size_histogram']}")
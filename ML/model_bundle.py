@@ -0,0 +1,238 @@
+"""
+Single-file model bundle replacing the four pickles loaded at startup
+Tree node arrays, the decision table, encoder vocabularies, bin edges and
+the feature order live in one memory-mapped file behind a JSON header
+
+Layout: MAGIC (8 bytes) | header size (uint32, little endian) | JSON header
+        | zero padding | arrays, each starting on a 64-byte boundary
+
+Usage: python model_bundle.py model.pkl model.bundle
+       python model_bundle.py id3_tree.npz id3_model.bundle
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from binning import BINNED_COLUMNS
+from compiled_tree import CompiledTree
+from lookup_tables import EncoderTables
+from materialize import DecisionTable, TablePredictor
+
+MAGIC = b'SATMODEL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+TARGET = 'satisfaction'
+TREE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'missing_left']
+
+# Header fields every bundle has, with their JSON types
+HEADER_FIELDS = {
+    'feature_columns': list,
+    'vocabularies': dict,
+    'binning': dict,
+    'classes': list,
+    'arrays': dict,
+}
+
+class BundleError(ValueError):
+    """Raised for a bundle that is corrupt or does not match the expected schema"""
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _plain(value):
+    """NumPy scalars -> JSON-serializable Python values"""
+    return value.item() if isinstance(value, np.generic) else value
+
+# ==========================================
+# WRITING
+# ==========================================
+def save_bundle(path, tree, feature_columns, vocabularies, binning_config,
+                table=None, metadata=None):
+    """
+    Write a bundle for a CompiledTree.
+
+    vocabularies maps each label-encoded column to its classes (a dict of
+    fitted LabelEncoders is accepted as well). The file is written next
+    to path and renamed into place so running workers never see half of it.
+    """
+    vocabularies = {col: [str(label) for label in getattr(v, 'classes_', v)]
+                    for col, v in vocabularies.items()}
+    arrays = {name: getattr(tree, name) for name in TREE_ARRAYS}
+    if table is not None:
+        arrays['table'] = np.asarray(table, dtype=np.int32)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        offset = _aligned(offset)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'feature_columns': list(feature_columns),
+        'vocabularies': vocabularies,
+        'binning': {key: [_plain(v) for v in values] for key, values in binning_config.items()},
+        'classes': [_plain(c) for c in tree.classes],
+        'arrays': layout,
+        'metadata': metadata or {},
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 4 + len(header_bytes))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.write(b'\0' * (data_start + layout[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+# ==========================================
+# READING
+# ==========================================
+class ModelBundle:
+    """
+    A memory-mapped model bundle.
+
+    Arrays are read-only views into one shared mapping, so forked workers
+    share the same physical pages and loading does not copy the tree.
+    """
+
+    def __init__(self, header, arrays):
+        self.header = header
+        self.feature_columns = header['feature_columns']
+        self.vocabularies = header['vocabularies']
+        self.binning_config = header['binning']
+        self.metadata = header.get('metadata', {})
+
+        self.tree = CompiledTree(*(arrays[name] for name in TREE_ARRAYS[:5]),
+                                 header['classes'], arrays['missing_left'],
+                                 self.feature_columns)
+        self.table = DecisionTable(arrays['table']) if 'table' in arrays else None
+
+    @classmethod
+    def load(cls, path, expected_columns=None):
+        """Map a bundle file, refusing one whose schema does not match"""
+        if os.path.getsize(path) < len(MAGIC) + 4:
+            raise BundleError(f'{path} is not a model bundle')
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise BundleError(f'{path} is not a model bundle')
+        (header_size,) = struct.unpack_from('<I', buffer, len(MAGIC))
+        header_end = len(MAGIC) + 4 + header_size
+        try:
+            header = json.loads(buffer[len(MAGIC) + 4:header_end].decode('utf-8'))
+        except ValueError as e:
+            raise BundleError(f'{path} has a corrupt header: {e}') from None
+        if not isinstance(header, dict):
+            raise BundleError(f'{path} has a corrupt header: not a JSON object')
+        if header.get('format_version') != FORMAT_VERSION:
+            raise BundleError(f"{path} has format version {header.get('format_version')}, "
+                              f'expected {FORMAT_VERSION}')
+        for field, kind in HEADER_FIELDS.items():
+            if not isinstance(header.get(field), kind):
+                raise BundleError(f'{path} has a corrupt header: {field!r} is missing '
+                                  f'or not a {kind.__name__}')
+        missing = [name for name in TREE_ARRAYS if name not in header['arrays']]
+        if missing:
+            raise BundleError(f'{path} has a corrupt header: no {missing} arrays')
+
+        data_start = _aligned(header_end)
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            try:
+                dtype = np.dtype(spec['dtype'])
+                shape = [int(n) for n in spec['shape']]
+                start = data_start + int(spec['offset'])
+            except (KeyError, TypeError, ValueError) as e:
+                raise BundleError(f'{path} has a corrupt header: array {name!r}: {e!r}') from None
+            count = int(np.prod(shape, dtype=np.int64))
+            if start + count * dtype.itemsize > len(buffer):
+                raise BundleError(f'{path} is truncated (array {name!r})')
+            arrays[name] = np.frombuffer(buffer, dtype, count, start).reshape(shape)
+
+        bundle = cls(header, arrays)
+        bundle.check_schema(expected_columns)
+        return bundle
+
+    def check_schema(self, expected_columns=None):
+        """Raise BundleError unless the bundle is usable with these columns"""
+        columns = self.feature_columns
+        if expected_columns is not None and list(expected_columns) != columns:
+            raise BundleError(f'Bundle feature order {columns} does not match '
+                              f'the expected {list(expected_columns)}')
+
+        missing = [col for col in BINNED_COLUMNS
+                   if col in columns and col not in self.vocabularies]
+        if TARGET not in self.vocabularies:
+            missing.append(TARGET)
+        if missing:
+            raise BundleError(f'Bundle has no vocabulary for {missing}')
+
+        missing = sorted({key for keys in BINNED_COLUMNS.values() for key in keys
+                          if key not in self.binning_config})
+        if missing:
+            raise BundleError(f'Bundle has no binning entries {missing}')
+
+        used = self.tree.feature[self.tree.feature >= 0]
+        if used.size and used.max() >= len(columns):
+            raise BundleError('Bundle tree uses features beyond its feature order')
+        if self.table is not None and len(self.table.domains) != len(columns):
+            raise BundleError('Bundle decision table does not match its feature order')
+
+    # ------------------------------------------
+    def encoder_tables(self):
+        return EncoderTables.from_vocabularies(self.vocabularies, self.binning_config)
+
+    def predictor(self):
+        """Decision table with the tree as fallback (or just the tree)"""
+        return TablePredictor(self.table, self.tree)
+
+# ==========================================
+# MAIN
+# ==========================================
+if __name__ == '__main__':
+    import pickle
+
+    from compiled_tree import compile_model
+
+    if len(sys.argv) != 3:
+        print('Usage: python model_bundle.py <model.pkl | id3_tree.npz> <output.bundle>')
+        sys.exit(1)
+
+    model_path, output_path = sys.argv[1:]
+    if model_path.endswith('.npz'):
+        tree = CompiledTree.load(model_path)
+    else:
+        with open(model_path, 'rb') as f:
+            tree = compile_model(pickle.load(f))
+
+    with open('label_encoders.pkl', 'rb') as f:
+        label_encoders = pickle.load(f)
+    with open('binning_config.pkl', 'rb') as f:
+        binning_config = pickle.load(f)
+    with open('feature_columns.pkl', 'rb') as f:
+        feature_columns = pickle.load(f)
+
+    table_path = os.path.splitext(model_path)[0] + '_table.npy'
+    table = np.load(table_path) if os.path.exists(table_path) else None
+
+    save_bundle(output_path, tree, feature_columns, label_encoders, binning_config,
+                table=table, metadata={'source': os.path.basename(model_path)})
+    size = os.path.getsize(output_path)
+    print(f'✅ Bundled {tree.node_count} tree nodes'
+          f"{' and a decision table' if table is not None else ''} into {output_path} "
+          f'({size / 1024:.1f} KB)')
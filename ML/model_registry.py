@@ -0,0 +1,343 @@
+"""
+Versioned model registry and zero-downtime hot-swap
+Every trained bundle is published as an immutable version
+(models/<name>/v0001.bundle, v0002.bundle, ...) and models/<name>/CURRENT
+names the version to serve. Each app process polls CURRENT, loads and warms
+a newly activated version on a background thread, then swaps it in with one
+reference assignment; requests already running finish on the version they
+started with.
+
+Usage: python model_registry.py list [--name model]
+       python model_registry.py publish model.bundle [--name model] [--no-activate] [--keep 10]
+       python model_registry.py activate v0002 [--name model]   (roll forward or back)
+       (--name id3_model for app.py; MODEL_REGISTRY sets the directory, default models/)
+"""
+
+import argparse
+import functools
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+
+from binning import Binner
+from model_bundle import ModelBundle
+from prediction_cache import PredictionCache
+
+MODEL_REGISTRY = os.environ.get('MODEL_REGISTRY', 'models')
+
+# Version label of a model loaded from outside the registry (model.bundle or the pickles)
+UNVERSIONED = 'unversioned'
+
+# Seconds between checks of CURRENT in each process
+POLL_SECONDS = 2.0
+
+# Most recently used feature vectors of the old version's cache that are
+# re-scored by the new version before it is swapped in
+WARM_CACHE_ROWS = 20000
+
+VERSION_PATTERN = re.compile(r'^v(\d+)\.bundle$')
+
+# ==========================================
+# REGISTRY
+# ==========================================
+class ModelRegistry:
+    """
+    Directory of immutable bundle versions plus a CURRENT pointer.
+
+    Versions are never rewritten, so a path identifies a model for as long
+    as it exists; CURRENT is replaced atomically.
+    """
+
+    def __init__(self, directory=MODEL_REGISTRY, name='model'):
+        self.name = name
+        self.directory = os.path.join(directory, name)
+
+    def path(self, version):
+        return os.path.join(self.directory, f'{version}.bundle')
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        numbered = []
+        for name in os.listdir(self.directory):
+            match = VERSION_PATTERN.match(name)
+            if match:
+                numbered.append((int(match.group(1)), name[:-len('.bundle')]))
+        return [version for _, version in sorted(numbered)]
+
+    def current(self):
+        """The active version, or None if nothing was activated yet"""
+        try:
+            with open(os.path.join(self.directory, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, bundle_path, activate=True, expected_columns=None):
+        """Copy a bundle in as the next version (activating it by default); return the version"""
+        ModelBundle.load(bundle_path, expected_columns=expected_columns)
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp_path = os.path.join(self.directory, f'.publish-{os.getpid()}.tmp')
+        shutil.copyfile(bundle_path, tmp_path)
+        try:
+            versions = self.versions()
+            number = int(versions[-1][1:]) + 1 if versions else 1
+            while True:
+                # link() fails instead of overwriting, so concurrent publishes get distinct versions
+                version = f'v{number:04d}'
+                try:
+                    os.link(tmp_path, self.path(version))
+                    break
+                except FileExistsError:
+                    number += 1
+        finally:
+            os.remove(tmp_path)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Point CURRENT at a published version"""
+        if not os.path.exists(self.path(version)):
+            raise ValueError(f'Unknown version {version!r} (have {", ".join(self.versions()) or "none"})')
+        ModelBundle.load(self.path(version))
+
+        tmp_path = os.path.join(self.directory, f'.CURRENT-{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(self.directory, 'CURRENT'))
+
+    def prune(self, keep):
+        """Delete all but the newest keep versions (never the active one); return those removed"""
+        current = self.current()
+        removed = []
+        for version in self.versions()[:-keep] if keep > 0 else self.versions():
+            if version != current:
+                # Processes still serving it keep their mapping of the deleted file
+                os.remove(self.path(version))
+                removed.append(version)
+        return removed
+
+# ==========================================
+# SERVING MODEL
+# ==========================================
+def _same_bins(a, b):
+    return a.keys() == b.keys() and all(
+        len(a[key]) == len(b[key]) and np.array_equal(a[key], b[key]) for key in a)
+
+class ServingModel:
+    """
+    Everything one model version needs to answer requests: the batch model,
+    the single-row predictor, encoder tables, bins, its own prediction cache
+    and (built on first use) the decision-path explainer.
+
+    Never modified once served: a request takes one reference at its start
+    and uses it throughout, so a swap cannot mix two versions in a response.
+    """
+
+    def __init__(self, version, model, predictor, encoder_tables, binning_config,
+                 feature_columns, bundle_path=None, cache_size=100000, batcher=None):
+        self.version = version
+        self.model = model
+        self.predictor = predictor
+        self.encoder_tables = encoder_tables
+        self.binning_config = binning_config
+        self.binner = Binner(binning_config)
+        self.feature_columns = feature_columns
+        self.bundle_path = bundle_path
+        self.cache = PredictionCache(cache_size)
+        self.loaded_at = time.time()
+        self._explainer = None
+
+        # Concurrent cache misses are scored by the shared micro-batcher,
+        # which keeps rows of different versions in separate predict calls
+        if batcher is not None:
+            self.predict_single = functools.partial(batcher.predict_one,
+                                                    predict_fn=predictor.predict)
+        else:
+            self.predict_single = predictor.predict_one
+
+    @classmethod
+    def from_bundle(cls, path, version, expected_columns=None, cache_size=100000, batcher=None):
+        bundle = ModelBundle.load(path, expected_columns=expected_columns)
+        return cls(version, bundle.tree, bundle.predictor(), bundle.encoder_tables(),
+                   bundle.binning_config, bundle.feature_columns, bundle_path=path,
+                   cache_size=cache_size, batcher=batcher)
+
+    # ------------------------------------------
+    def predict_row(self, row):
+        """Make a prediction for a single CSV row (row-by-row fallback)"""
+        from batch_engine import score_row
+        from reasons import find_main_reason
+
+        return score_row(row, self.model, self.encoder_tables, self.binner,
+                         self.feature_columns, find_main_reason)
+
+    def explain_paths(self, X):
+        """Features the tree tested on each encoded row (?explain=path on the batch routes)"""
+        if self._explainer is None:
+            from compiled_tree import compile_model
+            from reasons import DecisionPathExplainer
+
+            self._explainer = DecisionPathExplainer(compile_model(self.model), self.feature_columns)
+        return self._explainer.explain(X)
+
+    def encodes_like(self, other):
+        """True if both versions encode raw rows to the same feature vectors"""
+        return (self.feature_columns == other.feature_columns
+                and self.encoder_tables.classes == other.encoder_tables.classes
+                and _same_bins(self.binning_config, other.binning_config))
+
+    def warm_up(self, previous=None):
+        """
+        Fault in the mapped model and fill the cache before serving.
+
+        When previous encodes rows the same way, the feature vectors it has
+        cached most recently are re-scored by this version in one call, so
+        traffic keeps hitting the cache across the swap.
+        """
+        X = np.zeros((1, len(self.feature_columns)), dtype=np.float64)
+        self.predictor.predict(X)
+        self.model.predict(X)
+        if previous is not None and self.encodes_like(previous):
+            recent = previous.cache.vectors(WARM_CACHE_ROWS)
+            if len(recent):
+                self.cache.prime(self.predictor.predict, recent)
+        return self
+
+# ==========================================
+# HOT-SWAP
+# ==========================================
+class ModelSwapper:
+    """
+    Holds the ServingModel being served and replaces it when the registry's
+    CURRENT changes.
+
+    load(version, path) builds a ServingModel; it is warmed against the
+    current one and then published with a single assignment to .current.
+    Checks run on a background thread started on first use in each
+    process (serve.py forks workers after importing the app). A version
+    that fails to load is reported and not retried until CURRENT changes.
+    """
+
+    def __init__(self, registry, load, current=None, poll_seconds=POLL_SECONDS):
+        self.registry = registry
+        self.load = load
+        self.current = current
+        self.poll_seconds = poll_seconds
+        self.swaps = 0
+        self.last_error = None
+        self._failed = None
+        self._swap_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def ensure_watching(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._watch, name='model-swapper', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.check()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def check(self):
+        """Swap to the registry's active version if it changed; True if a swap happened"""
+        version = self.registry.current()
+        with self._swap_lock:
+            current = self.current
+            if version is None or version == self._failed:
+                return False
+            if current is not None and version == current.version:
+                return False
+            try:
+                new = self.load(version, self.registry.path(version)).warm_up(current)
+            except Exception as e:
+                self._failed = version
+                self.last_error = f'{version}: {e}'
+                print(f'❌ Cannot load model {version}, still serving '
+                      f'{current.version if current is not None else "nothing"}: {e}')
+                return False
+
+            # The swap itself: requests already holding the old model finish with it
+            self.current = new
+            self.swaps += 1
+            self._failed = None
+            self.last_error = None
+        print(f'🔄 Now serving model {version} '
+              f'(was {current.version if current is not None else "none"}, pid {os.getpid()})')
+        return True
+
+    def status(self):
+        current = self.current
+        return {
+            'version': current.version if current is not None else None,
+            'loaded_at': current.loaded_at if current is not None else None,
+            'registry_version': self.registry.current(),
+            'available': self.registry.versions(),
+            'swaps': self.swaps,
+            'last_error': self.last_error,
+            'pid': os.getpid(),
+        }
+
+# ==========================================
+# MAIN
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description='Publish, list and activate model versions')
+    parser.add_argument('--registry', default=MODEL_REGISTRY)
+    parser.add_argument('--name', default='model', help='model (app_fast.py) or id3_model (app.py)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list')
+    publish = commands.add_parser('publish')
+    publish.add_argument('bundle')
+    publish.add_argument('--no-activate', action='store_true')
+    publish.add_argument('--keep', type=int, help='then delete all but the newest KEEP versions')
+    activate = commands.add_parser('activate')
+    activate.add_argument('version')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry, args.name)
+    try:
+        if args.command == 'publish':
+            version = registry.publish(args.bundle, activate=not args.no_activate)
+            print(f"💾 Published {args.bundle} as {registry.path(version)}"
+                  f"{' (active)' if not args.no_activate else ''}")
+            if args.keep:
+                for removed in registry.prune(args.keep):
+                    print(f'🗑️  Removed {removed}')
+        elif args.command == 'activate':
+            registry.activate(args.version)
+            print(f'✅ {args.name}: {args.version} is active; running apps switch within '
+                  f'{POLL_SECONDS:g}s')
+        else:
+            current = registry.current()
+            versions = registry.versions()
+            if not versions:
+                print(f'⚠️  No versions in {registry.directory}')
+            for version in versions:
+                path = registry.path(version)
+                created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(os.path.getmtime(path)))
+                print(f"{'*' if version == current else ' '} {version}  {created}  "
+                      f'{os.path.getsize(path) / 1024:.1f} KB')
+    except (OSError, ValueError) as e:
+        print(f'❌ {e}')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
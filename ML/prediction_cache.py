@@ -0,0 +1,132 @@
+"""
+Memoized predictions keyed on the encoded feature vector
+After binning every feature is a small integer code, so real traffic
+repeats the same encoded vectors and can skip the model entirely
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+_MISSING = object()
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache from encoded feature vectors to model outputs.
+
+    Keys are the raw bytes of the vector as float64, so the single-row
+    and batch paths share entries.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key):
+        """Return the cached value or _MISSING (caller holds the lock)"""
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        """Insert a value, evicting the least recently used (caller holds the lock)"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def predict_one(self, predict_fn, sample):
+        """Return predict_fn(sample), computing it only on a cache miss"""
+        key = np.asarray(sample, dtype=np.float64).tobytes()
+        with self._lock:
+            value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        value = predict_fn(sample)
+        with self._lock:
+            self._store(key, value)
+        return value
+
+    def predict_many(self, predict_fn, X):
+        """
+        Return predict_fn(X) for a 2D matrix.
+
+        Duplicate rows are collapsed first, cached rows are served from the
+        cache, the remaining unique rows are scored in one predict_fn call
+        and the results are scattered back to every original row.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return predict_fn(X)
+
+        rows = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+        unique_rows, first_index, inverse = np.unique(
+            rows, return_index=True, return_inverse=True)
+        keys = [row.tobytes() for row in unique_rows]
+
+        values = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._lookup(key)
+                if value is _MISSING:
+                    missing.append(i)
+                else:
+                    values[i] = value
+
+        if missing:
+            predicted = predict_fn(X[first_index[missing]])
+            with self._lock:
+                for i, value in zip(missing, predicted):
+                    values[i] = value
+                    self._store(keys[i], value)
+
+        return np.asarray(values)[inverse.ravel()]
+
+    def vectors(self, limit=None):
+        """The most recently used cached feature vectors (at most limit) as a 2D float64 matrix"""
+        with self._lock:
+            keys = list(self._data)
+        if limit is not None:
+            keys = keys[-limit:]
+        if not keys:
+            return np.empty((0, 0), dtype=np.float64)
+        return np.frombuffer(b''.join(keys), dtype=np.float64).reshape(len(keys), -1)
+
+    def prime(self, predict_fn, X):
+        """Store predict_fn(X) for every row of X, without counting hits or misses"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        values = predict_fn(X)
+        with self._lock:
+            for row, value in zip(X, values):
+                self._store(row.tobytes(), value)
+
+    def stats(self):
+        """Return size, limits and hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def clear(self):
+        """Drop every cached entry and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
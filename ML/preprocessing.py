@@ -0,0 +1,220 @@
+"""
+Shared preprocessing for train_model.py and train_model_fast.py
+Reads train.csv with compact dtypes, bins and label-encodes every column in
+one pass and caches the encoded dataset keyed by the source file hash
+
+Usage: python preprocessing.py [train.csv]   (builds the cache if needed)
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from binning import BINNED_COLUMNS
+
+# Bump whenever the pipeline changes so older caches are not reused
+PIPELINE_VERSION = 1
+CACHE_DIR = 'cache'
+
+DROP_COLUMNS = ['id', 'Unnamed: 0']
+
+# ==========================================
+# BINNING CONFIGURATION
+# ==========================================
+BINS_AGE = [0, 19, 29, 39, 49, 59, 120]
+LABELS_AGE = ['<20', '20-29', '30-39', '40-49', '50-59', '60+']
+
+BINS_DELAY = [-1, 0, 5, 15, 30, 100000]
+LABELS_DELAY = ['On time', 'Slightly delayed', 'Moderately delayed', 'Delayed', 'Very delayed']
+
+# The last distance edge is the longest flight in the data + 1
+BINS_DIST = [0, 500, 1000, 1500, 2000, 2500]
+LABELS_DIST = ['0-500', '501-1000', '1001-1500', '1501-2000', '2001-2500', '2500+']
+
+# Label-encoded columns, in the order the encoders were always saved
+ENCODED_COLUMNS = ['Gender', 'Customer Type', 'Age', 'Type of Travel', 'Class',
+                   'Departure Delay in Minutes', 'Arrival Delay in Minutes',
+                   'satisfaction', 'Flight Distance']
+
+RATING_COLUMNS = ['Inflight wifi service', 'Departure/Arrival time convenient',
+                  'Ease of Online booking', 'Gate location', 'Food and drink',
+                  'Online boarding', 'Seat comfort', 'Inflight entertainment',
+                  'On-board service', 'Leg room service', 'Baggage handling',
+                  'Checkin service', 'Inflight service', 'Cleanliness']
+
+# Compact dtypes for read_csv (Arrival Delay has gaps in the Kaggle data)
+DTYPES = {
+    'id': 'int32',
+    'Unnamed: 0': 'int32',
+    'Gender': 'category',
+    'Customer Type': 'category',
+    'Age': 'int8',
+    'Type of Travel': 'category',
+    'Class': 'category',
+    'Flight Distance': 'int16',
+    **{col: 'int8' for col in RATING_COLUMNS},
+    'Departure Delay in Minutes': 'int32',
+    'Arrival Delay in Minutes': 'float32',
+    'satisfaction': 'category',
+}
+
+# ==========================================
+# LOADING AND ENCODING
+# ==========================================
+def read_raw(path):
+    """Read the CSV with compact dtypes, dropping id columns and incomplete rows"""
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {c: t for c, t in DTYPES.items() if c in header}
+    try:
+        df = pd.read_csv(path, dtype=dtypes)
+    except ValueError:
+        # Gaps in an integer column: read those as floats, dropna removes the rows
+        df = pd.read_csv(path, dtype={c: 'float32' if t.startswith('int') else t
+                                      for c, t in dtypes.items()})
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    return df.dropna()
+
+def make_binning_config(max_distance):
+    """Bin edges and labels (same contents as binning_config.pkl)"""
+    return {
+        'bins_age': BINS_AGE,
+        'labels_age': LABELS_AGE,
+        'bins_delay': BINS_DELAY,
+        'labels_delay': LABELS_DELAY,
+        'bins_dist': BINS_DIST + [np.int64(max_distance) + 1],
+        'labels_dist': LABELS_DIST,
+    }
+
+def _label_codes(names, index):
+    """
+    LabelEncoder.fit_transform over names[index] without building the strings.
+
+    Returns the codes and the sorted classes actually present, which is
+    exactly what fitting a LabelEncoder on the materialized labels gives.
+    """
+    present = np.unique(index)
+    classes = sorted(names[i] for i in present)
+    code_of = np.full(len(names), -1, dtype=np.int64)
+    for i in present:
+        code_of[i] = classes.index(names[i])
+    return code_of[index], classes
+
+def _bin_index(values, bins):
+    """pd.cut(values, bins) positions; values outside the edges get len(bins) - 1"""
+    edges = np.asarray(bins, dtype=np.float64)
+    positions = np.searchsorted(edges, values, side='left') - 1
+    outside = (positions < 0) | (positions >= len(edges) - 1)
+    positions[outside] = len(edges) - 1
+    return positions
+
+def encode(df):
+    """
+    Bin and label-encode a raw frame in one pass over its columns.
+
+    Returns the encoded frame, the fitted LabelEncoders and the binning
+    config, matching the old pd.cut -> astype(str) -> LabelEncoder steps
+    (a value outside the bins becomes the label 'nan', as it did there).
+    """
+    binning_config = make_binning_config(df['Flight Distance'].max())
+    encoded = {}
+    classes = {}
+    for col in df.columns:
+        column = df[col]
+        if col in BINNED_COLUMNS:
+            bins_key, labels_key = BINNED_COLUMNS[col]
+            names = list(binning_config[labels_key]) + ['nan']
+            index = _bin_index(column.to_numpy(dtype=np.float64), binning_config[bins_key])
+            encoded[col], classes[col] = _label_codes(names, index)
+        elif col in ENCODED_COLUMNS:
+            column = column.cat.remove_unused_categories()
+            names = [str(c) for c in column.cat.categories]
+            encoded[col], classes[col] = _label_codes(names, column.cat.codes.to_numpy())
+        else:
+            encoded[col] = column.to_numpy(dtype=np.int64)
+
+    frame = pd.DataFrame({col: values.astype(np.int8) for col, values in encoded.items()})
+    return frame, _make_encoders(classes), binning_config
+
+def _make_encoders(classes):
+    """Fitted LabelEncoders from their class lists"""
+    label_encoders = {}
+    for col in ENCODED_COLUMNS:
+        if col in classes:
+            le = LabelEncoder()
+            le.classes_ = np.array(classes[col], dtype=object)
+            label_encoders[col] = le
+    return label_encoders
+
+# ==========================================
+# ENCODED DATASET CACHE
+# ==========================================
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_paths(path, cache_dir=CACHE_DIR):
+    """(matrix .npy, metadata .json) cache paths for a source CSV"""
+    key = f'v{PIPELINE_VERSION}-{file_hash(path)[:16]}'
+    base = os.path.join(cache_dir, f'{os.path.splitext(os.path.basename(path))[0]}-{key}')
+    return base + '.npy', base + '.json'
+
+def save_cache(frame, label_encoders, binning_config, matrix_path, meta_path):
+    """Write the encoded matrix and its metadata (atomically, via rename)"""
+    os.makedirs(os.path.dirname(matrix_path) or '.', exist_ok=True)
+    meta = {
+        'columns': frame.columns.tolist(),
+        'classes': {col: le.classes_.tolist() for col, le in label_encoders.items()},
+        'max_distance': int(binning_config['bins_dist'][-1]) - 1,
+    }
+    with open(matrix_path + '.tmp', 'wb') as f:
+        np.save(f, frame.to_numpy(dtype=np.int8))
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(matrix_path + '.tmp', matrix_path)
+    os.replace(meta_path + '.tmp', meta_path)
+
+def load_cache(matrix_path, meta_path):
+    """Read a cached dataset back as (frame, label_encoders, binning_config)"""
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    frame = pd.DataFrame(np.load(matrix_path), columns=meta['columns'])
+    binning_config = make_binning_config(meta['max_distance'])
+    return frame, _make_encoders(meta['classes']), binning_config
+
+def load_dataset(path='train.csv', cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Return (frame, label_encoders, binning_config, from_cache) for a raw CSV.
+
+    The encoded frame is cached under cache_dir keyed by the CSV's hash, so
+    an unchanged file is only parsed and encoded once.
+    """
+    matrix_path, meta_path = cache_paths(path, cache_dir)
+    if use_cache and os.path.exists(matrix_path) and os.path.exists(meta_path):
+        return (*load_cache(matrix_path, meta_path), True)
+
+    frame, label_encoders, binning_config = encode(read_raw(path))
+    if use_cache:
+        save_cache(frame, label_encoders, binning_config, matrix_path, meta_path)
+    return frame, label_encoders, binning_config, False
+
+# ==========================================
+# MAIN
+# ==========================================
+if __name__ == '__main__':
+    import time
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'train.csv'
+    start_time = time.perf_counter()
+    frame, _, _, from_cache = load_dataset(source)
+    elapsed = time.perf_counter() - start_time
+    state = 'Loaded cached' if from_cache else 'Encoded and cached'
+    print(f'✅ {state} {len(frame)} records from {source} in {elapsed:.3f}s')
@@ -0,0 +1,365 @@
+"""
+On-demand profiling of live requests
+An admin (PROFILE_TOKEN) arms the profiler for the next N requests to
+/predict, /predict_batch or /v1/predict/bulk, or profiles one request with
+an X-Profile header. Each profiled request writes to PROFILE_DIR:
+  <name>.pstats      cProfile statistics (mode "cprofile")
+  <name>.collapsed   stacks sampled every few ms, one "a;b;c count" line per
+                     stack, ready for flamegraph.pl or speedscope (mode "sample")
+  <name>.tracemalloc tracemalloc snapshot at the end of a batch request
+  <name>.json        route, status, duration, files and, for batch requests,
+                     peak traced memory with the top allocation sites
+
+Usage: python profiling.py [profiles/] [--sort cumulative] [--top 25]
+                           [--collapsed merged.collapsed]
+       (merges the profiles written so far and prints the slowest functions)
+"""
+
+import cProfile
+import glob
+import hmac
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+PROFILE_DIR = 'profiles'
+MODES = ('cprofile', 'sample')
+
+# Routes (Flask endpoints) that may be profiled; batch ones also get tracemalloc
+PROFILED_ENDPOINTS = ('predict', 'predict_batch', 'predict_bulk_v1')
+BATCH_ENDPOINTS = ('predict_batch', 'predict_bulk_v1')
+
+# Requests one arm call may cover, and the sampling period of mode "sample"
+MAX_PROFILED_REQUESTS = 1000
+SAMPLE_INTERVAL_MS = 5
+
+# Traceback depth recorded by tracemalloc (every extra frame slows each
+# allocation down further) and allocation sites kept in the summary
+TRACEMALLOC_FRAMES = 1
+TOP_ALLOCATIONS = 10
+
+def _check_mode(mode):
+    if mode not in MODES:
+        raise ValueError(f'mode must be one of {", ".join(MODES)}')
+
+# ==========================================
+# STACK SAMPLING
+# ==========================================
+def collapse(frame):
+    """'file:function;file:function;...' from the outermost call down to frame"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class StackSampler:
+    """
+    Samples the stacks of registered threads on one background thread.
+
+    The thread sleeps on an event while no request is being sampled, so it
+    costs nothing between profiles. It is started on first use in each
+    process (serve.py forks workers after importing the app).
+    """
+
+    def __init__(self, interval_ms=SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._threads = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._threads = {}
+                self._wake = threading.Event()
+                threading.Thread(target=self._run, name='stack-sampler', daemon=True).start()
+                self._pid = os.getpid()
+
+    def add(self, thread_id):
+        self._ensure_started()
+        with self._lock:
+            self._threads[thread_id] = Counter()
+            self._wake.set()
+
+    def remove(self, thread_id):
+        """Stop sampling a thread; return its stack counts"""
+        with self._lock:
+            return self._threads.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                if not self._threads:
+                    self._wake.clear()
+                    continue
+                thread_ids = list(self._threads)
+
+            frames = sys._current_frames()
+            stacks = [(tid, collapse(frames[tid])) for tid in thread_ids if tid in frames]
+            with self._lock:
+                for tid, stack in stacks:
+                    counts = self._threads.get(tid)
+                    if counts is not None:
+                        counts[stack] += 1
+            time.sleep(self.interval)
+
+# ==========================================
+# REQUEST PROFILER
+# ==========================================
+class Capture:
+    """One profiled request in progress"""
+
+    def __init__(self, endpoint, mode, trace_memory):
+        self.endpoint = endpoint
+        self.mode = mode
+        self.trace_memory = trace_memory
+        self.thread_id = threading.get_ident()
+        self.requested = False
+        self.profile = None
+        self.start = time.perf_counter()
+
+class RequestProfiler:
+    """
+    Profiles the next N requests to the profiled endpoints, or single
+    requests that ask for it, and writes the results to directory.
+
+    Disabled unless an admin token is configured. Arming applies to the
+    process that received the arm request, i.e. one serve.py worker.
+    tracemalloc is process-wide, so the memory of batch requests profiled
+    at the same time is traced together.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, token=None, endpoints=PROFILED_ENDPOINTS,
+                 batch_endpoints=BATCH_ENDPOINTS):
+        self.directory = directory
+        self.token = token
+        self.endpoints = tuple(endpoints)
+        self.batch_endpoints = tuple(batch_endpoints)
+        self.sampler = StackSampler()
+        self.remaining = 0
+        self.mode = None
+        self.armed_endpoints = ()
+        self.written = 0
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._tracing = 0
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def authorized(self, token):
+        """True if token matches the configured admin token"""
+        return self.enabled and token is not None and hmac.compare_digest(
+            token.encode(), self.token.encode())
+
+    def arm(self, requests, mode='cprofile', endpoints=None):
+        """Profile the next requests calls to endpoints (all profiled ones by default)"""
+        _check_mode(mode)
+        if not 0 <= requests <= MAX_PROFILED_REQUESTS:
+            raise ValueError(f'requests must be between 0 and {MAX_PROFILED_REQUESTS}')
+        endpoints = tuple(endpoints) if endpoints else self.endpoints
+        unknown = [e for e in endpoints if e not in self.endpoints]
+        if unknown:
+            raise ValueError(f'Cannot profile {", ".join(unknown)} '
+                             f'(choose from {", ".join(self.endpoints)})')
+        with self._lock:
+            self.remaining = requests
+            self.mode = mode
+            self.armed_endpoints = endpoints
+        return self.status()
+
+    def status(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pid': os.getpid(),
+                'remaining': self.remaining,
+                'mode': self.mode if self.remaining else None,
+                'endpoints': list(self.armed_endpoints) if self.remaining else [],
+                'written': self.written,
+                'directory': os.path.abspath(self.directory),
+            }
+
+    # ------------------------------------------
+    def start(self, endpoint, requested_mode=None):
+        """
+        Begin profiling the current request if it is armed or asked for
+        (requested_mode from an authorized X-Profile header); None otherwise.
+        An unknown requested_mode raises ValueError, as arm() does.
+        """
+        if requested_mode is not None:
+            _check_mode(requested_mode)
+        if endpoint not in self.endpoints:
+            return None
+        if requested_mode is not None:
+            mode = requested_mode
+        else:
+            if not self.remaining:
+                return None
+            with self._lock:
+                if not self.remaining or endpoint not in self.armed_endpoints:
+                    return None
+                self.remaining -= 1
+                mode = self.mode
+
+        capture = Capture(endpoint, mode, endpoint in self.batch_endpoints)
+        capture.requested = requested_mode is not None
+        if capture.trace_memory:
+            with self._lock:
+                if self._tracing == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._tracing += 1
+            tracemalloc.reset_peak()
+
+        if mode == 'cprofile':
+            capture.profile = cProfile.Profile()
+            try:
+                capture.profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler: sample this request instead
+                capture.profile = None
+                capture.mode = 'sample'
+        if capture.mode == 'sample':
+            self.sampler.add(capture.thread_id)
+        capture.start = time.perf_counter()
+        return capture
+
+    def stop(self, capture, status=None):
+        """Finish a capture and write its files; return the common path prefix"""
+        seconds = time.perf_counter() - capture.start
+        if capture.profile is not None:
+            capture.profile.disable()
+        stacks = self.sampler.remove(capture.thread_id) if capture.mode == 'sample' else None
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(self.directory, f'{stamp}-{capture.endpoint}-{os.getpid()}-'
+                                            f'{next(self._sequence):04d}')
+        summary = {
+            'endpoint': capture.endpoint,
+            'mode': capture.mode,
+            'status': status,
+            'seconds': round(seconds, 6),
+            'pid': os.getpid(),
+            'files': [],
+        }
+
+        if capture.profile is not None:
+            capture.profile.dump_stats(base + '.pstats')
+            summary['files'].append(base + '.pstats')
+        if stacks is not None:
+            with open(base + '.collapsed', 'w') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+            summary['samples'] = sum(stacks.values())
+            summary['files'].append(base + '.collapsed')
+
+        if capture.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            with self._lock:
+                self._tracing -= 1
+                if self._tracing == 0:
+                    tracemalloc.stop()
+            snapshot.dump(base + '.tracemalloc')
+            summary['files'].append(base + '.tracemalloc')
+            summary['peak_memory_bytes'] = peak
+            summary['current_memory_bytes'] = current
+            summary['top_allocations'] = [
+                {'site': str(stat.traceback[0]), 'bytes': stat.size, 'blocks': stat.count}
+                for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+            ]
+
+        with open(base + '.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        with self._lock:
+            self.written += 1
+        return base
+
+    def discard(self, capture):
+        """Stop a capture without writing anything (the request failed before after_request)"""
+        if capture.profile is not None:
+            capture.profile.disable()
+        if capture.mode == 'sample':
+            self.sampler.remove(capture.thread_id)
+        if capture.trace_memory:
+            with self._lock:
+                self._tracing -= 1
+                if self._tracing == 0:
+                    tracemalloc.stop()
+
+# ==========================================
+# MAIN
+# ==========================================
+def merge_collapsed(paths):
+    """Sum the stack counts of several .collapsed files"""
+    counts = Counter()
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    counts[stack] += int(count)
+    return counts
+
+if __name__ == '__main__':
+    import argparse
+    import pstats
+
+    parser = argparse.ArgumentParser(description='Summarise the profiles written by the apps')
+    parser.add_argument('directory', nargs='?', default=PROFILE_DIR)
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--collapsed', help='write every .collapsed file merged into this file')
+    args = parser.parse_args()
+
+    pstats_files = sorted(glob.glob(os.path.join(args.directory, '*.pstats')))
+    collapsed_files = sorted(glob.glob(os.path.join(args.directory, '*.collapsed')))
+    summaries = []
+    for path in sorted(glob.glob(os.path.join(args.directory, '*.json'))):
+        with open(path) as f:
+            summaries.append(json.load(f))
+    if not summaries:
+        print(f'❌ No profiles in {args.directory}')
+        sys.exit(1)
+
+    print(f'📊 {len(summaries)} profiled requests in {args.directory}')
+    for endpoint in sorted({s['endpoint'] for s in summaries}):
+        times = sorted(s['seconds'] for s in summaries if s['endpoint'] == endpoint)
+        peaks = [s['peak_memory_bytes'] for s in summaries
+                 if s['endpoint'] == endpoint and 'peak_memory_bytes' in s]
+        line = (f'   {endpoint}: {len(times)} requests, median {times[len(times) // 2] * 1000:.2f} ms, '
+                f'max {times[-1] * 1000:.2f} ms')
+        if peaks:
+            line += f', peak traced memory {max(peaks) / 1e6:.1f} MB'
+        print(line)
+
+    if pstats_files:
+        print(f'\n⏱️  cProfile ({len(pstats_files)} files), top {args.top} by {args.sort}:')
+        pstats.Stats(*pstats_files).sort_stats(args.sort).print_stats(args.top)
+
+    if collapsed_files:
+        counts = merge_collapsed(collapsed_files)
+        total = sum(counts.values())
+        leaves = Counter()
+        for stack, count in counts.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        print(f'\n⏱️  Sampled stacks ({len(collapsed_files)} files, {total:,} samples), '
+              f'top {args.top} innermost functions:')
+        for name, count in leaves.most_common(args.top):
+            print(f'   {count / total:7.1%}  {name}')
+        if args.collapsed:
+            with open(args.collapsed, 'w') as f:
+                for stack, count in counts.most_common():
+                    f.write(f'{stack} {count}\n')
+            print(f'💾 Merged stacks written to {args.collapsed} (flamegraph.pl / speedscope)')
@@ -0,0 +1,173 @@
+"""
+Explanations for batch predictions
+find_main_reason explains one row; main_reasons gives the same answers for
+a whole frame from the 14 rating columns as an int8 matrix, picking the two
+lowest (or highest) ratings per row with argpartition. DecisionPathExplainer
+instead lists the features the tree actually tested on each row's path.
+tests/test_reasons.py checks both against the row-by-row answers.
+"""
+
+import numpy as np
+
+from batch_engine import to_numeric_column
+
+SERVICE_FEATURES = {
+    'Inflight wifi service': 'Wifi',
+    'Departure/Arrival time convenient': 'Time Convenience',
+    'Ease of Online booking': 'Online Booking',
+    'Gate location': 'Gate Location',
+    'Food and drink': 'Food & Drink',
+    'Online boarding': 'Online Boarding',
+    'Seat comfort': 'Seat Comfort',
+    'Inflight entertainment': 'Entertainment',
+    'On-board service': 'Onboard Service',
+    'Leg room service': 'Leg Room',
+    'Baggage handling': 'Baggage',
+    'Checkin service': 'Check-in',
+    'Inflight service': 'Inflight Service',
+    'Cleanliness': 'Cleanliness'
+}
+
+DISSATISFIED = 'neutral or dissatisfied'
+POOR_RATING = 2
+GOOD_RATING = 4
+DELAY_MINUTES = 30
+
+_DISPLAY_NAMES = np.array(list(SERVICE_FEATURES.values()), dtype=object)
+
+# ==========================================
+# SINGLE ROW
+# ==========================================
+def find_main_reason(row, prediction):
+    """Find main reason for dissatisfaction based on lowest service ratings"""
+    if prediction == DISSATISFIED:
+        # Find services with rating <= 2
+        poor_services = []
+        for feature, display_name in SERVICE_FEATURES.items():
+            if feature in row and row[feature] <= POOR_RATING:
+                poor_services.append((display_name, row[feature]))
+
+        if poor_services:
+            # Sort by rating (lowest first)
+            poor_services.sort(key=lambda x: x[1])
+            # Return up to 2 worst services
+            reasons = [s[0] for s in poor_services[:2]]
+            return ', '.join(reasons)
+        else:
+            # Check delays
+            if 'Departure Delay in Minutes' in row and row['Departure Delay in Minutes'] > DELAY_MINUTES:
+                return 'Departure Delay'
+            elif 'Arrival Delay in Minutes' in row and row['Arrival Delay in Minutes'] > DELAY_MINUTES:
+                return 'Arrival Delay'
+            return 'Multiple Factors'
+    else:
+        # For satisfied customers, find highest rated services
+        good_services = []
+        for feature, display_name in SERVICE_FEATURES.items():
+            if feature in row and row[feature] >= GOOD_RATING:
+                good_services.append((display_name, row[feature]))
+
+        if good_services:
+            good_services.sort(key=lambda x: x[1], reverse=True)
+            reasons = [s[0] for s in good_services[:2]]
+            return ', '.join(reasons)
+        return 'Overall Experience'
+
+# ==========================================
+# WHOLE FRAME
+# ==========================================
+def _numeric(df, col):
+    """A column as floats (NaN where it is absent, missing or not a number)"""
+    if col not in df:
+        return np.full(len(df), np.nan)
+    return to_numeric_column(df[col])[0]
+
+def two_smallest(keys, selected):
+    """
+    Column indices of the two smallest selected keys in each row (-1 if fewer).
+
+    Equal keys keep column order, like the stable sort in find_main_reason.
+    Integer keys that fit int8 get the column index folded in, so every key is
+    unique and one argpartition is exact; anything else uses a stable argsort.
+    """
+    n_rows, n_cols = keys.shape
+    k = min(2, n_cols)
+    values = np.where(selected, keys, 0)
+    if n_rows and n_cols and np.array_equal(values, np.round(values)) \
+            and np.abs(values).max() <= np.iinfo(np.int8).max:
+        ranked = values.astype(np.int8).astype(np.int16) * n_cols + np.arange(n_cols, dtype=np.int16)
+        ranked[~selected] = np.iinfo(np.int16).max
+        top = np.argpartition(ranked, k - 1, axis=1)[:, :k]
+        top_keys = np.take_along_axis(ranked, top, axis=1)
+        order = np.argsort(top_keys, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+    else:
+        top = np.argsort(np.where(selected, keys, np.inf), axis=1, kind='stable')[:, :k]
+
+    top = np.where(np.take_along_axis(selected, top, axis=1), top, -1)
+    if k < 2:
+        top = np.hstack([top, np.full((n_rows, 2 - k), -1, dtype=top.dtype)])
+    return top
+
+def main_reasons(df, predictions):
+    """find_main_reason for every row of df at once; returns an object array"""
+    predictions = np.asarray(predictions, dtype=object)
+    dissatisfied = (predictions == DISSATISFIED)[:, None]
+
+    ratings = np.column_stack([_numeric(df, col) for col in SERVICE_FEATURES]) \
+        if len(df) else np.empty((0, len(SERVICE_FEATURES)))
+    # Lowest ratings <= 2 for dissatisfied rows, highest >= 4 otherwise
+    # (NaN compares False, so missing ratings are never picked)
+    selected = np.where(dissatisfied, ratings <= POOR_RATING, ratings >= GOOD_RATING)
+    keys = np.where(dissatisfied, ratings, -ratings)
+    first, second = two_smallest(keys, selected).T
+
+    names = _DISPLAY_NAMES[first]
+    named = np.where(second >= 0, names + ', ' + _DISPLAY_NAMES[second], names)
+
+    departure = _numeric(df, 'Departure Delay in Minutes')
+    arrival = _numeric(df, 'Arrival Delay in Minutes')
+    fallback = np.where(departure > DELAY_MINUTES, 'Departure Delay',
+                        np.where(arrival > DELAY_MINUTES, 'Arrival Delay', 'Multiple Factors'))
+    fallback = np.where(dissatisfied[:, 0], fallback, 'Overall Experience').astype(object)
+
+    return np.where(first >= 0, named, fallback)
+
+# ==========================================
+# DECISION PATHS
+# ==========================================
+def node_paths(tree):
+    """Features tested from the root down to every node, in test order without repeats"""
+    paths = [()] * tree.node_count
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        feature = int(tree.feature[node])
+        if feature < 0:
+            continue
+        path = paths[node] if feature in paths[node] else paths[node] + (feature,)
+        for child in (int(tree.left[node]), int(tree.right[node])):
+            paths[child] = path
+            stack.append(child)
+    return paths
+
+class DecisionPathExplainer:
+    """
+    Per-row decision-path explanations for a CompiledTree (sklearn or ID3).
+
+    A row's path is fixed by the leaf it reaches, so the explanation of
+    every leaf is built once from the node arrays and explaining a batch
+    is one vectorized apply() plus an array lookup.
+    """
+
+    def __init__(self, tree, feature_names):
+        self.tree = tree
+        names = [SERVICE_FEATURES.get(col, col) for col in feature_names]
+        self.leaf_text = np.full(tree.node_count, '', dtype=object)
+        for node, path in enumerate(node_paths(tree)):
+            if tree.feature[node] < 0:
+                self.leaf_text[node] = ', '.join(names[f] for f in path)
+
+    def explain(self, X):
+        """The features tested for every row of the encoded matrix X"""
+        return self.leaf_text[self.tree.apply(X)]
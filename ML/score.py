@@ -0,0 +1,158 @@
+"""
+Offline batch scorer for CSV / Parquet files and directories
+Reads each input chunk by chunk with the serving preprocessing and model
+(model.bundle), and streams it to a CSV with Prediction and Main Reason
+columns, so files of any size are scored without the web app
+
+Usage: python score.py input.csv [more.csv data_dir/ ...] [-o output.csv | -o out_dir/]
+                       [--workers 4] [--chunk-size 50000] [--bundle model.bundle]
+                       [--explain-path]
+       (without -o each input is written next to itself as <name>.scored.csv;
+        directories are scanned for *.csv, *.parquet and *.pq files)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from batch_engine import REQUIRED_COLUMNS, stream_scored_csv
+from shard_scoring import DEFAULT_BUNDLE, BundleScorer, ShardPool
+
+CHUNK_SIZE = 50000
+CSV_SUFFIXES = ('.csv',)
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+OUTPUT_SUFFIX = '.scored.csv'
+
+# ==========================================
+# INPUT AND OUTPUT FILES
+# ==========================================
+def find_inputs(paths):
+    """Expand directories into the CSV / Parquet files they contain (skipping earlier outputs)"""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                lower = name.lower()
+                if lower.endswith(CSV_SUFFIXES + PARQUET_SUFFIXES) and not lower.endswith(OUTPUT_SUFFIX):
+                    inputs.append(os.path.join(path, name))
+        else:
+            inputs.append(path)
+    return inputs
+
+def output_path(path, output, to_directory):
+    """Where the scored copy of path goes"""
+    name = os.path.splitext(os.path.basename(path))[0] + OUTPUT_SUFFIX
+    if output is None:
+        return os.path.join(os.path.dirname(path), name)
+    return os.path.join(output, name) if to_directory else output
+
+def read_chunks(path, chunk_size):
+    """DataFrames of up to chunk_size rows from a CSV or Parquet file"""
+    import pandas as pd
+
+    if path.lower().endswith(PARQUET_SUFFIXES):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError('Parquet input needs pyarrow installed') from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        with pd.read_csv(path, chunksize=chunk_size) as reader:
+            yield from reader
+
+def checked(chunks):
+    """Pass chunks through, failing on the first one if a required column is missing"""
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            missing_cols = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing_cols:
+                raise ValueError(f'Missing columns: {", ".join(missing_cols)}')
+        yield chunk
+
+# ==========================================
+# SCORING
+# ==========================================
+def score_file(path, output, score_chunks, chunk_size):
+    """Stream one file through score_chunks into output; return the totals"""
+    totals = {}
+    scored = score_chunks(checked(read_chunks(path, chunk_size)))
+    try:
+        with open(output + '.tmp', 'w', encoding='utf-8', newline='') as out:
+            for text in stream_scored_csv(scored, totals):
+                out.write(text)
+        os.replace(output + '.tmp', output)
+    finally:
+        if os.path.exists(output + '.tmp'):
+            os.remove(output + '.tmp')
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description='Score CSV / Parquet files offline with model.bundle')
+    parser.add_argument('inputs', nargs='+', help='files or directories')
+    parser.add_argument('-o', '--output', help='output file (one input) or directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='scoring processes (1 scores in this process)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--bundle', default=DEFAULT_BUNDLE)
+    parser.add_argument('--explain-path', action='store_true',
+                        help='add a Decision Path column')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.bundle):
+        print(f'❌ {args.bundle} not found. Run train_model_fast.py or model_bundle.py first!')
+        sys.exit(1)
+
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        print('❌ No CSV or Parquet files to score')
+        sys.exit(1)
+    to_directory = args.output is not None and (
+        len(inputs) > 1 or os.path.isdir(args.output) or args.output.endswith(os.sep)
+        or any(os.path.isdir(path) for path in args.inputs))
+    if to_directory:
+        os.makedirs(args.output, exist_ok=True)
+
+    if args.workers > 1:
+        pool = ShardPool(args.bundle, args.workers)
+        pool.warm_up()
+        score_chunks = lambda chunks: pool.score_chunks(chunks, args.explain_path)
+    else:
+        pool = None
+        scorer = BundleScorer(args.bundle)
+        score_chunks = lambda chunks: ((chunk, scorer.score(chunk, args.explain_path))
+                                       for chunk in chunks)
+
+    print(f'🚀 Scoring {len(inputs)} file(s) on {max(args.workers, 1)} process(es), '
+          f'{args.chunk_size:,} rows per chunk')
+    failed = 0
+    total_rows = 0
+    start = time.perf_counter()
+    for path in inputs:
+        output = output_path(path, args.output, to_directory)
+        file_start = time.perf_counter()
+        try:
+            totals = score_file(path, output, score_chunks, args.chunk_size)
+        except Exception as e:
+            failed += 1
+            print(f'❌ {path}: {e}')
+            continue
+
+        seconds = time.perf_counter() - file_start
+        rows = totals['total']
+        total_rows += rows
+        print(f'✅ {path}: {rows:,} rows in {seconds:.2f}s '
+              f'({rows / seconds if seconds > 0 else 0:,.0f} rows/sec) -> {output}')
+        print(f'   📊 satisfied={totals["satisfied"]:,}, dissatisfied={totals["dissatisfied"]:,}, '
+              f'errors={totals["errors"]:,}')
+
+    elapsed = time.perf_counter() - start
+    if pool is not None:
+        pool.shutdown()
+    print(f'⏱️  {len(inputs) - failed}/{len(inputs)} files, {total_rows:,} rows in {elapsed:.2f}s '
+          f'({total_rows / elapsed if elapsed > 0 else 0:,.0f} rows/sec)')
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Production server for app.py / app_fast.py
+Imports the app (and memory-maps its model bundle) once in a master
+process, then forks worker processes that share it copy-on-write. Each
+worker serves the shared listening socket with a fixed pool of threads;
+the debugger and reloader are never enabled.
+
+Usage: python serve.py [--app app_fast] [--workers 4] [--threads 8]
+                       [--host 0.0.0.0] [--port 8000] [--access-log]
+       (WORKERS, THREADS, HOST and PORT environment variables set the defaults)
+"""
+
+import argparse
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_THREADS = 8
+LISTEN_BACKLOG = 1024
+
+# ==========================================
+# WORKER SERVER
+# ==========================================
+class RequestHandler(WSGIRequestHandler):
+    """One request per connection, so idle keep-alive clients cannot pin pool threads"""
+
+    protocol_version = 'HTTP/1.0'
+    access_log = False
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log:
+            super().log_request(code, size)
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles requests on a bounded thread pool"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd=None, handler=RequestHandler):
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        if hasattr(self, 'pool'):
+            self.pool.shutdown(wait=False)
+
+def run_worker(app, listener, threads):
+    """Serve requests in a forked worker until it is terminated"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master handles Ctrl+C
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    host, port = listener.getsockname()[:2]
+    server = PooledWSGIServer(host, port, app, threads, fd=listener.fileno())
+    server.serve_forever()
+
+# ==========================================
+# MASTER PROCESS
+# ==========================================
+def load_app(name):
+    """Import an app module once, with debug mode off"""
+    app = importlib.import_module(name).app
+    app.debug = False
+    return app
+
+def open_listener(host, port):
+    listener = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET,
+                             socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(LISTEN_BACKLOG)
+    listener.set_inheritable(True)
+    return listener
+
+def _stop(signum, frame):
+    raise SystemExit(0)
+
+def serve(app_name, host, port, workers, threads, access_log=False):
+    """Preload the app, fork the workers and restart any that die"""
+    app = load_app(app_name)
+    RequestHandler.access_log = access_log
+    listener = open_listener(host, port)
+
+    if not hasattr(os, 'fork'):
+        # No fork (Windows): a single process with the thread pool
+        print(f"✈️  Serving {app_name} on http://{host}:{port} (1 process, {threads} threads)")
+        PooledWSGIServer(host, port, app, threads, fd=listener.fileno()).serve_forever()
+        return
+
+    # Move everything loaded so far out of the GC's reach so collections in
+    # the workers do not write to (and un-share) the preloaded pages
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, listener, threads)
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    for _ in range(workers):
+        spawn()
+    print(f"✈️  Serving {app_name} on http://{host}:{port} "
+          f"({workers} workers x {threads} threads, master pid {os.getpid()})")
+
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        while True:
+            pid, status = os.wait()
+            if pid in children:
+                children.discard(pid)
+                print(f"⚠️  Worker {pid} exited with status {status}, restarting")
+                spawn()
+    except (KeyboardInterrupt, SystemExit):
+        print("\n🛑 Shutting down workers...")
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        listener.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Serve app.py / app_fast.py with preforked workers')
+    parser.add_argument('--app', default='app_fast', choices=['app_fast', 'app'])
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('WORKERS', DEFAULT_WORKERS)))
+    parser.add_argument('--threads', type=int,
+                        default=int(os.environ.get('THREADS', DEFAULT_THREADS)))
+    parser.add_argument('--access-log', action='store_true', help='log every request')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    serve(args.app, args.host, args.port, max(args.workers, 1), max(args.threads, 1),
+          args.access_log)
+    sys.exit(0)
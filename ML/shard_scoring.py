@@ -0,0 +1,291 @@
+"""
+Multi-core batch scoring over row shards
+Splits a frame into contiguous row shards, scores them in a process pool
+whose workers each map the model bundle once, and reassembles the
+predictions in the original row order
+
+Usage: python shard_scoring.py input.csv output.csv [--workers 4] [--bundle model.bundle]
+       python shard_scoring.py input.csv --benchmark [--workers 4]
+       (--benchmark reports speedup and scaling efficiency for 1..workers processes)
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import SpawnContext, SpawnProcess
+
+import numpy as np
+
+from batch_engine import REQUIRED_COLUMNS, predict_frame, score_row
+from binning import Binner
+from model_bundle import ModelBundle
+from reasons import DecisionPathExplainer, find_main_reason, main_reasons
+
+DEFAULT_BUNDLE = 'model.bundle'
+
+# Shards are never made smaller than this, so small inputs are not split up
+MIN_SHARD_ROWS = 10000
+
+# ==========================================
+# WORKER PROCESSES
+# ==========================================
+class BundleScorer:
+    """Scores DataFrames with the tree, encoders and bins of one model bundle"""
+
+    def __init__(self, bundle_path):
+        bundle = ModelBundle.load(bundle_path, expected_columns=REQUIRED_COLUMNS)
+        self.model = bundle.tree
+        self.encoder_tables = bundle.encoder_tables()
+        self.binner = Binner(bundle.binning_config)
+        self.feature_columns = bundle.feature_columns
+        self._explainer = None
+
+    def predict_row(self, row):
+        return score_row(row, self.model, self.encoder_tables, self.binner,
+                         self.feature_columns, find_main_reason)
+
+    def explain_paths(self, X):
+        if self._explainer is None:
+            self._explainer = DecisionPathExplainer(self.model, self.feature_columns)
+        return self._explainer.explain(X)
+
+    def score(self, df, explain_path=False):
+        """predict_frame over df: one {'result', 'reason'[, 'path']} dict per row"""
+        return predict_frame(df, self.model, self.encoder_tables, self.binner,
+                             self.feature_columns, self.predict_row, main_reasons,
+                             explain_path=self.explain_paths if explain_path else None)
+
+# Scorers of each pool process by bundle path; after a model hot-swap the
+# next shard loads the new version and the oldest one is dropped
+_scorers = {}
+MAX_WORKER_BUNDLES = 2
+
+def _scorer(bundle_path):
+    scorer = _scorers.get(bundle_path)
+    if scorer is None:
+        if len(_scorers) >= MAX_WORKER_BUNDLES:
+            del _scorers[next(iter(_scorers))]
+        scorer = _scorers[bundle_path] = BundleScorer(bundle_path)
+    return scorer
+
+def _score_shard(df, explain_path, bundle_path):
+    """Score one shard; returned as one list per key, which pickles far faster than dicts"""
+    predictions = _scorer(bundle_path).score(df, explain_path)
+    keys = ['result', 'reason', 'path'] if explain_path else ['result', 'reason']
+    return keys, [[p[key] for p in predictions] for key in keys]
+
+def _as_dicts(keys, columns):
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+def _warm(bundle_path):
+    _scorer(bundle_path)
+    return os.getpid()
+
+class _WorkerProcess(SpawnProcess):
+    """
+    Spawned worker that starts from this module, not the parent's script.
+
+    A spawned process first re-imports the parent's __main__ module, so a
+    pool started under python app_fast.py would load the models, print the
+    banner and build a Flask app in every worker. When __main__ has a
+    __spec__, multiprocessing imports that module by name instead; it is
+    pointed at this module only while the worker is being started.
+    """
+    _lock = threading.Lock()
+
+    def start(self):
+        main = sys.modules.get('__main__')
+        # Run as a script this module is __main__ itself and has no __spec__
+        if __spec__ is None or main is None:
+            return super().start()
+        with self._lock:
+            saved = main.__spec__
+            main.__spec__ = __spec__
+            try:
+                super().start()
+            finally:
+                main.__spec__ = saved
+
+class _WorkerContext(SpawnContext):
+    Process = _WorkerProcess
+
+# ==========================================
+# SHARD POOL
+# ==========================================
+def shard_bounds(n_rows, n_shards, min_rows=MIN_SHARD_ROWS):
+    """(start, stop) row ranges of at most n_shards contiguous, near-equal shards"""
+    n_shards = max(1, min(n_shards, n_rows // min_rows))
+    edges = np.linspace(0, n_rows, n_shards + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+class ShardPool:
+    """
+    Process pool that scores large frames one row shard per process.
+
+    Workers are started with spawn (forking a threaded server is unsafe)
+    from this module rather than the app's script and are kept for later
+    calls. Every task names the bundle it is scored with, so each worker
+    maps a bundle the first time it sees it (memory-mapped, so the page
+    cache holds a single copy) and a hot-swapped model version is picked
+    up by the next call; bundle_path is only the default. The pool is
+    created on first use in each process and again after a worker dies.
+    """
+
+    def __init__(self, bundle_path, workers):
+        self.bundle_path = bundle_path
+        self.workers = max(int(workers), 1)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=_WorkerContext())
+                self._pid = os.getpid()
+            return self._pool
+
+    def _discard(self, executor):
+        """Drop a broken executor, so the next call starts a fresh one"""
+        with self._lock:
+            if self._pool is executor:
+                self._pool = None
+                self._pid = None
+        executor.shutdown(wait=False)
+
+    def warm_up(self, bundle_path=None):
+        """Start the worker processes (and load the bundle) ahead of the first batch"""
+        bundle_path = bundle_path or self.bundle_path
+        executor = self._executor()
+        try:
+            for future in [executor.submit(_warm, bundle_path) for _ in range(self.workers)]:
+                future.result()
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def score_frame(self, df, explain_path=False, bundle_path=None):
+        """Score df shard by shard in the pool; predictions come back in row order"""
+        shards = [df.iloc[start:stop] for start, stop in shard_bounds(len(df), self.workers)]
+        bundle_path = bundle_path or self.bundle_path
+        executor = self._executor()
+        predictions = []
+        try:
+            for keys, columns in executor.map(_score_shard, shards,
+                                              [explain_path] * len(shards),
+                                              [bundle_path] * len(shards)):
+                predictions.extend(_as_dicts(keys, columns))
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+        return predictions
+
+    def score_chunks(self, chunks, explain_path=False, bundle_path=None):
+        """
+        Score an iterator of frames, one chunk per task, yielding
+        (chunk, predictions) in input order.
+
+        At most two chunks per worker are read ahead, so a file of any size
+        streams through in bounded memory.
+        """
+        executor = self._executor()
+        bundle_path = bundle_path or self.bundle_path
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_score_shard, chunk, explain_path, bundle_path)))
+                if len(pending) >= 2 * self.workers:
+                    chunk, future = pending.popleft()
+                    yield chunk, _as_dicts(*future.result())
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, _as_dicts(*future.result())
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+            self._pid = None
+
+# ==========================================
+# COMMAND LINE
+# ==========================================
+def benchmark(df, bundle_path, max_workers, repeats=3):
+    """Time in-process scoring and the pool with 1..max_workers processes"""
+    scorer = BundleScorer(bundle_path)
+    expected = scorer.score(df)
+
+    def best_of(fn):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    baseline, _ = best_of(lambda: scorer.score(df))
+    print(f'⏱️  {len(df):,} rows, {os.cpu_count()} CPUs, best of {repeats}')
+    print(f'   {"processes":>9} {"seconds":>8} {"rows/sec":>10} {"speedup":>8} {"efficiency":>10}')
+    print(f'   {"in-proc":>9} {baseline:8.3f} {len(df) / baseline:10,.0f} {1:8.2f} {"-":>10}')
+
+    ok = True
+    for workers in range(1, max_workers + 1):
+        pool = ShardPool(bundle_path, workers)
+        pool.warm_up()
+        seconds, predictions = best_of(lambda: pool.score_frame(df))
+        pool.shutdown()
+        ok = ok and predictions == expected
+        speedup = baseline / seconds
+        print(f'   {workers:>9} {seconds:8.3f} {len(df) / seconds:10,.0f} '
+              f'{speedup:8.2f} {speedup / workers:10.0%}')
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV in row shards on a process pool')
+    parser.add_argument('input')
+    parser.add_argument('output', nargs='?')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--bundle', default=DEFAULT_BUNDLE)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    df = pd.read_csv(args.input)
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_cols:
+        print(f'❌ Missing columns: {", ".join(missing_cols)}')
+        sys.exit(1)
+
+    if args.benchmark:
+        ok = benchmark(df, args.bundle, args.workers)
+        print(f"{'✅' if ok else '❌'} Sharded predictions "
+              f"{'match' if ok else 'differ from'} in-process scoring")
+        sys.exit(0 if ok else 1)
+
+    if not args.output:
+        parser.error('output is required unless --benchmark is given')
+    pool = ShardPool(args.bundle, args.workers)
+    start = time.perf_counter()
+    predictions = pool.score_frame(df)
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+
+    df['Prediction'] = [p['result'] for p in predictions]
+    df['Main Reason'] = [p['reason'] for p in predictions]
+    df.to_csv(args.output, index=False)
+    print(f'✅ Scored {len(df):,} rows on {args.workers} processes in {elapsed:.2f}s '
+          f'({len(df) / elapsed:,.0f} rows/sec) -> {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+"""
+Synthetic passenger data for scale testing
+Learns the marginal distribution of every input column and their pairwise
+dependence (a Gaussian copula over normal scores) from a reference CSV, or
+uses built-in defaults shaped like the Kaggle airline data, and streams out
+rows in the exact /predict_batch schema chunk by chunk
+
+Usage: python synthetic_data.py output.csv [--rows 10000000] [--reference train.csv]
+                                [--chunk-size 1000000] [--workers 4] [--seed 0] [--label]
+                                [--save-profile profile.json] [--profile profile.json]
+                                [--check]
+       (--label adds the satisfaction column, so the output can stand in for
+        train.csv; --check compares a sample against the learned distribution)
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.special import ndtri
+
+from batch_engine import REQUIRED_COLUMNS
+
+LABEL_COLUMN = 'satisfaction'
+CHUNK_SIZE = 1000000
+
+# Reference rows used for fitting (a random sample beyond this)
+MAX_FIT_ROWS = 1000000
+
+# Discretizing correlated normals weakens their correlation, so the copula's
+# latent correlation is adjusted until samples reproduce the target
+CALIBRATION_ROUNDS = 6
+CALIBRATION_ROWS = 100000
+
+# --check tolerances: largest gap between a sampled and the learned cumulative
+# distribution, and between sampled and target pairwise correlations
+MAX_MARGINAL_GAP = 0.01
+MAX_CORRELATION_DIFF = 0.05
+
+# ==========================================
+# BUILT-IN DEFAULTS
+# ==========================================
+def _discretized(values, weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    return [str(v) for v in values], weights / weights.sum()
+
+def _delays(mean_tail, zero_share, as_float=False):
+    minutes = np.arange(0, 1601)
+    weights = np.exp(-minutes / mean_tail)
+    weights[1:] *= (1 - zero_share) / weights[1:].sum()
+    weights[0] = zero_share
+    tokens = [f'{m}.0' if as_float else str(m) for m in minutes]
+    return tokens, weights / weights.sum()
+
+RATING_SHARES = {
+    'Inflight wifi service': [0.03, 0.17, 0.25, 0.25, 0.19, 0.11],
+    'Departure/Arrival time convenient': [0.05, 0.15, 0.17, 0.17, 0.25, 0.21],
+    'Ease of Online booking': [0.04, 0.17, 0.23, 0.24, 0.19, 0.13],
+    'Gate location': [0.00, 0.17, 0.19, 0.27, 0.24, 0.13],
+    'Food and drink': [0.00, 0.12, 0.21, 0.21, 0.24, 0.22],
+    'Online boarding': [0.02, 0.10, 0.17, 0.21, 0.30, 0.20],
+    'Seat comfort': [0.00, 0.12, 0.14, 0.18, 0.31, 0.25],
+    'Inflight entertainment': [0.00, 0.12, 0.17, 0.18, 0.28, 0.25],
+    'On-board service': [0.00, 0.11, 0.14, 0.22, 0.30, 0.23],
+    'Leg room service': [0.00, 0.10, 0.19, 0.19, 0.28, 0.24],
+    'Baggage handling': [0.00, 0.07, 0.11, 0.20, 0.36, 0.26],
+    'Checkin service': [0.00, 0.12, 0.12, 0.27, 0.28, 0.21],
+    'Inflight service': [0.00, 0.07, 0.11, 0.19, 0.37, 0.26],
+    'Cleanliness': [0.00, 0.13, 0.16, 0.24, 0.26, 0.21],
+}
+
+def default_marginals():
+    """Column -> (tokens, probabilities) resembling the Kaggle airline satisfaction data"""
+    ages = np.arange(7, 86)
+    distances = np.arange(31, 4984)
+    marginals = {
+        'Gender': (['Female', 'Male'], np.array([0.507, 0.493])),
+        'Customer Type': (['Loyal Customer', 'disloyal Customer'], np.array([0.817, 0.183])),
+        'Age': _discretized(ages, np.exp(-0.5 * ((ages - 39.4) / 15.1) ** 2)),
+        'Type of Travel': (['Business travel', 'Personal Travel'], np.array([0.69, 0.31])),
+        'Class': (['Business', 'Eco', 'Eco Plus'], np.array([0.478, 0.45, 0.072])),
+        'Flight Distance': _discretized(
+            distances, np.exp(-0.5 * ((np.log(distances) - np.log(843)) / 0.8) ** 2) / distances),
+        **{col: _discretized(range(6), shares) for col, shares in RATING_SHARES.items()},
+        'Departure Delay in Minutes': _delays(33, 0.565),
+        'Arrival Delay in Minutes': _delays(33, 0.56, as_float=True),
+        LABEL_COLUMN: (['neutral or dissatisfied', 'satisfied'], np.array([0.567, 0.433])),
+    }
+    return marginals
+
+# Pairwise correlations of normal scores (codes in the token order above);
+# every pair not listed is independent. The label's correlations are kept
+# low enough that a Gaussian copula can reproduce all of them at once
+DEFAULT_CORRELATIONS = {
+    ('Departure Delay in Minutes', 'Arrival Delay in Minutes'): 0.96,
+    ('Customer Type', 'Age'): -0.28,
+    ('Type of Travel', 'Class'): 0.55,
+    ('Class', 'Flight Distance'): -0.45,
+    ('Type of Travel', 'Flight Distance'): -0.27,
+    ('Inflight wifi service', 'Ease of Online booking'): 0.72,
+    ('Inflight wifi service', 'Departure/Arrival time convenient'): 0.34,
+    ('Inflight wifi service', 'Gate location'): 0.34,
+    ('Inflight wifi service', 'Online boarding'): 0.46,
+    ('Ease of Online booking', 'Departure/Arrival time convenient'): 0.44,
+    ('Ease of Online booking', 'Gate location'): 0.46,
+    ('Ease of Online booking', 'Online boarding'): 0.40,
+    ('Departure/Arrival time convenient', 'Gate location'): 0.44,
+    ('Food and drink', 'Cleanliness'): 0.66,
+    ('Food and drink', 'Seat comfort'): 0.57,
+    ('Food and drink', 'Inflight entertainment'): 0.62,
+    ('Seat comfort', 'Cleanliness'): 0.68,
+    ('Seat comfort', 'Inflight entertainment'): 0.61,
+    ('Seat comfort', 'Online boarding'): 0.42,
+    ('Inflight entertainment', 'Cleanliness'): 0.69,
+    ('Inflight entertainment', 'On-board service'): 0.42,
+    ('On-board service', 'Inflight service'): 0.55,
+    ('On-board service', 'Baggage handling'): 0.52,
+    ('On-board service', 'Leg room service'): 0.37,
+    ('Baggage handling', 'Inflight service'): 0.63,
+    ('Leg room service', 'Inflight service'): 0.37,
+    ('Leg room service', 'Baggage handling'): 0.37,
+    ('Checkin service', 'Online boarding'): 0.20,
+    (LABEL_COLUMN, 'Online boarding'): 0.35,
+    (LABEL_COLUMN, 'Class'): -0.32,
+    (LABEL_COLUMN, 'Type of Travel'): -0.32,
+    (LABEL_COLUMN, 'Inflight entertainment'): 0.28,
+    (LABEL_COLUMN, 'Seat comfort'): 0.24,
+    (LABEL_COLUMN, 'On-board service'): 0.22,
+    (LABEL_COLUMN, 'Leg room service'): 0.22,
+    (LABEL_COLUMN, 'Cleanliness'): 0.22,
+    (LABEL_COLUMN, 'Flight Distance'): 0.21,
+    (LABEL_COLUMN, 'Inflight wifi service'): 0.20,
+    (LABEL_COLUMN, 'Baggage handling'): 0.17,
+    (LABEL_COLUMN, 'Inflight service'): 0.17,
+    (LABEL_COLUMN, 'Checkin service'): 0.17,
+    (LABEL_COLUMN, 'Food and drink'): 0.15,
+    (LABEL_COLUMN, 'Ease of Online booking'): 0.12,
+    (LABEL_COLUMN, 'Age'): 0.09,
+    (LABEL_COLUMN, 'Customer Type'): -0.13,
+}
+
+# Share of missing values (Arrival Delay has gaps in the Kaggle data)
+DEFAULT_MISSING = {'Arrival Delay in Minutes': 0.003}
+
+def nearest_correlation(matrix, floor=1e-6):
+    """Clip negative eigenvalues so a hand-written (or noisy) matrix is a valid correlation"""
+    values, vectors = np.linalg.eigh((matrix + matrix.T) / 2)
+    fixed = vectors @ np.diag(np.maximum(values, floor)) @ vectors.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+def score_table(probabilities):
+    """Normal score of each value (at the middle of its probability mass), then 0 for missing"""
+    middle = np.cumsum(probabilities) - np.asarray(probabilities) / 2
+    return np.append(ndtri(np.clip(middle, 1e-12, 1 - 1e-12)), 0.0)
+
+# ==========================================
+# CSV ENCODING
+# ==========================================
+def _csv_token(text):
+    if any(ch in text for ch in ',"\n\r'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+class TokenTable:
+    """A column's tokens as a zero-padded byte matrix, so rows can be assembled with array ops"""
+
+    def __init__(self, tokens):
+        encoded = [_csv_token(t).encode('utf-8') for t in tokens]
+        self.lengths = np.array([len(t) for t in encoded], dtype=np.int64)
+        self.width = int(self.lengths.max()) if encoded else 0
+        self.bytes = np.zeros((len(encoded), self.width), dtype=np.uint8)
+        for i, token in enumerate(encoded):
+            self.bytes[i, :len(token)] = np.frombuffer(token, dtype=np.uint8)
+
+    def fields(self, separator):
+        """Every token followed by separator, padded with zero bytes to one width"""
+        fields = np.zeros((len(self.lengths), self.width + 1), dtype=np.uint8)
+        fields[:, :self.width] = self.bytes
+        fields[np.arange(len(self.lengths)), self.lengths] = ord(separator)
+        return fields
+
+def csv_rows(codes, tables):
+    """
+    CSV text (bytes) for a matrix of token indices, one column per table.
+
+    Each column is one gather of its padded fields into a fixed-width byte
+    matrix; dropping the zero padding then leaves the CSV text, so no row
+    is ever formatted on its own. Zero bytes never occur in the tokens.
+    """
+    n_rows, n_cols = codes.shape
+    fields = [table.fields('\n' if j == n_cols - 1 else ',') for j, table in enumerate(tables)]
+    offsets = np.cumsum([0] + [f.shape[1] for f in fields])
+    rows = np.empty((n_rows, int(offsets[-1])), dtype=np.uint8)
+    for j, field in enumerate(fields):
+        rows[:, offsets[j]:offsets[j + 1]] = field[codes[:, j]]
+    return rows[rows != 0].tobytes()
+
+# ==========================================
+# DISTRIBUTION
+# ==========================================
+class PassengerDistribution:
+    """
+    Per-column empirical marginals joined by a Gaussian copula.
+
+    Each column is a list of tokens (the CSV text of every value) with their
+    probabilities and a share of missing values. Sampling draws correlated
+    standard normals, maps them to uniforms and looks each one up in the
+    column's cumulative probabilities, so every step is vectorized.
+    """
+
+    def __init__(self, columns, tokens, probabilities, missing, correlation, seed=0):
+        """correlation: target pairwise correlation of the columns' normal scores"""
+        self.columns = list(columns)
+        self.tokens = [list(t) for t in tokens]
+        self.probabilities = [np.asarray(p, dtype=np.float64) / np.sum(p) for p in probabilities]
+        self.missing = np.asarray(missing, dtype=np.float64)
+        self.correlation = nearest_correlation(np.asarray(correlation, dtype=np.float64))
+        # A value is drawn where its column's normal falls between these
+        # quantiles, so sampling needs no normal CDF evaluations
+        self._thresholds = [ndtri(np.clip(np.cumsum(p)[:-1], 0, 1)).astype(np.float32)
+                            for p in self.probabilities]
+        self._scores = [score_table(p) for p in self.probabilities]
+        # The token after the last value of every column is the empty (missing) field
+        self._tables = [TokenTable(t + ['']) for t in self.tokens]
+        self._cholesky = np.linalg.cholesky(self.calibrate(seed))
+
+    def calibrate(self, seed=0):
+        """Latent copula correlation whose samples have self.correlation as their score correlation"""
+        latent = self.correlation.copy()
+        rng = np.random.default_rng(seed)
+        for _ in range(CALIBRATION_ROUNDS):
+            self._cholesky = np.linalg.cholesky(latent)
+            achieved = np.corrcoef(self.normal_scores(self.sample_codes(CALIBRATION_ROWS, rng)),
+                                   rowvar=False)
+            # Constant columns have no correlation to match
+            adjustment = np.nan_to_num(self.correlation - achieved)
+            latent = nearest_correlation(np.clip(latent + adjustment, -0.999, 0.999))
+        return latent
+
+    @classmethod
+    def defaults(cls):
+        """Built-in distribution for when no reference data is available"""
+        marginals = default_marginals()
+        columns = list(marginals)
+        position = {col: i for i, col in enumerate(columns)}
+        correlation = np.eye(len(columns))
+        for (a, b), value in DEFAULT_CORRELATIONS.items():
+            correlation[position[a], position[b]] = correlation[position[b], position[a]] = value
+        return cls(columns, [marginals[c][0] for c in columns], [marginals[c][1] for c in columns],
+                   [DEFAULT_MISSING.get(c, 0.0) for c in columns], correlation)
+
+    @classmethod
+    def fit(cls, df, max_rows=MAX_FIT_ROWS, seed=0):
+        """Learn the distribution of REQUIRED_COLUMNS (and the label, if present) from a raw frame"""
+        columns = REQUIRED_COLUMNS + ([LABEL_COLUMN] if LABEL_COLUMN in df.columns else [])
+        missing_cols = [col for col in columns if col not in df.columns]
+        if missing_cols:
+            raise ValueError(f'Missing columns: {", ".join(missing_cols)}')
+        if len(df) > max_rows:
+            df = df.sample(max_rows, random_state=seed)
+
+        tokens, probabilities, missing, codes = [], [], [], []
+        for col in columns:
+            column = df[col]
+            present = column.notna().to_numpy()
+            values, index, counts = np.unique(column[present].to_numpy(), return_inverse=True,
+                                              return_counts=True)
+            if column.dtype.kind == 'f' and not np.array_equal(values, np.round(values)):
+                tokens.append([repr(float(v)) for v in values])
+            elif column.dtype.kind == 'f':
+                tokens.append([f'{int(v)}.0' for v in values])
+            else:
+                tokens.append([str(v) for v in values])
+            probabilities.append(counts / counts.sum())
+            missing.append(1 - present.mean())
+            code = np.full(len(df), len(values), dtype=np.int64)
+            code[present] = index
+            codes.append(code)
+
+        scores = np.column_stack([score_table(p)[code] for p, code in zip(probabilities, codes)])
+        correlation = np.nan_to_num(np.corrcoef(scores, rowvar=False))
+        np.fill_diagonal(correlation, 1.0)
+        return cls(columns, tokens, probabilities, missing, correlation, seed=seed)
+
+    # ------------------------------------------
+    def normal_scores(self, codes):
+        """Mid-rank normal scores of token indices (missing values score 0)"""
+        scores = np.empty(codes.shape)
+        for j, table in enumerate(self._scores):
+            scores[:, j] = table[codes[:, j]]
+        return scores
+
+    def sample_codes(self, n_rows, rng):
+        """(n_rows, n_columns) token indices; the index len(tokens) means missing"""
+        # One contiguous row of correlated normals per column
+        normals = self._cholesky.astype(np.float32) @ rng.standard_normal(
+            (len(self.columns), n_rows), dtype=np.float32)
+        codes = np.empty((n_rows, len(self.columns)), dtype=np.intp, order='F')
+        for j, thresholds in enumerate(self._thresholds):
+            column = np.searchsorted(thresholds, normals[j], side='right')
+            if self.missing[j] > 0:
+                column[rng.random(n_rows) < self.missing[j]] = len(thresholds) + 1
+            codes[:, j] = column
+        return codes
+
+    def output_columns(self, label=False):
+        """REQUIRED_COLUMNS in /predict_batch order, plus the label if asked for and known"""
+        columns = list(REQUIRED_COLUMNS)
+        if label:
+            if LABEL_COLUMN not in self.columns:
+                raise ValueError(f'The distribution has no {LABEL_COLUMN!r} column')
+            columns.append(LABEL_COLUMN)
+        return columns
+
+    def csv_chunk(self, n_rows, seed, select):
+        """CSV text of n_rows sampled rows, keeping the columns at indices select"""
+        codes = self.sample_codes(n_rows, np.random.default_rng(seed))
+        return csv_rows(codes[:, select], [self._tables[j] for j in select])
+
+    def iter_csv(self, n_rows, chunk_size=CHUNK_SIZE, seed=0, label=False, workers=1):
+        """
+        CSV bytes: the header, then one block per chunk of sampled rows.
+
+        Every chunk has its own seed spawned from seed, so the output is the
+        same whether chunks are generated here or on workers processes.
+        """
+        columns = self.output_columns(label)
+        select = [self.columns.index(col) for col in columns]
+
+        header = io.StringIO()
+        csv.writer(header, lineterminator='\n').writerow(columns)
+        yield header.getvalue().encode('utf-8')
+
+        sizes = [min(chunk_size, n_rows - start) for start in range(0, n_rows, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        if workers <= 1:
+            for size, chunk_seed in zip(sizes, seeds):
+                yield self.csv_chunk(size, chunk_seed, select)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            pending = deque()
+            for size, chunk_seed in zip(sizes, seeds):
+                pending.append(executor.submit(_csv_chunk, size, chunk_seed, select))
+                # At most two chunks per worker are held in memory
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def frame(self, n_rows, seed=0, label=False):
+        """A sampled DataFrame, read back from the generated CSV text"""
+        import pandas as pd
+
+        return pd.read_csv(io.BytesIO(b''.join(self.iter_csv(n_rows, n_rows or 1, seed, label))))
+
+    # ------------------------------------------
+    def to_dict(self):
+        return {
+            'columns': self.columns,
+            'tokens': self.tokens,
+            'probabilities': [p.tolist() for p in self.probabilities],
+            'missing': self.missing.tolist(),
+            'correlation': self.correlation.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['columns'], data['tokens'], data['probabilities'], data['missing'],
+                   data['correlation'])
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+# Set in each pool process by _init_worker
+_distribution = None
+
+def _init_worker(distribution):
+    global _distribution
+    _distribution = distribution
+
+def _csv_chunk(n_rows, seed, select):
+    return _distribution.csv_chunk(n_rows, seed, select)
+
+# ==========================================
+# QUALITY CHECK
+# ==========================================
+def check_sample(distribution, n_rows=200000, seed=1):
+    """
+    Compare a generated sample with the distribution it came from.
+
+    Returns (largest gap between sampled and learned cumulative marginals,
+    largest pairwise correlation difference, whether the CSV read back to
+    the same values).
+    """
+    codes = distribution.sample_codes(n_rows, np.random.default_rng(seed))
+    gap = 0.0
+    for j, probabilities in enumerate(distribution.probabilities):
+        column = codes[:, j]
+        counts = np.bincount(column[column < len(probabilities)], minlength=len(probabilities))
+        observed = np.cumsum(counts) / max(counts.sum(), 1)
+        gap = max(gap, float(np.abs(observed - np.cumsum(probabilities)).max()))
+
+    sampled = np.corrcoef(distribution.normal_scores(codes), rowvar=False)
+    correlation_diff = float(np.nanmax(np.abs(sampled - distribution.correlation)))
+
+    import pandas as pd
+
+    tables = distribution._tables
+    text = csv_rows(codes[:1000], tables)
+    header = ','.join(_csv_token(c) for c in distribution.columns) + '\n'
+    parsed = pd.read_csv(io.BytesIO(header.encode('utf-8') + text), dtype=str, keep_default_na=False)
+    expected = [[distribution.tokens[j][c] if c < len(distribution.tokens[j]) else ''
+                 for j, c in enumerate(row)] for row in codes[:1000].tolist()]
+    round_trip = parsed.values.tolist() == expected
+    return gap, correlation_diff, round_trip
+
+# ==========================================
+# MAIN
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic passenger rows for /predict_batch')
+    parser.add_argument('output')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--reference', help='CSV to learn the distribution from')
+    parser.add_argument('--profile', help='distribution saved earlier with --save-profile')
+    parser.add_argument('--save-profile', help='write the learned distribution as JSON')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='processes generating chunks (the output does not depend on it)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', action='store_true', help='add the satisfaction column')
+    parser.add_argument('--check', action='store_true',
+                        help='check marginals, correlations and CSV round trip first')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.profile:
+        distribution = PassengerDistribution.load(args.profile)
+        source = args.profile
+    elif args.reference:
+        import pandas as pd
+
+        try:
+            distribution = PassengerDistribution.fit(pd.read_csv(args.reference), seed=args.seed)
+        except (OSError, ValueError) as e:
+            print(f'❌ {args.reference}: {e}')
+            sys.exit(1)
+        source = args.reference
+    else:
+        distribution = PassengerDistribution.defaults()
+        source = 'built-in defaults'
+    print(f'✅ Distribution of {len(distribution.columns)} columns from {source} '
+          f'({time.perf_counter() - start:.2f}s)')
+
+    if args.save_profile:
+        distribution.save(args.save_profile)
+        print(f'💾 Saved {args.save_profile}')
+
+    if args.check:
+        gap, correlation_diff, round_trip = check_sample(distribution)
+        ok = gap <= MAX_MARGINAL_GAP and correlation_diff <= MAX_CORRELATION_DIFF and round_trip
+        print(f"{'✅' if ok else '❌'} Sample check: marginal CDF gap {gap:.4f} (max {MAX_MARGINAL_GAP}), "
+              f'correlation diff {correlation_diff:.4f} (max {MAX_CORRELATION_DIFF}), '
+              f"CSV round trip {'ok' if round_trip else 'FAILED'}")
+        if not ok:
+            sys.exit(1)
+
+    try:
+        columns = distribution.output_columns(args.label)
+    except ValueError as e:
+        print(f'❌ {e}')
+        sys.exit(1)
+
+    start = time.perf_counter()
+    written = 0
+    with open(args.output + '.tmp', 'wb') as out:
+        for block in distribution.iter_csv(args.rows, args.chunk_size, args.seed, args.label,
+                                           args.workers):
+            out.write(block)
+            written += len(block)
+    os.replace(args.output + '.tmp', args.output)
+    elapsed = time.perf_counter() - start
+    print(f'✅ Wrote {args.rows:,} rows x {len(columns)} columns ({written / 1e6:,.0f} MB) '
+          f'in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/sec) -> {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Shared fixtures: a synthetic train.csv and the models trained from it
+Every test runs against a temporary directory, never the checked-in artifacts
+
+Usage: python -m pytest -q ML/tests
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+# Rows of the synthetic train.csv the test models are trained on
+TRAIN_ROWS = 3000
+
+def run_script(script, *args, cwd, timeout=600):
+    """Run one of the ML scripts in cwd and return its stdout; fail with its output"""
+    result = subprocess.run([sys.executable, os.path.join(ML_DIR, script), *args], cwd=cwd,
+                            capture_output=True, text=True, timeout=timeout)
+    assert result.returncode == 0, f'{script} failed:\n{result.stdout}\n{result.stderr}'
+    return result.stdout
+
+@pytest.fixture(scope='session')
+def passengers():
+    """Raw labelled passenger rows, like train.csv"""
+    from synthetic_data import PassengerDistribution
+
+    return PassengerDistribution.defaults().frame(TRAIN_ROWS, seed=7, label=True)
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory, passengers):
+    """Directory with train.csv, the pickles and both bundles (sklearn and native ID3)"""
+    path = tmp_path_factory.mktemp('models')
+    passengers.to_csv(path / 'train.csv', index=False)
+    run_script('train_model_fast.py', cwd=path)
+    run_script('train_model.py', '--native', cwd=path)
+    return path
+
+# Admin token the test apps are started with
+PROFILE_TOKEN = 'test-token'
+
+@pytest.fixture(scope='session')
+def apps(model_dir):
+    """The app_fast and app modules, imported in model_dir"""
+    import importlib
+
+    cwd = os.getcwd()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('BATCH_PROCESSES', '1')
+        patch.setenv('PROFILE_TOKEN', PROFILE_TOKEN)
+        os.chdir(model_dir)
+        try:
+            return {name: importlib.import_module(name) for name in ('app_fast', 'app')}
+        finally:
+            os.chdir(cwd)
+
+@pytest.fixture(params=['app_fast', 'app'])
+def client(request, apps, model_dir, monkeypatch):
+    """Flask test client of each app, running in model_dir"""
+    monkeypatch.chdir(model_dir)
+    return apps[request.param].app.test_client()
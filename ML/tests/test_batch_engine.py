@@ -0,0 +1,45 @@
+"""predict_frame against the row-by-row path it replaces"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from batch_engine import REQUIRED_COLUMNS
+from shard_scoring import BundleScorer
+
+@pytest.fixture(scope='module', params=['model.bundle', 'id3_model.bundle'])
+def scorer(request, model_dir):
+    return BundleScorer(str(model_dir / request.param))
+
+def read_back(df):
+    """df as /predict_batch sees it: written to CSV and read with pandas"""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)))
+
+def row_by_row(scorer, df):
+    return [scorer.predict_row(row) for _, row in df.iterrows()]
+
+@pytest.fixture(scope='module')
+def rows(passengers):
+    df = passengers[REQUIRED_COLUMNS].head(200).copy()
+    df = df.astype({'Gender': object, 'Age': object})
+    df.loc[4, 'Gender'] = 'Other'
+    df.loc[9, 'Age'] = None
+    return df
+
+def test_matches_row_by_row(scorer, rows):
+    df = read_back(rows)
+    predictions = scorer.score(df)
+    assert predictions == row_by_row(scorer, df)
+    assert [i for i, p in enumerate(predictions) if p['result'].startswith('Error')] == [4, 9]
+
+@pytest.mark.parametrize('col', ['Inflight wifi service', 'Flight Distance'])
+def test_text_numeric_column_fails_every_row(scorer, rows, col):
+    # One 'abc' cell makes pandas read the whole column as text
+    df = rows.astype({col: object})
+    df.loc[7, col] = 'abc'
+    df = read_back(df)
+    assert df[col].dtype == object
+    predictions = scorer.score(df)
+    assert predictions == row_by_row(scorer, df)
+    assert all(p['result'].startswith('Error') for p in predictions)
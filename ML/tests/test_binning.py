@@ -0,0 +1,65 @@
+"""Binner against pd.cut and the training encoder, at the edges and outside them"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from binning import BINNED_COLUMNS, Binner
+from preprocessing import _bin_index, make_binning_config
+
+CONFIG = make_binning_config(max_distance=4983)
+BINNER = Binner(CONFIG)
+
+def bins_of(col):
+    return CONFIG[BINNED_COLUMNS[col][0]]
+
+def labels_of(col):
+    return list(CONFIG[BINNED_COLUMNS[col][1]])
+
+def in_range(col):
+    """Every edge except the lowest (pd.cut excludes it) and every half step between"""
+    bins = bins_of(col)
+    return np.arange(2 * bins[0] + 1, 2 * bins[-1] + 1) / 2
+
+@pytest.mark.parametrize('col', list(BINNED_COLUMNS))
+def test_matches_pd_cut_in_range(col):
+    values = in_range(col)
+    expected = pd.cut(values, bins=bins_of(col), labels=labels_of(col)).astype(str)
+    assert list(np.asarray(labels_of(col))[BINNER.positions(col, values)]) == list(expected)
+    assert [BINNER.label(col, float(v)) for v in values] == list(expected)
+
+@pytest.mark.parametrize('col', list(BINNED_COLUMNS))
+def test_matches_training_encoder_in_range(col):
+    values = in_range(col)
+    assert BINNER.positions(col, values).tolist() == _bin_index(values, bins_of(col)).tolist()
+
+@pytest.mark.parametrize('col', list(BINNED_COLUMNS))
+def test_edges_close_the_bin_below(col):
+    bins = bins_of(col)
+    for i, edge in enumerate(bins[1:]):
+        assert BINNER.position(col, float(edge)) == i
+        if i + 1 < len(bins) - 1:
+            assert BINNER.position(col, float(edge) + 0.5) == i + 1
+
+@pytest.mark.parametrize('col', list(BINNED_COLUMNS))
+def test_below_range_clips_to_first_bin(col):
+    # The training encoder turned these into the label 'nan'; serving clips them
+    low = float(bins_of(col)[0])
+    values = [low, low - 0.5, low - 1000]
+    assert BINNER.positions(col, values).tolist() == [0, 0, 0]
+    assert [BINNER.position(col, v) for v in values] == [0, 0, 0]
+    assert _bin_index(np.asarray(values), bins_of(col)).tolist() == [len(bins_of(col)) - 1] * 3
+
+@pytest.mark.parametrize('col', list(BINNED_COLUMNS))
+def test_above_range_clips_to_last_bin(col):
+    high = float(bins_of(col)[-1])
+    last = len(bins_of(col)) - 2
+    values = [high + 0.5, high + 1e6]
+    assert BINNER.positions(col, values).tolist() == [last, last]
+    assert [BINNER.label(col, v) for v in values] == [labels_of(col)[-1]] * 2
+
+@pytest.mark.parametrize('col', list(BINNED_COLUMNS))
+def test_missing_values(col):
+    assert BINNER.positions(col, [np.nan, 30.0, None]).tolist()[::2] == [-1, -1]
+    with pytest.raises(ValueError):
+        BINNER.position(col, float('nan'))
@@ -0,0 +1,47 @@
+"""/v1/predict/bulk against /predict_batch on the same rows"""
+
+import io
+import json
+
+import pytest
+
+from batch_engine import REQUIRED_COLUMNS
+
+# /predict_batch returns at most this many annotated rows
+ROWS = 100
+
+@pytest.fixture
+def fast_client(apps, model_dir, monkeypatch):
+    monkeypatch.chdir(model_dir)
+    return apps['app_fast'].app.test_client()
+
+@pytest.fixture(scope='module')
+def rows(passengers):
+    df = passengers.dropna().head(ROWS)[REQUIRED_COLUMNS].reset_index(drop=True)
+    df = df.astype({'Age': object, 'Gender': object})
+    df.loc[3, 'Age'] = None
+    df.loc[7, 'Gender'] = 'Other'
+    return df
+
+def batch_predictions(client, df):
+    data = {'file': (io.BytesIO(df.to_csv(index=False).encode()), 'rows.csv')}
+    body = client.post('/predict_batch', data=data, content_type='multipart/form-data').get_json()
+    assert body['success'], body
+    return body, [None if str(r['Prediction']).startswith('Error') else r['Prediction']
+                  for r in body['results']]
+
+@pytest.mark.parametrize('content_type', ['application/json', 'application/x-ndjson'])
+def test_bulk_matches_predict_batch(fast_client, rows, content_type):
+    batch, expected = batch_predictions(fast_client, rows)
+    if content_type == 'application/json':
+        payload = json.dumps(rows.to_dict('list'))
+    else:
+        payload = '\n'.join(json.dumps(record) for record in rows.to_dict('records'))
+
+    bulk = fast_client.post('/v1/predict/bulk', data=payload, content_type=content_type).get_json()
+    assert bulk['success'], bulk
+    labels = [None if code is None else bulk['classes'][code] for code in bulk['predictions']]
+    assert labels == expected
+    assert [bulk[key] for key in ('total', 'satisfied', 'dissatisfied', 'errors')] == \
+        [batch[key] for key in ('total', 'satisfied', 'dissatisfied', 'errors')]
+    assert bulk['invalid'] == {'Age': [3], 'Gender': [7]}
@@ -0,0 +1,47 @@
+"""Compiled node arrays against the models they are compiled from"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from compiled_tree import CompiledTree, compile_model, compile_rules_file
+from preprocessing import encode, read_raw
+
+@pytest.fixture(scope='module')
+def frame(model_dir):
+    frame, _, _ = encode(read_raw(model_dir / 'train.csv'))
+    frame['satisfaction'] = frame['satisfaction'].astype(str)
+    return frame
+
+@pytest.fixture(scope='module')
+def X(frame):
+    return frame.drop(columns=['satisfaction']).to_numpy(dtype=np.float64)
+
+def test_sklearn_tree(model_dir, frame, X):
+    with open(model_dir / 'model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    expected = model.predict(frame.drop(columns=['satisfaction'])).tolist()
+    tree = compile_model(model)
+    assert tree.predict(X).tolist() == expected
+    assert [tree.predict_one(row) for row in X[:200]] == expected[:200]
+
+@pytest.mark.parametrize('parallel', [True, False], ids=['parallel', 'serial'])
+def test_chefboost_rules(frame, X, tmp_path, parallel):
+    from id3_trainer import ID3Trainer
+
+    rules_file = tmp_path / 'rules.py'
+    ID3Trainer(parallel=parallel).fit(frame, 'satisfaction', rules_file=str(rules_file))
+
+    namespace = {}
+    exec(rules_file.read_text(), namespace)
+    expected = [namespace['findDecision'](row.tolist()) for row in X]
+    tree = compile_rules_file(str(rules_file))
+    assert [str(v) for v in tree.predict(X)] == expected
+    assert [str(tree.predict_one(row)) for row in X[:200]] == expected[:200]
+
+def test_save_and_load(model_dir, X, tmp_path):
+    with open(model_dir / 'id3_model.pkl', 'rb') as f:
+        tree = pickle.load(f)
+    tree.save(str(tmp_path / 'tree.npz'))
+    assert CompiledTree.load(str(tmp_path / 'tree.npz')).predict(X).tolist() == tree.predict(X).tolist()
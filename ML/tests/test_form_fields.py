@@ -0,0 +1,24 @@
+"""The /predict form-field map shared by the apps, benchmark.py and load_test.py"""
+
+import pytest
+
+from batch_engine import FORM_FIELDS, REQUIRED_COLUMNS, parse_form
+from benchmark import predict_requests
+from load_test import SAMPLE_REQUEST
+
+def test_fields_cover_every_column_in_order():
+    assert list(FORM_FIELDS.values()) == REQUIRED_COLUMNS
+    assert set(SAMPLE_REQUEST) == set(FORM_FIELDS)
+
+def test_parse_form():
+    row = parse_form(dict(SAMPLE_REQUEST, age='35'))
+    assert row['Age'] == 35 and row['Gender'] == 'Male'
+    with pytest.raises(KeyError):
+        parse_form({k: v for k, v in SAMPLE_REQUEST.items() if k != 'arrDelay'})
+    with pytest.raises(ValueError):
+        parse_form(dict(SAMPLE_REQUEST, wifi='good'))
+
+def test_benchmark_bodies_round_trip(passengers):
+    raw = passengers.dropna().head(20)
+    for body, (_, row) in zip(predict_requests(raw), raw.iterrows()):
+        assert parse_form(body) == {col: row[col] for col in REQUIRED_COLUMNS}
@@ -0,0 +1,53 @@
+"""Native ID3 trainer against Chefboost: same tree, byte-identical rules.py"""
+
+import subprocess
+import sys
+
+import pytest
+
+from id3_trainer import ID3Trainer
+from preprocessing import encode, read_raw
+
+# Small enough for Chefboost to train in a few seconds
+TRAIN_ROWS = 1000
+
+# Spawn is set before chefboost is imported, as train_model.py does; num_cores
+# is high enough for Chefboost to hand branches to its process pool
+CHEFBOOST_CODE = '''
+import multiprocessing
+import pandas as pd
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('spawn', force=True)
+    from chefboost import Chefboost as cb
+
+    config = {{'algorithm': 'ID3', 'enableParallelism': {parallel}, 'num_cores': 8}}
+    cb.fit(pd.read_pickle('train.pkl'), config=config, target_label='satisfaction', silent=True)
+'''
+
+@pytest.fixture(scope='module')
+def df_train(tmp_path_factory, passengers):
+    path = tmp_path_factory.mktemp('id3') / 'train.csv'
+    passengers.head(TRAIN_ROWS).to_csv(path, index=False)
+    frame, _, _ = encode(read_raw(path))
+    frame['satisfaction'] = frame['satisfaction'].astype(str)
+    return frame
+
+@pytest.mark.parametrize('parallel', [True, False], ids=['parallel', 'serial'])
+def test_rules_match_chefboost(df_train, tmp_path, parallel):
+    pytest.importorskip('chefboost')
+    df_train.to_pickle(tmp_path / 'train.pkl')
+    subprocess.run([sys.executable, '-c', CHEFBOOST_CODE.format(parallel=parallel)],
+                   cwd=tmp_path, check=True, capture_output=True, timeout=600)
+    expected = (tmp_path / 'outputs' / 'rules' / 'rules.py').read_bytes()
+
+    native_file = tmp_path / 'native' / 'rules.py'
+    ID3Trainer(parallel=parallel).fit(df_train, 'satisfaction', rules_file=str(native_file))
+    assert native_file.read_bytes() == expected
+
+def test_layouts_compile_to_the_same_tree(df_train, tmp_path):
+    trees = [ID3Trainer(parallel=parallel).fit(df_train, 'satisfaction',
+                                               rules_file=str(tmp_path / f'{parallel}.py'))
+             for parallel in (True, False)]
+    X = df_train.drop(columns=['satisfaction']).to_numpy(dtype='float64')
+    assert (trees[0].predict(X) == trees[1].predict(X)).all()
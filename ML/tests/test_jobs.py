@@ -0,0 +1,36 @@
+"""Background jobs: lazy job store and a full queued -> done run"""
+
+import time
+
+from check_startup import measure
+from jobs import JobQueue, JobStore
+
+def test_store_creates_nothing_until_used(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs'))
+    assert not (tmp_path / 'jobs').exists()
+    assert store.get('missing') is None
+    assert (tmp_path / 'jobs' / 'jobs.db').exists()
+
+def test_app_import_creates_no_job_files(model_dir):
+    measure('app_fast', cwd=model_dir)
+    assert not (model_dir / 'jobs').exists()
+
+def test_job_runs_to_done(tmp_path):
+    queue = JobQueue(JobStore(str(tmp_path / 'jobs')), chunk_size=2)
+    job_id = queue.new_job_id()
+    with open(queue.store.upload_path(job_id), 'w') as f:
+        f.write('x\n1\n2\n3\n')
+
+    def score_chunk(df):
+        return [{'result': 'satisfied', 'reason': str(x)} for x in df['x']]
+
+    queue.submit(job_id, 'upload.csv', score_chunk)
+    deadline = time.monotonic() + 30
+    while queue.status(job_id)['status'] in ('queued', 'running') and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    info = queue.status(job_id)
+    assert info['status'] == 'done', info['error']
+    assert (info['rows_done'], info['summary']['satisfied']) == (3, 3)
+    with open(queue.store.result_path(job_id)) as f:
+        assert f.read().splitlines()[1:4] == ['1,satisfied,1', '2,satisfied,2', '3,satisfied,3']
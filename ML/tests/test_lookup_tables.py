@@ -0,0 +1,57 @@
+"""EncoderTables against the fitted LabelEncoders they are compiled from"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from binning import BINNED_COLUMNS, Binner
+from lookup_tables import EncoderTables
+
+@pytest.fixture(scope='module')
+def encoders(model_dir):
+    with open(model_dir / 'label_encoders.pkl', 'rb') as f:
+        label_encoders = pickle.load(f)
+    with open(model_dir / 'binning_config.pkl', 'rb') as f:
+        binning_config = pickle.load(f)
+    return label_encoders, binning_config
+
+def test_single_values_match(encoders):
+    label_encoders, binning_config = encoders
+    tables = EncoderTables(label_encoders, binning_config)
+    for col, encoder in label_encoders.items():
+        codes = encoder.transform(encoder.classes_)
+        assert [tables.encode(col, label) for label in encoder.classes_] == codes.tolist()
+        assert [tables.decode(col, code) for code in codes] == [str(c) for c in encoder.classes_]
+        with pytest.raises(ValueError):
+            tables.encode(col, 'never seen')
+
+def test_columns_match(encoders, passengers):
+    label_encoders, binning_config = encoders
+    tables = EncoderTables(label_encoders, binning_config)
+    binner = Binner(binning_config)
+    raw = passengers.dropna()
+    for col, encoder in label_encoders.items():
+        if col in BINNED_COLUMNS:
+            positions = binner.positions(col, raw[col])
+            codes, invalid = tables.encode_bins(col, positions)
+            labels = np.asarray(binner.labels[col], dtype=object)[positions].astype(str)
+        elif col in raw.columns:
+            codes, invalid = tables.encode_column(col, raw[col])
+            labels = raw[col].astype(str).to_numpy()
+        else:
+            continue
+        known = np.isin(labels, encoder.classes_)
+        assert invalid.tolist() == (~known).tolist()
+        assert codes[known].tolist() == encoder.transform(labels[known]).tolist()
+        assert (tables.decode_column(col, codes[known]).tolist()
+                == encoder.inverse_transform(codes[known].astype(int)).tolist())
+
+def test_vocabularies_build_the_same_tables(encoders):
+    label_encoders, binning_config = encoders
+    tables = EncoderTables(label_encoders, binning_config)
+    vocabularies = {col: list(encoder.classes_) for col, encoder in label_encoders.items()}
+    same = EncoderTables.from_vocabularies(vocabularies, binning_config)
+    assert same.codes == tables.codes
+    assert {col: codes.tolist() for col, codes in same.bin_codes.items()} == \
+        {col: codes.tolist() for col, codes in tables.bin_codes.items()}
@@ -0,0 +1,54 @@
+"""DecisionTable against the trees it is materialized from"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from compiled_tree import compile_model
+from materialize import DecisionTable, TablePredictor, feature_domains, materialize
+
+@pytest.fixture(scope='module', params=['model', 'id3_model'])
+def tree_and_table(request, model_dir):
+    """A compiled tree, its table as written by the trainer, and the feature domains"""
+    with open(model_dir / f'{request.param}.pkl', 'rb') as f:
+        tree = compile_model(pickle.load(f))
+    with open(model_dir / 'feature_columns.pkl', 'rb') as f:
+        feature_columns = pickle.load(f)
+    with open(model_dir / 'label_encoders.pkl', 'rb') as f:
+        domains = feature_domains(feature_columns, pickle.load(f))
+    table_path = 'model_table.npy' if request.param == 'model' else 'id3_tree_table.npy'
+    return tree, DecisionTable.load(model_dir / table_path), domains
+
+def in_domain(domains, n_rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.integers(0, d, n_rows) for d in domains]).astype(np.float64)
+
+def test_saved_table_is_the_materialized_tree(tree_and_table):
+    tree, table, domains = tree_and_table
+    assert np.array_equal(np.asarray(table.table), materialize(tree, domains))
+    assert table.domains.tolist() == domains
+
+def test_predict_matches_tree(tree_and_table):
+    tree, table, domains = tree_and_table
+    X = in_domain(domains)
+    classes, covered = table.predict(X)
+    assert covered.all()
+    assert classes.tolist() == tree.predict(X).astype(int).tolist()
+    assert [table.lookup(x) for x in X[:500]] == classes[:500].tolist()
+
+def test_rows_outside_the_table_fall_back(tree_and_table):
+    tree, table, domains = tree_and_table
+    X = in_domain(domains, 100)
+    X[0, 0] = domains[0]        # one past the last code
+    X[1, 1] = 0.5               # not a code
+    X[2, 2] = np.nan            # missing
+    X[3, 3] = -1
+    classes, covered = table.predict(X)
+    assert covered.tolist() == [False] * 4 + [True] * 96
+    assert classes[:4].tolist() == [-1] * 4
+    assert [table.lookup(x) for x in X[:4]] == [None] * 4
+
+    predictor = TablePredictor(table, tree)
+    assert predictor.predict(X).tolist() == tree.predict(X).astype(int).tolist()
+    assert [int(predictor.predict_one(x)) for x in X[:10]] == tree.predict(X[:10]).astype(int).tolist()
@@ -0,0 +1,81 @@
+"""Metrics: counters, histograms, worker snapshots and the apps' /metrics"""
+
+import os
+
+from load_test import SAMPLE_REQUEST
+from metrics import Metrics, add_rows, lap
+
+def test_apps_in_one_process_keep_separate_snapshots(apps):
+    directories = {name: module.request_metrics.directory for name, module in apps.items()}
+    assert directories['app'] != directories['app_fast']
+
+    first, second = Metrics('first'), Metrics('second')
+    first.begin('predict')
+    add_rows(3)
+    first.finish(200)
+    first.publish()
+    try:
+        assert os.listdir(first.directory) == [f'{os.getpid()}.json']
+        assert not os.path.exists(second.directory)
+    finally:
+        first._remove_directory()
+
+def series(text, line_prefix):
+    """Value of the /metrics line starting with line_prefix (0 if absent)"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+def test_stages_and_server_timing():
+    metrics = Metrics('test')
+    lap('outside')  # no request on this thread: ignored
+    timer = metrics.begin('predict')
+    lap('parse')
+    lap('predict')
+    lap('parse')
+    add_rows(5, errors=1)
+    header = metrics.finish(200)
+
+    assert list(timer.stages) == ['parse', 'predict']
+    assert [part.split(';')[0] for part in header.split(', ')] == ['parse', 'predict', 'total']
+    assert all(part.split(';')[1].startswith('dur=') for part in header.split(', '))
+    assert metrics.finish(200) is None
+
+    text = metrics.render()
+    assert series(text, 'satisfaction_requests_total{route="predict",status="200"}') == 1
+    assert series(text, 'satisfaction_rows_total{route="predict"}') == 5
+    assert series(text, 'satisfaction_row_errors_total{route="predict"}') == 1
+    assert series(text, 'satisfaction_stage_duration_seconds_count{route="predict",stage="parse"}') == 1
+    assert series(text, 'satisfaction_request_duration_seconds_bucket{route="predict",le="+Inf"}') == 1
+    assert '# TYPE satisfaction_request_duration_seconds histogram' in text
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics('test', namespace='t', buckets=(0.1, 1.0))
+    with metrics._lock:
+        for seconds in (0.05, 0.5, 0.5, 5.0):
+            metrics._observe('request_duration_seconds', (('route', 'r'),), seconds)
+    text = metrics.render()
+    assert [series(text, f't_request_duration_seconds_bucket{{route="r",le="{le}"}}')
+            for le in ('0.1', '1.0', '+Inf')] == [1, 3, 4]
+    assert series(text, 't_request_duration_seconds_sum{route="r"}') == 6.05
+    assert series(text, 't_request_duration_seconds_count{route="r"}') == 4
+
+def test_app_metrics_and_server_timing(client):
+    before = client.get('/metrics').get_data(as_text=True)
+    response = client.post('/predict', json=SAMPLE_REQUEST)
+    assert response.get_json()['success']
+
+    stages = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+    assert stages[0] == 'parse' and stages[-1] == 'total'
+    assert {'binning', 'encoding', 'predict', 'serialize'} <= set(stages)
+
+    after = client.get('/metrics')
+    assert after.mimetype == 'text/plain'
+    text = after.get_data(as_text=True)
+    for prefix in ['satisfaction_requests_total{route="predict",status="200"}',
+                   'satisfaction_rows_total{route="predict"}',
+                   'satisfaction_request_duration_seconds_count{route="predict"}',
+                   'satisfaction_stage_duration_seconds_count{route="predict",stage="parse"}']:
+        assert series(text, prefix) - series(before, prefix) == 1, prefix
+    assert 'satisfaction_model_info{version=' in text
@@ -0,0 +1,27 @@
+"""Micro-batcher histograms and batched predictions"""
+
+import numpy as np
+
+from micro_batcher import Histogram, MicroBatcher
+
+def test_histogram_bucket_boundaries():
+    histogram = Histogram(8)
+    for value in [1, 2, 3, 4, 5, 8, 9, 100]:
+        histogram.observe(value)
+    assert histogram.as_dict() == {'1': 1, '2': 1, '3-4': 2, '5-8': 2, '>8': 2}
+
+def test_queue_depth_counts_the_submitted_row():
+    batcher = MicroBatcher(lambda X: X[:, 0] * 2)
+    assert batcher.predict_one([3.0]) == 6.0
+    stats = batcher.stats()
+    # Nothing else was waiting: the row saw a queue of one (itself)
+    assert stats['max_queue_depth'] == 1
+    assert stats['queue_depth_histogram']['1'] == 1
+    assert sum(stats['queue_depth_histogram'].values()) == 1
+
+def test_batched_predictions_match_direct():
+    samples = np.arange(200, dtype=np.float64).reshape(100, 2)
+    batcher = MicroBatcher(lambda X: X.sum(axis=1), max_batch_size=8)
+    futures = [batcher.submit(sample) for sample in samples]
+    assert [f.result() for f in futures] == samples.sum(axis=1).tolist()
+    assert batcher.stats()['rows'] == 100
@@ -0,0 +1,79 @@
+"""Model bundle loading: parity with the pickles, corrupt headers refused with BundleError"""
+
+import json
+import struct
+
+import pytest
+
+from model_bundle import MAGIC, BundleError, ModelBundle
+
+def rewrite_header(source, target, change):
+    """Copy a bundle, letting change() edit its parsed header (padded to the same size)"""
+    data = source.read_bytes()
+    (size,) = struct.unpack_from('<I', data, len(MAGIC))
+    start = len(MAGIC) + 4
+    header = change(json.loads(data[start:start + size]))
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    assert len(header_bytes) <= size
+    target.write_bytes(data[:start] + header_bytes.ljust(size) + data[start + size:])
+    return target
+
+def drop(*keys):
+    def change(header):
+        parent = header
+        for key in keys[:-1]:
+            parent = parent[key]
+        del parent[keys[-1]]
+        return header
+    return change
+
+@pytest.mark.parametrize('change', [
+    drop('arrays'),
+    drop('classes'),
+    drop('feature_columns'),
+    drop('vocabularies'),
+    drop('binning', 'bins_age'),
+    drop('arrays', 'left'),
+    drop('arrays', 'feature', 'dtype'),
+    drop('arrays', 'value', 'offset'),
+    lambda header: {**header, 'classes': 'satisfied'},
+    lambda header: [header],
+], ids=['arrays', 'classes', 'feature_columns', 'vocabularies', 'bins', 'array',
+        'array_dtype', 'array_offset', 'classes_type', 'not_an_object'])
+def test_corrupt_header(model_dir, tmp_path, change):
+    path = rewrite_header(model_dir / 'model.bundle', tmp_path / 'corrupt.bundle', change)
+    with pytest.raises(BundleError):
+        ModelBundle.load(str(path))
+
+def test_unchanged_header_loads(model_dir, tmp_path):
+    path = rewrite_header(model_dir / 'model.bundle', tmp_path / 'copy.bundle', lambda h: h)
+    assert ModelBundle.load(str(path)).tree.node_count > 0
+
+@pytest.mark.parametrize('bundle_name, model_name', [('model.bundle', 'model.pkl'),
+                                                     ('id3_model.bundle', 'id3_model.pkl')])
+def test_bundle_matches_pickles(model_dir, bundle_name, model_name):
+    import pickle
+
+    import numpy as np
+
+    from compiled_tree import compile_model
+    from preprocessing import encode, read_raw
+
+    def load(name):
+        with open(model_dir / name, 'rb') as f:
+            return pickle.load(f)
+
+    bundle = ModelBundle.load(str(model_dir / bundle_name))
+    assert bundle.feature_columns == load('feature_columns.pkl')
+    assert bundle.vocabularies == {col: [str(c) for c in encoder.classes_]
+                                   for col, encoder in load('label_encoders.pkl').items()}
+    binning_config = load('binning_config.pkl')
+    assert bundle.binning_config == {key: [v.item() if hasattr(v, 'item') else v for v in values]
+                                     for key, values in binning_config.items()}
+
+    frame, _, _ = encode(read_raw(model_dir / 'train.csv'))
+    X = frame[bundle.feature_columns].to_numpy(dtype=np.float64)
+    expected = compile_model(load(model_name)).predict(X).tolist()
+    assert bundle.tree.predict(X).tolist() == expected
+    # The decision table holds the class codes as integers ('0' -> 0 for ID3)
+    assert bundle.predictor().predict(X).tolist() == [int(v) for v in expected]
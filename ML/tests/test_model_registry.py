@@ -0,0 +1,82 @@
+"""ModelRegistry versions and ModelSwapper hot-swaps"""
+
+import numpy as np
+import pytest
+
+from model_bundle import BundleError
+from model_registry import ModelRegistry, ModelSwapper, ServingModel
+
+@pytest.fixture
+def bundle(model_dir):
+    return str(model_dir / 'model.bundle')
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / 'models'), 'model')
+
+def load(version, path):
+    return ServingModel.from_bundle(path, version)
+
+def test_publish_activate_and_prune(registry, bundle):
+    assert registry.versions() == [] and registry.current() is None
+    assert [registry.publish(bundle) for _ in range(3)] == ['v0001', 'v0002', 'v0003']
+    assert registry.current() == 'v0003'
+
+    assert registry.publish(bundle, activate=False) == 'v0004'
+    assert registry.current() == 'v0003'
+    registry.activate('v0001')
+    assert registry.current() == 'v0001'
+    with pytest.raises(ValueError, match='Unknown version'):
+        registry.activate('v0009')
+
+    # The active version survives pruning even when it is among the oldest
+    assert registry.prune(2) == ['v0002']
+    assert registry.versions() == ['v0001', 'v0003', 'v0004']
+    assert registry.publish(bundle) == 'v0005'
+
+def test_publish_rejects_a_corrupt_bundle(registry, tmp_path):
+    broken = tmp_path / 'broken.bundle'
+    broken.write_bytes(b'not a bundle')
+    with pytest.raises(BundleError):
+        registry.publish(str(broken))
+    assert registry.versions() == []
+
+def test_swapper_follows_current(registry, bundle):
+    registry.publish(bundle)
+    swapper = ModelSwapper(registry, load, load('v0001', registry.path('v0001')))
+    assert not swapper.check()
+
+    old = swapper.current
+    X = np.zeros((3, len(old.feature_columns)))
+    X[1, 0] = X[2, 1] = 1
+    old.cache.predict_many(old.predictor.predict, X)
+
+    registry.publish(bundle)
+    assert swapper.check()
+    assert (swapper.current.version, swapper.swaps) == ('v0002', 1)
+    # Same encoders and bins: the old version's cached vectors were re-scored
+    assert len(swapper.current.cache) == 3
+    assert old.version == 'v0001'
+
+    registry.activate('v0001')
+    assert swapper.check() and swapper.current.version == 'v0001'
+
+def test_failed_load_keeps_the_old_version(registry, bundle, capsys):
+    registry.publish(bundle)
+    swapper = ModelSwapper(registry, load, load('v0001', registry.path('v0001')))
+    registry.publish(bundle)
+    with open(registry.path('v0002'), 'r+b') as f:
+        f.write(b'corrupt')
+
+    assert not swapper.check()
+    assert swapper.current.version == 'v0001' and swapper.swaps == 0
+    assert swapper.last_error.startswith('v0002: ')
+    assert 'still serving v0001' in capsys.readouterr().out
+    # Not retried until CURRENT changes
+    assert not swapper.check()
+    assert capsys.readouterr().out == ''
+
+    registry.publish(bundle)
+    assert swapper.check()
+    assert swapper.current.version == 'v0003' and swapper.last_error is None
+    assert swapper.status()['available'] == ['v0001', 'v0002', 'v0003']
@@ -0,0 +1,86 @@
+"""PredictionCache: LRU eviction, hit/miss counts and parity with the model"""
+
+import io
+
+import numpy as np
+
+from batch_engine import REQUIRED_COLUMNS
+from prediction_cache import PredictionCache
+
+class CountingModel:
+    """Sums each row and records how many rows it was asked to score"""
+
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, 3)
+        self.rows += len(X)
+        return X.sum(axis=1)
+
+def vector(i):
+    return [float(i), 0.0, 1.0]
+
+def test_evicts_least_recently_used():
+    cache = PredictionCache(maxsize=2)
+    model = CountingModel()
+    cache.predict_one(model.predict, vector(1))
+    cache.predict_one(model.predict, vector(2))
+    cache.predict_one(model.predict, vector(1))  # 2 is now the oldest
+    cache.predict_one(model.predict, vector(3))
+    assert len(cache) == 2
+    assert cache.vectors().tolist() == [vector(1), vector(3)]
+    assert model.rows == 3
+
+    cache.predict_one(model.predict, vector(2))
+    assert model.rows == 4
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 4, 'hit_rate': 0.2}
+
+def test_predict_many_scores_each_new_vector_once():
+    cache = PredictionCache()
+    model = CountingModel()
+    X = np.array([vector(i % 5) for i in range(100)])
+    assert cache.predict_many(model.predict, X).tolist() == model.predict(X).tolist()
+    model.rows = 0
+
+    # Five unique vectors were stored; a second batch is served from the cache
+    assert cache.stats()['misses'] == 5
+    assert cache.predict_many(model.predict, X[::-1]).tolist() == X[::-1].sum(axis=1).tolist()
+    assert model.rows == 0
+    assert cache.stats()['hits'] == 5
+
+def test_single_row_and_batch_share_entries():
+    cache = PredictionCache()
+    model = CountingModel()
+    cache.predict_many(model.predict, np.array([vector(7), vector(8)]))
+    assert cache.predict_one(model.predict, np.array(vector(8))) == 9.0
+    assert model.rows == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_prime_and_clear():
+    cache = PredictionCache()
+    model = CountingModel()
+    cache.prime(model.predict, np.array([vector(1), vector(2)]))
+    assert (len(cache), cache.hits, cache.misses) == (2, 0, 0)
+    cache.clear()
+    assert cache.stats() == {'size': 0, 'maxsize': 100000, 'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+
+def test_cached_app_predictions_match_the_model(apps, model_dir, monkeypatch, passengers):
+    """/predict_batch twice: the second pass is all hits with the same answers"""
+    monkeypatch.chdir(model_dir)
+    app_fast = apps['app_fast']
+    cache = app_fast.models.current.cache
+    client = app_fast.app.test_client()
+    body = passengers.dropna()[REQUIRED_COLUMNS].head(300).to_csv(index=False).encode()
+
+    def post():
+        data = {'file': (io.BytesIO(body), 'rows.csv')}
+        return client.post('/predict_batch', data=data,
+                           content_type='multipart/form-data').get_json()['results']
+
+    cache.clear()
+    first = post()
+    misses = cache.misses
+    assert 0 < misses <= 300 and cache.hits == 0
+    assert post() == first
+    assert (cache.hits, cache.misses) == (misses, misses)
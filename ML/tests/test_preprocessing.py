@@ -0,0 +1,68 @@
+"""load_dataset: the encoded-dataset cache and parity with the old encoding steps"""
+
+import os
+
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from binning import BINNED_COLUMNS
+from preprocessing import ENCODED_COLUMNS, cache_paths, load_dataset, read_raw
+
+@pytest.fixture
+def train_csv(tmp_path, passengers):
+    path = tmp_path / 'train.csv'
+    passengers.head(500).to_csv(path, index=False)
+    return path
+
+def assert_same_dataset(a, b):
+    frame_a, encoders_a, config_a = a[:3]
+    frame_b, encoders_b, config_b = b[:3]
+    pd.testing.assert_frame_equal(frame_a, frame_b)
+    assert {c: e.classes_.tolist() for c, e in encoders_a.items()} == \
+        {c: e.classes_.tolist() for c, e in encoders_b.items()}
+    assert config_a == config_b
+
+def test_second_load_hits_the_cache(train_csv, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = load_dataset(str(train_csv), str(cache_dir))
+    second = load_dataset(str(train_csv), str(cache_dir))
+    assert (first[3], second[3]) == (False, True)
+    assert_same_dataset(first, second)
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        os.path.basename(p) for p in cache_paths(str(train_csv), str(cache_dir)))
+
+def test_changed_file_misses_the_cache(train_csv, tmp_path, passengers):
+    cache_dir = str(tmp_path / 'cache')
+    load_dataset(str(train_csv), cache_dir)
+    old_paths = cache_paths(str(train_csv), cache_dir)
+
+    passengers.head(600).to_csv(train_csv, index=False)
+    assert cache_paths(str(train_csv), cache_dir) != old_paths
+    frame, _, _, from_cache = load_dataset(str(train_csv), cache_dir)
+    assert not from_cache
+    assert len(frame) == len(read_raw(train_csv))
+    assert load_dataset(str(train_csv), cache_dir)[3]
+
+def test_no_cache_neither_reads_nor_writes(train_csv, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    load_dataset(str(train_csv), str(cache_dir))
+    assert not load_dataset(str(train_csv), str(cache_dir), use_cache=False)[3]
+    uncached = tmp_path / 'uncached'
+    load_dataset(str(train_csv), str(uncached), use_cache=False)
+    assert not uncached.exists()
+
+def test_matches_pd_cut_and_label_encoder(train_csv):
+    """The steps of the original notebook, column by column"""
+    frame, label_encoders, binning_config, _ = load_dataset(str(train_csv), use_cache=False)
+    raw = read_raw(train_csv)
+    for col in ENCODED_COLUMNS:
+        values = raw[col]
+        if col in BINNED_COLUMNS:
+            bins_key, labels_key = BINNED_COLUMNS[col]
+            values = pd.cut(values, bins=binning_config[bins_key],
+                            labels=binning_config[labels_key])
+        encoder = LabelEncoder()
+        codes = encoder.fit_transform(values.astype(str))
+        assert frame[col].tolist() == codes.tolist(), col
+        assert label_encoders[col].classes_.tolist() == encoder.classes_.tolist(), col
@@ -0,0 +1,22 @@
+"""On-demand profiling through the X-Profile header"""
+
+from conftest import PROFILE_TOKEN
+from load_test import SAMPLE_REQUEST
+
+def predict(client, **headers):
+    return client.post('/predict', json=SAMPLE_REQUEST, headers=headers)
+
+def test_requested_mode_is_profiled(client):
+    response = predict(client, **{'X-Profile': 'sample', 'X-Admin-Token': PROFILE_TOKEN})
+    assert response.status_code == 200
+    assert response.headers['X-Profile-Output']
+
+def test_unknown_mode_is_rejected(client):
+    response = predict(client, **{'X-Profile': 'perf', 'X-Admin-Token': PROFILE_TOKEN})
+    assert response.status_code == 400
+    assert 'cprofile' in response.get_json()['error']
+
+def test_mode_is_ignored_without_the_admin_token(client):
+    response = predict(client, **{'X-Profile': 'perf'})
+    assert response.status_code == 200
+    assert 'X-Profile-Output' not in response.headers
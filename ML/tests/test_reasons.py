@@ -0,0 +1,93 @@
+"""main_reasons against find_main_reason, decision paths against a row-by-row walk"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_tree import compile_model
+from reasons import (DISSATISFIED, SERVICE_FEATURES, DecisionPathExplainer,
+                     find_main_reason, main_reasons)
+
+N_ROWS = 20000
+
+def random_rows(n_rows, seed=0):
+    """Ratings 0-5 (full of ties), delays around the threshold and some missing values"""
+    rng = np.random.default_rng(seed)
+    data = {col: rng.integers(0, 6, n_rows) for col in SERVICE_FEATURES}
+    data['Departure Delay in Minutes'] = rng.integers(0, 60, n_rows)
+    data['Arrival Delay in Minutes'] = rng.integers(0, 60, n_rows).astype(float)
+    df = pd.DataFrame(data)
+    df.loc[rng.random(n_rows) < 0.05, 'Seat comfort'] = np.nan
+    df.loc[rng.random(n_rows) < 0.05, 'Arrival Delay in Minutes'] = np.nan
+    predictions = rng.choice([DISSATISFIED, 'satisfied'], n_rows)
+    return df, predictions
+
+def assert_matches_find_main_reason(df, predictions):
+    expected = [find_main_reason(row, p) for row, p in zip(df.to_dict('records'), predictions)]
+    assert main_reasons(df, predictions).tolist() == expected
+
+def test_main_reasons_with_ties_and_missing_values():
+    assert_matches_find_main_reason(*random_rows(N_ROWS))
+
+def test_main_reasons_with_fractional_ratings():
+    # Non-integer ratings take the stable argsort instead of argpartition
+    df, predictions = random_rows(N_ROWS, seed=1)
+    df['Cleanliness'] = df['Cleanliness'] + 0.5
+    assert_matches_find_main_reason(df, predictions)
+
+def test_main_reasons_with_absent_columns():
+    df, predictions = random_rows(N_ROWS, seed=2)
+    assert_matches_find_main_reason(df.drop(columns=['Gate location', 'Arrival Delay in Minutes']),
+                                    predictions)
+
+def test_main_reasons_of_no_rows():
+    df, predictions = random_rows(0)
+    assert main_reasons(df, predictions).tolist() == []
+
+# ==========================================
+# DECISION PATHS
+# ==========================================
+def walk_path(tree, sample):
+    """Feature indices tested on one row, in order and without repeats"""
+    node, path = 0, []
+    while tree.feature[node] >= 0:
+        feature = int(tree.feature[node])
+        if feature not in path:
+            path.append(feature)
+        x = float(np.float32(sample[feature]))
+        go_left = tree.missing_left[node] if x != x else x <= tree.threshold[node]
+        node = tree.left[node] if go_left else tree.right[node]
+    return path
+
+@pytest.fixture(scope='module')
+def feature_columns(model_dir):
+    with open(model_dir / 'feature_columns.pkl', 'rb') as f:
+        return pickle.load(f)
+
+@pytest.fixture(scope='module', params=['model.pkl', 'id3_model.pkl'])
+def model(request, model_dir):
+    with open(model_dir / request.param, 'rb') as f:
+        return pickle.load(f)
+
+@pytest.fixture(scope='module')
+def encoded(feature_columns):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 6, (2000, len(feature_columns))).astype(np.float64)
+
+def test_paths_match_row_by_row_walk(model, feature_columns, encoded):
+    tree = compile_model(model)
+    names = [SERVICE_FEATURES.get(col, col) for col in feature_columns]
+    explained = DecisionPathExplainer(tree, feature_columns).explain(encoded)
+    assert explained.tolist() == [', '.join(names[f] for f in walk_path(tree, x)) for x in encoded]
+
+def test_paths_match_sklearn_decision_path(model, feature_columns, encoded):
+    if not hasattr(model, 'decision_path'):
+        pytest.skip('not an sklearn tree')
+    tree = compile_model(model)
+    indicator = model.decision_path(pd.DataFrame(encoded, columns=feature_columns)).tocsr()
+    for row, x in enumerate(encoded):
+        nodes = indicator.indices[indicator.indptr[row]:indicator.indptr[row + 1]]
+        features = {int(f) for f in model.tree_.feature[nodes] if f >= 0}
+        assert features == set(walk_path(tree, x))
@@ -0,0 +1,37 @@
+"""score.py: the process pool writes the same file as in-process scoring"""
+
+import pandas as pd
+import pytest
+
+from batch_engine import REQUIRED_COLUMNS
+from conftest import run_script
+
+# Small chunks, so the file is split across several pool tasks
+CHUNK_SIZE = 700
+
+@pytest.fixture(scope='module')
+def input_csv(passengers, model_dir):
+    df = passengers[REQUIRED_COLUMNS].copy()
+    df = df.astype({'Age': object, 'Gender': object})
+    df.loc[5, 'Age'] = 'unknown'
+    df.loc[1234, 'Gender'] = 'Other'
+    path = model_dir / 'score_input.csv'
+    df.to_csv(path, index=False)
+    return path
+
+def score(input_csv, model_dir, workers, *args):
+    output = model_dir / f'scored_{workers}.csv'
+    run_script('score.py', str(input_csv), '-o', str(output), '--workers', str(workers),
+               '--chunk-size', str(CHUNK_SIZE), '--bundle', 'model.bundle', *args, cwd=model_dir)
+    return output.read_text()
+
+@pytest.mark.parametrize('args', [[], ['--explain-path']], ids=['plain', 'explain-path'])
+def test_workers_match_in_process(input_csv, model_dir, args):
+    in_process = score(input_csv, model_dir, 1, *args)
+    pooled = score(input_csv, model_dir, 3, *args)
+    assert pooled == in_process
+
+    rows = [line for line in in_process.splitlines() if not line.startswith('#')]
+    assert len(rows) == len(pd.read_csv(input_csv)) + 1
+    assert rows[0].startswith(','.join(REQUIRED_COLUMNS))
+    assert 'Main Reason' in rows[0]
@@ -0,0 +1,73 @@
+"""Sharded scoring: worker start-up and parity with in-process scoring"""
+
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from batch_engine import REQUIRED_COLUMNS
+from conftest import ML_DIR
+from shard_scoring import BundleScorer, ShardPool
+
+# Stands in for python app_fast.py: every import of the script is logged
+SCRIPT = '''
+import os
+import sys
+
+sys.path.insert(0, {ml_dir!r})
+with open('imports.log', 'a') as f:
+    f.write(f'{{os.getpid()}}\\n')
+
+from shard_scoring import ShardPool
+
+pool = ShardPool('model.bundle', 2)
+pool.warm_up()
+pool.shutdown()
+'''
+
+def test_workers_do_not_import_the_parent_script(model_dir):
+    script = model_dir / 'server.py'
+    script.write_text(SCRIPT.format(ml_dir=ML_DIR))
+    subprocess.run([sys.executable, str(script)], cwd=model_dir, check=True, timeout=300)
+    assert len((model_dir / 'imports.log').read_text().split()) == 1
+
+@pytest.fixture
+def frame(passengers):
+    return passengers[REQUIRED_COLUMNS].head(200)
+
+def test_pool_leaves_main_spec_alone(model_dir, frame):
+    main = sys.modules['__main__']
+    spec = main.__spec__
+    pool = ShardPool(str(model_dir / 'model.bundle'), 1)
+    try:
+        pool.warm_up()
+        assert main.__spec__ is spec
+    finally:
+        pool.shutdown()
+
+def test_tasks_name_their_bundle(model_dir, tmp_path, frame):
+    # The pool outlives the version it was created for (pruned by the registry)
+    old, new = tmp_path / 'v0001.bundle', tmp_path / 'v0002.bundle'
+    shutil.copy(model_dir / 'model.bundle', old)
+    shutil.copy(model_dir / 'model.bundle', new)
+    pool = ShardPool(str(old), 2)
+    os.remove(old)
+    try:
+        predictions = pool.score_frame(frame, bundle_path=str(new))
+    finally:
+        pool.shutdown()
+    assert predictions == BundleScorer(str(new)).score(frame)
+
+def test_broken_pool_is_replaced(model_dir, frame):
+    pool = ShardPool(str(model_dir / 'model.bundle'), 1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool._executor().submit(os._exit, 1).result()
+        with pytest.raises(BrokenProcessPool):
+            pool.score_frame(frame)
+        assert pool.score_frame(frame) == BundleScorer(pool.bundle_path).score(frame)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,12 @@
+"""Cold start of the Flask apps on bundles built in a temporary directory"""
+
+import pytest
+
+from check_startup import APP_BUNDLES, FORBIDDEN_MODULES, IMPORT_BUDGET_MS, best_of_runs
+
+@pytest.mark.parametrize('app', list(APP_BUNDLES))
+def test_import_budget(model_dir, app):
+    assert (model_dir / APP_BUNDLES[app]).exists()
+    import_ms, loaded = best_of_runs(app, cwd=model_dir)
+    assert loaded == [], f'{app} imported {loaded} (none of {FORBIDDEN_MODULES} is allowed)'
+    assert import_ms <= IMPORT_BUDGET_MS
@@ -0,0 +1,54 @@
+"""/predict_batch_stream against /predict_batch on the same upload"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from batch_engine import REQUIRED_COLUMNS
+
+ROWS = 1000
+
+@pytest.fixture
+def fast_client(apps, model_dir, monkeypatch):
+    monkeypatch.chdir(model_dir)
+    return apps['app_fast'].app.test_client()
+
+@pytest.fixture(scope='module')
+def upload(passengers):
+    df = passengers.dropna()[REQUIRED_COLUMNS].head(ROWS).reset_index(drop=True)
+    df = df.astype({'Gender': object})
+    df.loc[[5, 160, 999], 'Gender'] = 'Other'
+    return df.to_csv(index=False).encode()
+
+def post(client, url, body):
+    data = {'file': (io.BytesIO(body), 'rows.csv')}
+    return client.post(url, data=data, content_type='multipart/form-data')
+
+def stream(client, body, chunk_size):
+    response = post(client, f'/predict_batch_stream?chunk_size={chunk_size}', body)
+    assert response.mimetype == 'text/csv'
+    return response.get_data(as_text=True)
+
+def test_stream_matches_predict_batch(fast_client, upload):
+    text = stream(fast_client, upload, 150)
+    batch = post(fast_client, '/predict_batch', upload).get_json()
+    assert batch['success'], batch
+
+    scored = pd.read_csv(io.StringIO(text), comment='#', keep_default_na=False)
+    assert len(scored) == ROWS
+    shown = pd.DataFrame(batch['results'])
+    assert scored['Prediction'].head(len(shown)).tolist() == shown['Prediction'].tolist()
+    assert scored['Main Reason'].head(len(shown)).tolist() == shown['Main Reason'].tolist()
+
+    totals = {key: batch[key] for key in ('total', 'satisfied', 'dissatisfied', 'errors')}
+    assert totals['errors'] == 3
+    assert text.splitlines()[-1] == '# ' + ', '.join(f'{k}={v}' for k, v in totals.items())
+
+def test_chunk_size_does_not_change_the_output(fast_client, upload):
+    assert stream(fast_client, upload, 150) == stream(fast_client, upload, 10 * ROWS)
+
+def test_missing_columns_are_reported_as_json(fast_client, passengers):
+    body = passengers[REQUIRED_COLUMNS[1:]].head(10).to_csv(index=False).encode()
+    response = post(fast_client, '/predict_batch_stream', body).get_json()
+    assert response == {'success': False, 'error': f'Missing columns: {REQUIRED_COLUMNS[0]}'}
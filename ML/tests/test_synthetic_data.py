@@ -0,0 +1,52 @@
+"""PassengerDistribution: sample checks, seeds and the generator command line"""
+
+import numpy as np
+import pytest
+
+from batch_engine import REQUIRED_COLUMNS
+from conftest import run_script
+from synthetic_data import (LABEL_COLUMN, MAX_CORRELATION_DIFF, MAX_MARGINAL_GAP,
+                            PassengerDistribution, check_sample)
+
+@pytest.fixture(scope='module')
+def fitted(passengers):
+    return PassengerDistribution.fit(passengers)
+
+def assert_sample_ok(distribution):
+    gap, correlation_diff, round_trip = check_sample(distribution, n_rows=50000)
+    assert gap <= MAX_MARGINAL_GAP
+    assert correlation_diff <= MAX_CORRELATION_DIFF
+    assert round_trip
+
+def test_defaults_pass_the_sample_check():
+    assert_sample_ok(PassengerDistribution.defaults())
+
+def test_fitted_distribution_passes_the_sample_check(fitted):
+    assert_sample_ok(fitted)
+    assert fitted.columns == REQUIRED_COLUMNS + [LABEL_COLUMN]
+
+def test_profile_round_trip(fitted, tmp_path):
+    fitted.save(tmp_path / 'profile.json')
+    loaded = PassengerDistribution.load(tmp_path / 'profile.json')
+    assert (loaded.columns, loaded.tokens) == (fitted.columns, fitted.tokens)
+    assert np.array_equal(loaded.missing, fitted.missing)
+    for a, b in zip(loaded.probabilities, fitted.probabilities):
+        assert np.allclose(a, b)
+    assert np.allclose(loaded.correlation, fitted.correlation)
+
+def test_workers_do_not_change_the_output(fitted):
+    serial = b''.join(fitted.iter_csv(5000, chunk_size=700, seed=3, label=True))
+    pooled = b''.join(fitted.iter_csv(5000, chunk_size=700, seed=3, label=True, workers=3))
+    assert pooled == serial
+    assert serial != b''.join(fitted.iter_csv(5000, chunk_size=700, seed=4, label=True))
+
+def test_command_line_is_seeded(tmp_path):
+    outputs = []
+    for workers in ('1', '2'):
+        path = tmp_path / f'rows_{workers}.csv'
+        run_script('synthetic_data.py', str(path), '--rows', '3000', '--chunk-size', '1000',
+                   '--workers', workers, '--seed', '5', '--label', cwd=tmp_path)
+        outputs.append(path.read_bytes())
+    assert outputs[0] == outputs[1]
+    lines = outputs[0].decode().splitlines()
+    assert lines[0].split(',')[-1] == LABEL_COLUMN and len(lines) == 3001
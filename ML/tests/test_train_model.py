@@ -0,0 +1,47 @@
+"""train_model.py end to end: parallel Chefboost gives the native trainer's rules.py"""
+
+import pickle
+import shutil
+
+import pytest
+
+from conftest import run_script
+
+def test_parallel_chefboost_training(model_dir, tmp_path):
+    pytest.importorskip('chefboost')
+    shutil.copy(model_dir / 'train.csv', tmp_path)
+    # Ask for more cores than the test machine may have so the process pool is used
+    output = run_script('train_model.py', '--cores', '4', cwd=tmp_path)
+    assert 'TRAINING COMPLETE' in output
+
+    rules = (tmp_path / 'outputs' / 'rules' / 'rules.py').read_bytes()
+    assert rules == (model_dir / 'outputs' / 'rules' / 'rules.py').read_bytes()
+    assert (tmp_path / 'id3_model.bundle').exists()
+
+def test_parallel_training_only_on_linux():
+    from train_model import parallel_training
+
+    assert parallel_training('linux')
+    assert not parallel_training('win32')
+    assert not parallel_training('darwin')
+
+def test_id3_model_pkl_is_a_compiled_tree(model_dir):
+    from compiled_tree import CompiledTree, compile_model
+
+    with open(model_dir / 'id3_model.pkl', 'rb') as f:
+        tree = pickle.load(f)
+    assert isinstance(tree, CompiledTree)
+    assert compile_model(tree) is tree
+
+def test_keep_prunes_old_versions(model_dir, tmp_path):
+    from model_registry import ModelRegistry
+
+    shutil.copy(model_dir / 'train.csv', tmp_path)
+    for _ in range(3):
+        run_script('train_model_fast.py', cwd=tmp_path)
+    output = run_script('train_model_fast.py', '--keep', '2', cwd=tmp_path)
+    assert 'Removed model version v0001' in output
+
+    registry = ModelRegistry(str(tmp_path / 'models'), 'model')
+    assert registry.versions() == ['v0003', 'v0004']
+    assert registry.current() == 'v0004'
@@ -1,185 +1,221 @@
 """
 Train Airline Passenger Satisfaction Model using ID3 Algorithm (Chefboost)
 Based on hocmay-ffinal.ipynb
+
+Usage: python train_model.py [--native] [--no-cache] [--cores N] [--keep N]
+
+Chefboost builds branches on a spawn process pool on Linux (PARALLEL_PLATFORMS)
+and on one core elsewhere, as it did before. The native trainer writes
+rules.py in the layout Chefboost uses on the platform, so both give the
+same file.
+
+id3_model.pkl holds the trained tree as a compiled_tree.CompiledTree (flat
+node arrays with .predict), not Chefboost's model dict, whose rules are
+module objects that do not pickle; compile_model() accepts either.
 """
 
-import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
+import argparse
+import multiprocessing
+import os
 import pickle
+import sys
+import time
 import warnings
 
+from compiled_tree import compile_model
+from id3_trainer import ID3Trainer
+from materialize import feature_domains, materialize
+from model_bundle import save_bundle
+from model_registry import ModelRegistry
+from preprocessing import load_dataset
+
 warnings.filterwarnings('ignore')
 
-print("=" * 60)
-print("🚀 TRAINING AIRLINE PASSENGER SATISFACTION MODEL (ID3)")
-print("=" * 60)
-
-# ==========================================
-# 1. LOAD DATA
-# ==========================================
-print("\n📂 Loading data...")
-try:
-    df = pd.read_csv('train.csv')
-    print(f"✅ Loaded {len(df)} records from train.csv")
-except FileNotFoundError:
-    print("❌ Error: train.csv not found!")
-    exit(1)
-
-# ==========================================
-# 2. DATA CLEANING
-# ==========================================
-print("\n🧹 Cleaning data...")
-drop_cols = ['id', 'Unnamed: 0']
-df = df.drop(columns=[c for c in drop_cols if c in df.columns])
-df = df.dropna()
-print(f"✅ Data cleaned. {len(df)} records remaining")
-
-# ==========================================
-# 3. BINNING (GROUPING)
-# ==========================================
-print("\n📊 Binning data...")
-
-# a. Age
-bins_age = [0, 19, 29, 39, 49, 59, 120]
-labels_age = ['<20', '20-29', '30-39', '40-49', '50-59', '60+']
-df['Age'] = pd.cut(df['Age'], bins=bins_age, labels=labels_age)
-
-# b. Delay times
-bins_delay = [-1, 0, 5, 15, 30, 100000]
-labels_delay = ['On time', 'Slightly delayed', 'Moderately delayed', 'Delayed', 'Very delayed']
-
-df['Arrival Delay in Minutes'] = pd.cut(df['Arrival Delay in Minutes'], bins=bins_delay, labels=labels_delay)
-df['Departure Delay in Minutes'] = pd.cut(df['Departure Delay in Minutes'], bins=bins_delay, labels=labels_delay)
-
-# c. Flight Distance
-bins_dist = [0, 500, 1000, 1500, 2000, 2500, df['Flight Distance'].max() + 1]
-labels_dist = ['0-500', '501-1000', '1001-1500', '1501-2000', '2001-2500', '2500+']
-df['Flight Distance'] = pd.cut(df['Flight Distance'], bins=bins_dist, labels=labels_dist)
-
-print("✅ Binning complete")
-
-# ==========================================
-# 4. LABEL ENCODING
-# ==========================================
-print("\n🔢 Encoding categorical variables...")
-
-cat_cols = ['Gender', 'Customer Type', 'Age', 'Type of Travel', 'Class',
-            'Departure Delay in Minutes', 'Arrival Delay in Minutes',
-            'satisfaction', 'Flight Distance']
-
-label_encoders = {}
-for col in cat_cols:
-    le = LabelEncoder()
-    df[col] = df[col].astype(str)
-    df[col] = le.fit_transform(df[col])
-    label_encoders[col] = le
-
-print("✅ Encoding complete")
-
-# Save label encoders
-with open('label_encoders.pkl', 'wb') as f:
-    pickle.dump(label_encoders, f)
-print("💾 Saved label_encoders.pkl")
-
-# Save binning configurations
-binning_config = {
-    'bins_age': bins_age,
-    'labels_age': labels_age,
-    'bins_delay': bins_delay,
-    'labels_delay': labels_delay,
-    'bins_dist': bins_dist,
-    'labels_dist': labels_dist
-}
-with open('binning_config.pkl', 'wb') as f:
-    pickle.dump(binning_config, f)
-print("💾 Saved binning_config.pkl")
-
-# ==========================================
-# 5. TRAIN/TEST SPLIT
-# ==========================================
-print("\n✂️ Splitting data...")
-X = df.drop(columns=['satisfaction'])
-y = df['satisfaction']
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Prepare for Chefboost
-df_train = X_train.copy()
-df_train['satisfaction'] = y_train
-df_train['satisfaction'] = df_train['satisfaction'].astype(str)
-
-print(f"✅ Train set: {len(df_train)} records")
-print(f"✅ Test set: {len(X_test)} records")
-
-# Save column names for prediction
-feature_columns = X_train.columns.tolist()
-with open('feature_columns.pkl', 'wb') as f:
-    pickle.dump(feature_columns, f)
-print("💾 Saved feature_columns.pkl")
-
-# ==========================================
-# 6. TRAIN ID3 MODEL (CHEFBOOST)
-# ==========================================
-print("\n🌳 Training ID3 model with Chefboost...")
-print("⏳ This may take a while... Please wait...")
-
-try:
+# Chefboost's parallel mode is only used where it is known to work; elsewhere
+# (Windows) training stays on one core
+PARALLEL_PLATFORMS = ('linux',)
+
+def parallel_training(platform=sys.platform):
+    """True if Chefboost should build branches on a process pool here"""
+    return platform.startswith(PARALLEL_PLATFORMS)
+
+def train_chefboost(df_train, num_cores):
+    """Fit Chefboost's ID3, with its branches fanned out over num_cores processes where supported"""
+    parallel = parallel_training()
+    if parallel:
+        # Chefboost switches to spawn inside fit(), but its process pool takes the
+        # start method in force when chefboost is imported; set spawn first so both
+        # agree (otherwise Linux fails with "SemLock created in a fork context")
+        multiprocessing.set_start_method('spawn', force=True)
     from chefboost import Chefboost as cb
-    
-    config = {
-        'algorithm': 'ID3',
-        'enableParallelism': False  # Disabled for Windows compatibility
-    }
-    
-    model = cb.fit(df_train, config=config, target_label='satisfaction')
-    print("✅ ID3 model training complete!")
-    
-    # The model is saved automatically by chefboost in 'outputs' folder
-    # We also save the model object
-    with open('id3_model.pkl', 'wb') as f:
-        pickle.dump(model, f)
-    print("💾 Saved id3_model.pkl")
-    
-except ImportError:
-    print("❌ Error: chefboost not installed!")
-    print("📦 Please install it using: pip install chefboost")
-    exit(1)
-except Exception as e:
-    print(f"❌ Error during training: {e}")
-    exit(1)
-
-# ==========================================
-# 7. EVALUATE MODEL
-# ==========================================
-print("\n📈 Evaluating model on test set...")
-
-y_pred_list = []
-for index, row in X_test.iterrows():
-    instance = row[feature_columns].tolist()
-    prediction = cb.predict(model, instance)
-    y_pred_list.append(prediction)
-
-y_pred_numeric = [int(p) for p in y_pred_list]
-
-accuracy = accuracy_score(y_test, y_pred_numeric)
-print("\n" + "=" * 60)
-print("📊 MODEL EVALUATION RESULTS")
-print("=" * 60)
-print(f"✅ Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
-print("\n📋 Classification Report:")
-print(classification_report(y_test, y_pred_numeric))
-
-print("\n" + "=" * 60)
-print("✅ TRAINING COMPLETE!")
-print("=" * 60)
-print("📁 Files saved:")
-print("   - label_encoders.pkl")
-print("   - binning_config.pkl")
-print("   - feature_columns.pkl")
-print("   - id3_model.pkl")
-print("   - outputs/ (chefboost model files)")
-print("\n🚀 You can now run: python app.py")
-print("=" * 60)
+
+    # fit() imports the rules it just wrote as outputs.rules.rules; look in
+    # the working directory first, not in the folder of this script
+    sys.path.insert(0, os.getcwd())
+
+    config = {'algorithm': 'ID3', 'enableParallelism': parallel, 'num_cores': num_cores}
+    return cb.fit(df_train, config=config, target_label='satisfaction')
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the ID3 model used by app.py')
+    parser.add_argument('--native', action='store_true',
+                        help='train with the in-repo trainer instead of Chefboost')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='rebuild the encoded data instead of reading cache/')
+    parser.add_argument('--cores', type=int, default=os.cpu_count() or 1,
+                        help='processes Chefboost may use on Linux (default: all CPUs)')
+    parser.add_argument('--keep', type=int,
+                        help='after publishing, delete all but the newest KEEP registry versions')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 TRAINING AIRLINE PASSENGER SATISFACTION MODEL (ID3)")
+    print("=" * 60)
+
+    # ==========================================
+    # 1. LOAD, BIN AND ENCODE DATA
+    # ==========================================
+    # Encoded data is cached under cache/ keyed by the hash of train.csv;
+    # pass --no-cache to rebuild it
+    print("\n📂 Loading data...")
+    start_time = time.perf_counter()
+    try:
+        df, label_encoders, binning_config, from_cache = load_dataset(
+            'train.csv', use_cache=not args.no_cache)
+    except FileNotFoundError:
+        print("❌ Error: train.csv not found!")
+        exit(1)
+
+    source = "cache" if from_cache else "train.csv (binned + encoded)"
+    print(f"✅ Loaded {len(df)} records from {source} in {time.perf_counter() - start_time:.2f}s")
+
+    # Save label encoders
+    with open('label_encoders.pkl', 'wb') as f:
+        pickle.dump(label_encoders, f)
+    print("💾 Saved label_encoders.pkl")
+
+    # Save binning configurations
+    with open('binning_config.pkl', 'wb') as f:
+        pickle.dump(binning_config, f)
+    print("💾 Saved binning_config.pkl")
+
+    # ==========================================
+    # 2. TRAIN/TEST SPLIT
+    # ==========================================
+    print("\n✂️ Splitting data...")
+    X = df.drop(columns=['satisfaction'])
+    y = df['satisfaction']
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Prepare for Chefboost
+    df_train = X_train.copy()
+    df_train['satisfaction'] = y_train
+    df_train['satisfaction'] = df_train['satisfaction'].astype(str)
+
+    print(f"✅ Train set: {len(df_train)} records")
+    print(f"✅ Test set: {len(X_test)} records")
+
+    # Save column names for prediction
+    feature_columns = X_train.columns.tolist()
+    with open('feature_columns.pkl', 'wb') as f:
+        pickle.dump(feature_columns, f)
+    print("💾 Saved feature_columns.pkl")
+
+    # ==========================================
+    # 3. TRAIN ID3 MODEL
+    # ==========================================
+    # python train_model.py           -> Chefboost, branches on --cores processes
+    # python train_model.py --native  -> in-repo bincount trainer, same rules.py
+    try:
+        if args.native:
+            print("\n🌳 Training ID3 model with the native trainer...")
+            trainer = ID3Trainer(parallel=parallel_training())
+            compiled_tree = trainer.fit(df_train, target_label='satisfaction')
+        else:
+            print("\n🌳 Training ID3 model with Chefboost...")
+            print("⏳ This may take a while... Please wait...")
+            model = train_chefboost(df_train, args.cores)
+            # Compile the generated rules into flat node arrays for app.py
+            compiled_tree = compile_model(model)
+        print("✅ ID3 model training complete!")
+
+        # The rules are saved in the 'outputs' folder; the Chefboost model dict
+        # holds module objects, so the compiled tree is what gets pickled
+        with open('id3_model.pkl', 'wb') as f:
+            pickle.dump(compiled_tree, f)
+        print("💾 Saved id3_model.pkl")
+
+        compiled_tree.save('id3_tree.npz')
+        print(f"💾 Saved id3_tree.npz ({compiled_tree.node_count} nodes)")
+
+        table = materialize(compiled_tree, feature_domains(feature_columns, label_encoders))
+        np.save('id3_tree_table.npy', table)
+        print("💾 Saved id3_tree_table.npy")
+
+        # Bundle the tree, table, vocabularies and bins into one file for app.py
+        save_bundle('id3_model.bundle', compiled_tree, feature_columns, label_encoders,
+                    binning_config, table=table, metadata={'algorithm': 'ID3'})
+        print("💾 Saved id3_model.bundle")
+
+        # Publish it as the next registry version; running apps swap to it without a restart
+        registry = ModelRegistry(name='id3_model')
+        version = registry.publish('id3_model.bundle')
+        print(f"💾 Published as id3_model version {version} (active)")
+        if args.keep:
+            for removed in registry.prune(args.keep):
+                print(f"🗑️  Removed id3_model version {removed}")
+
+    except ImportError:
+        print("❌ Error: chefboost not installed!")
+        print("📦 Please install it using: pip install chefboost")
+        print("   or train without it using: python train_model.py --native")
+        exit(1)
+    except Exception as e:
+        print(f"❌ Error during training: {e}")
+        exit(1)
+
+    # ==========================================
+    # 4. EVALUATE MODEL
+    # ==========================================
+    print("\n📈 Evaluating model on test set...")
+
+    # Score the whole test matrix with one vectorized tree walk
+    start_time = time.perf_counter()
+    y_pred = compiled_tree.predict(X_test[feature_columns].to_numpy(dtype=np.float64))
+    elapsed = time.perf_counter() - start_time
+
+    y_pred_numeric = y_pred.astype(int)
+    rows_per_sec = len(X_test) / elapsed if elapsed > 0 else float('inf')
+    print(f"⏱️ Scored {len(X_test)} rows in {elapsed:.4f}s ({rows_per_sec:,.0f} rows/sec)")
+
+    accuracy = accuracy_score(y_test, y_pred_numeric)
+    print("\n" + "=" * 60)
+    print("📊 MODEL EVALUATION RESULTS")
+    print("=" * 60)
+    print(f"✅ Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
+    print("\n📋 Classification Report:")
+    print(classification_report(y_test, y_pred_numeric))
+
+    print("\n" + "=" * 60)
+    print("✅ TRAINING COMPLETE!")
+    print("=" * 60)
+    print("📁 Files saved:")
+    print("   - label_encoders.pkl")
+    print("   - binning_config.pkl")
+    print("   - feature_columns.pkl")
+    print("   - id3_model.pkl")
+    print("   - id3_tree.npz")
+    print("   - id3_tree_table.npy")
+    print("   - id3_model.bundle")
+    print("   - outputs/ (rules.py)")
+    print("\n🚀 You can now run: python app.py")
+    print("=" * 60)
+
+# Chefboost's worker processes are spawned and re-import this script, so
+# training must only run from here
+if __name__ == '__main__':
+    main()
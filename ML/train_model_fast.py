@@ -2,85 +2,55 @@
 Train Airline Passenger Satisfaction Model using Decision Tree (sklearn)
 Based on hocmay-ffinal.ipynb preprocessing logic
 FAST VERSION - Uses sklearn instead of chefboost
+
+Usage: python train_model_fast.py [--no-cache] [--keep N]
 """
 
-import pandas as pd
+import argparse
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score, classification_report
 import pickle
+import time
 import warnings
 
+from compiled_tree import compile_model
+from materialize import feature_domains, materialize
+from model_bundle import save_bundle
+from model_registry import ModelRegistry
+from preprocessing import load_dataset
+
 warnings.filterwarnings('ignore')
 
+parser = argparse.ArgumentParser(description='Train the decision tree used by app_fast.py')
+parser.add_argument('--no-cache', action='store_true',
+                    help='rebuild the encoded data instead of reading cache/')
+parser.add_argument('--keep', type=int,
+                    help='after publishing, delete all but the newest KEEP registry versions')
+args = parser.parse_args()
+
 print("=" * 60)
 print("🚀 TRAINING AIRLINE PASSENGER SATISFACTION MODEL")
 print("   Algorithm: Decision Tree (sklearn - FAST)")
 print("=" * 60)
 
 # ==========================================
-# 1. LOAD DATA
+# 1. LOAD, BIN AND ENCODE DATA
 # ==========================================
+# Encoded data is cached under cache/ keyed by the hash of train.csv;
+# pass --no-cache to rebuild it
 print("\n📂 Loading data...")
+start_time = time.perf_counter()
 try:
-    df = pd.read_csv('train.csv')
-    print(f"✅ Loaded {len(df)} records from train.csv")
+    df, label_encoders, binning_config, from_cache = load_dataset(
+        'train.csv', use_cache=not args.no_cache)
 except FileNotFoundError:
     print("❌ Error: train.csv not found!")
     exit(1)
 
-# ==========================================
-# 2. DATA CLEANING
-# ==========================================
-print("\n🧹 Cleaning data...")
-drop_cols = ['id', 'Unnamed: 0']
-df = df.drop(columns=[c for c in drop_cols if c in df.columns])
-df = df.dropna()
-print(f"✅ Data cleaned. {len(df)} records remaining")
-
-# ==========================================
-# 3. BINNING (GROUPING)
-# ==========================================
-print("\n📊 Binning data...")
-
-# a. Age
-bins_age = [0, 19, 29, 39, 49, 59, 120]
-labels_age = ['<20', '20-29', '30-39', '40-49', '50-59', '60+']
-df['Age'] = pd.cut(df['Age'], bins=bins_age, labels=labels_age)
-
-# b. Delay times
-bins_delay = [-1, 0, 5, 15, 30, 100000]
-labels_delay = ['On time', 'Slightly delayed', 'Moderately delayed', 'Delayed', 'Very delayed']
-
-df['Arrival Delay in Minutes'] = pd.cut(df['Arrival Delay in Minutes'], bins=bins_delay, labels=labels_delay)
-df['Departure Delay in Minutes'] = pd.cut(df['Departure Delay in Minutes'], bins=bins_delay, labels=labels_delay)
-
-# c. Flight Distance
-bins_dist = [0, 500, 1000, 1500, 2000, 2500, df['Flight Distance'].max() + 1]
-labels_dist = ['0-500', '501-1000', '1001-1500', '1501-2000', '2001-2500', '2500+']
-df['Flight Distance'] = pd.cut(df['Flight Distance'], bins=bins_dist, labels=labels_dist)
-
-print("✅ Binning complete")
-
-# ==========================================
-# 4. LABEL ENCODING
-# ==========================================
-print("\n🔢 Encoding categorical variables...")
-
-cat_cols = ['Gender', 'Customer Type', 'Age', 'Type of Travel', 'Class',
-            'Departure Delay in Minutes', 'Arrival Delay in Minutes',
-            'satisfaction', 'Flight Distance']
-
-label_encoders = {}
-for col in cat_cols:
-    le = LabelEncoder()
-    df[col] = df[col].astype(str)
-    df[col] = le.fit_transform(df[col])
-    label_encoders[col] = le
-
-print("✅ Encoding complete")
+source = "cache" if from_cache else "train.csv (binned + encoded)"
+print(f"✅ Loaded {len(df)} records from {source} in {time.perf_counter() - start_time:.2f}s")
 
 # Save label encoders
 with open('label_encoders.pkl', 'wb') as f:
@@ -88,20 +58,12 @@ with open('label_encoders.pkl', 'wb') as f:
 print("💾 Saved label_encoders.pkl")
 
 # Save binning configurations
-binning_config = {
-    'bins_age': bins_age,
-    'labels_age': labels_age,
-    'bins_delay': bins_delay,
-    'labels_delay': labels_delay,
-    'bins_dist': bins_dist,
-    'labels_dist': labels_dist
-}
 with open('binning_config.pkl', 'wb') as f:
     pickle.dump(binning_config, f)
 print("💾 Saved binning_config.pkl")
 
 # ==========================================
-# 5. TRAIN/TEST SPLIT
+# 2. TRAIN/TEST SPLIT
 # ==========================================
 print("\n✂️ Splitting data...")
 X = df.drop(columns=['satisfaction'])
@@ -119,7 +81,7 @@ with open('feature_columns.pkl', 'wb') as f:
 print("💾 Saved feature_columns.pkl")
 
 # ==========================================
-# 6. TRAIN DECISION TREE MODEL
+# 3. TRAIN DECISION TREE MODEL
 # ==========================================
 print("\n🌳 Training Decision Tree model...")
 print("⏳ Please wait...")
@@ -140,8 +102,29 @@ with open('model.pkl', 'wb') as f:
     pickle.dump(model, f)
 print("💾 Saved model.pkl")
 
+# Flatten the sklearn tree once for the decision table and the bundle
+compiled_tree = compile_model(model)
+
+# Materialize the tree into a decision table for fast single predictions
+table = materialize(compiled_tree, feature_domains(feature_columns, label_encoders))
+np.save('model_table.npy', table)
+print("💾 Saved model_table.npy")
+
+# Bundle the tree, table, vocabularies and bins into one file for app_fast.py
+save_bundle('model.bundle', compiled_tree, feature_columns, label_encoders,
+            binning_config, table=table, metadata={'algorithm': 'sklearn DecisionTreeClassifier'})
+print("💾 Saved model.bundle")
+
+# Publish it as the next registry version; running apps swap to it without a restart
+registry = ModelRegistry(name='model')
+version = registry.publish('model.bundle')
+print(f"💾 Published as model version {version} (active)")
+if args.keep:
+    for removed in registry.prune(args.keep):
+        print(f"🗑️  Removed model version {removed}")
+
 # ==========================================
-# 7. EVALUATE MODEL
+# 4. EVALUATE MODEL
 # ==========================================
 print("\n📈 Evaluating model on test set...")
 
@@ -164,5 +147,7 @@ print("   - label_encoders.pkl")
 print("   - binning_config.pkl")
 print("   - feature_columns.pkl")
 print("   - model.pkl")
+print("   - model_table.npy")
+print("   - model.bundle")
 print("\n🚀 You can now run: python app.py")
 print("=" * 60)